@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Forecasting Engine
+Previsão de séries temporais com escolha automática de backend e cache de modelos
+"""
+
+import copy
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from prophet import Prophet
+    HAS_PROPHET = True
+except ImportError:
+    HAS_PROPHET = False
+
+logger = logging.getLogger(__name__)
+
+# Grade de parâmetros (alpha, beta) avaliada em lote para o método de Holt
+_HOLT_ALPHAS = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+_HOLT_BETAS = np.array([0.05, 0.1, 0.2, 0.4])
+_Z_95 = 1.96
+
+
+class ForecastEngine:
+    """Gera previsões escolhendo o backend pelo tamanho da série e reaproveitando ajustes"""
+
+    def __init__(self, prophet_min_points: int = 60, cache_size: int = 256):
+        """
+        Inicializa o motor de previsão
+
+        Args:
+            prophet_min_points: Tamanho mínimo da série (em dias) para usar o Prophet
+            cache_size: Número máximo de previsões mantidas no cache LRU
+        """
+        self.prophet_min_points = prophet_min_points
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"cache_hits": 0, "cache_misses": 0, "prophet_fits": 0, "holt_fits": 0}
+
+    def forecast(self, temporal_data: Any, horizon_days: int) -> Dict[str, Any]:
+        """
+        Gera a previsão de uma única série (lista de dicts ou DataFrame com timestamp/value)
+
+        Returns:
+            Dict com "linear_regression_forecast", "holt_forecast" ou "prophet_forecast"
+            e "forecast_backend" ("linear_regression" quando todos os pontos são do mesmo dia)
+        """
+        return self.forecast_many({"default": temporal_data}, horizon_days).get("default", {})
+
+    def forecast_many(self, series: Dict[str, Any], horizon_days: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Gera previsões para várias séries de uma vez.
+
+        Séries curtas são ajustadas juntas em um único passe vetorizado (Holt + regressão
+        linear em forma fechada); o Prophet só é usado acima de ``prophet_min_points``.
+        Resultados já calculados para a mesma série e horizonte vêm do cache.
+        """
+        results = {}
+        pending_short = {}
+
+        for name, data in series.items():
+            raw = self._raw_series(data)
+            if raw is None:
+                results[name] = {}
+                continue
+
+            prepared = self._daily_series(raw)
+            if prepared is None:
+                # Dados intradiários (todos os pontos no mesmo dia): só a regressão linear
+                results[name] = self._forecast_single_day(raw, horizon_days)
+                continue
+
+            key = self._series_hash(prepared, horizon_days)
+            cached = self._cache_get(key)
+            if cached is not None:
+                results[name] = cached
+                continue
+
+            if HAS_PROPHET and len(prepared) >= self.prophet_min_points:
+                forecast = self._forecast_prophet(prepared, horizon_days)
+                if forecast:
+                    self._cache_put(key, forecast)
+                    results[name] = forecast
+                    continue
+
+            pending_short[name] = (key, prepared)
+
+        if pending_short:
+            batch = self._forecast_closed_form_batch(
+                {name: prepared for name, (_, prepared) in pending_short.items()}, horizon_days
+            )
+            for name, (key, _) in pending_short.items():
+                self._cache_put(key, batch[name])
+                results[name] = batch[name]
+
+        return results
+
+    def _raw_series(self, data: Any) -> Optional[pd.Series]:
+        """Converte os dados (lista de dicts ou DataFrame com timestamp/value) em série ordenada"""
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        if df.empty or "timestamp" not in df.columns or "value" not in df.columns:
+            return None
+
+        values = pd.to_numeric(df["value"], errors="coerce")
+        index = pd.to_datetime(df["timestamp"], errors="coerce")
+        serie = pd.Series(values.to_numpy(dtype=np.float64), index=index).dropna()
+        serie = serie[serie.index.notna()].sort_index()
+        return serie if len(serie) >= 2 else None
+
+    def _daily_series(self, serie: pd.Series) -> Optional[pd.Series]:
+        """Série diária regular (média por dia, lacunas interpoladas); None se houver um único dia"""
+        daily = serie.resample("D").mean().interpolate(limit_direction="both")
+        return daily if len(daily) >= 2 else None
+
+    def _forecast_single_day(self, serie: pd.Series, horizon_days: int) -> Dict[str, Any]:
+        """
+        Regressão linear sobre a data ordinal, como antes do motor: com todos os pontos no
+        mesmo dia a inclinação é zero e a previsão é a média do dia
+        """
+        last_ordinal = serie.index[-1].toordinal()
+        mean = float(serie.mean())
+        return {
+            "forecast_backend": "linear_regression",
+            "linear_regression_forecast": [
+                {"ds": datetime.fromordinal(last_ordinal + h).isoformat(), "yhat": mean}
+                for h in range(1, horizon_days + 1)
+            ]
+        }
+
+    def _series_hash(self, serie: pd.Series, horizon_days: int) -> str:
+        """Chave de cache: conteúdo da série diária + horizonte"""
+        digest = hashlib.sha1()
+        digest.update(serie.index.asi8.tobytes())
+        digest.update(serie.to_numpy(dtype=np.float64).tobytes())
+        digest.update(str(horizon_days).encode())
+        return digest.hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cópia da previsão em cache (quem chama pode alterar o resultado)"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return copy.deepcopy(self._cache[key])
+            self.stats["cache_misses"] += 1
+            return None
+
+    def _cache_put(self, key: str, value: Dict[str, Any]):
+        """Guarda uma cópia, independente do dict devolvido a quem pediu a previsão"""
+        with self._lock:
+            self._cache[key] = copy.deepcopy(value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forecast_prophet(self, serie: pd.Series, horizon_days: int) -> Dict[str, Any]:
+        """Ajusta o Prophet em séries longas, mantendo a regressão linear como modelo adicional"""
+        try:
+            df = pd.DataFrame({"ds": serie.index, "y": serie.to_numpy()})
+            m = Prophet()
+            m.fit(df)
+            future = m.make_future_dataframe(periods=horizon_days)
+            forecast = m.predict(future)
+            self.stats["prophet_fits"] += 1
+            logger.info("✅ Modelo Prophet criado e previsão gerada.")
+        except Exception as e:
+            logger.error(f"❌ Erro ao criar modelo Prophet: {e}")
+            return {}
+
+        linear = self._forecast_closed_form_batch({"serie": serie}, horizon_days)["serie"]
+        return {
+            "forecast_backend": "prophet",
+            "prophet_forecast": forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].to_dict(orient="records"),
+            "linear_regression_forecast": linear["linear_regression_forecast"]
+        }
+
+    def _forecast_closed_form_batch(self, series: Dict[str, pd.Series], horizon_days: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Ajusta Holt (tendência linear) e regressão linear para todas as séries num único passe.
+
+        As séries são alinhadas pelo fim em uma matriz (n_series, n_dias); o início de séries
+        mais curtas é preenchido com o primeiro valor e tendência zero, o que equivale à
+        inicialização usual do Holt. A grade (alpha, beta) é avaliada para todas as séries ao
+        mesmo tempo e cada série fica com o par de menor erro quadrático um passo à frente.
+        """
+        names = list(series)
+        lengths = np.array([len(series[name]) for name in names])
+        n_series, n_steps = len(names), int(lengths.max())
+
+        y = np.empty((n_series, n_steps))
+        valid = np.zeros((n_series, n_steps), dtype=bool)
+        ordinals = np.zeros((n_series, n_steps))
+        for row, name in enumerate(names):
+            values = series[name].to_numpy(dtype=np.float64)
+            offset = n_steps - len(values)
+            y[row, :offset] = values[0]
+            y[row, offset:] = values
+            valid[row, offset:] = True
+            ordinals[row, offset:] = [d.toordinal() for d in series[name].index]
+
+        # Holt: grade (G parâmetros) x séries, recursão vetorizada no tempo
+        alpha = np.repeat(_HOLT_ALPHAS, len(_HOLT_BETAS))[:, None]
+        beta = np.tile(_HOLT_BETAS, len(_HOLT_ALPHAS))[:, None]
+        level = np.broadcast_to(y[:, 0], (len(alpha), n_series)).copy()
+        trend = np.zeros_like(level)
+        sse = np.zeros_like(level)
+
+        for t in range(1, n_steps):
+            error = y[:, t] - (level + trend)
+            sse += np.where(valid[:, t], error ** 2, 0.0)
+            new_level = level + trend + alpha * error
+            trend = trend + alpha * beta * error
+            level = new_level
+
+        best = np.argmin(sse, axis=0)
+        cols = np.arange(n_series)
+        best_level, best_trend = level[best, cols], trend[best, cols]
+        best_alpha, best_beta = alpha[best, 0], beta[best, 0]
+        n_residuals = np.maximum(valid[:, 1:].sum(axis=1) - 1, 1)
+        sigma = np.sqrt(sse[best, cols] / n_residuals)
+
+        steps = np.arange(1, horizon_days + 1)
+        holt_yhat = best_level[:, None] + steps[None, :] * best_trend[:, None]
+        # Variância de h passos do Holt aditivo: sigma² (1 + Σ_{j<h} alpha² (1 + j·beta)²)
+        var_terms = (best_alpha[:, None] * (1 + steps[None, :-1] * best_beta[:, None])) ** 2
+        var_factor = np.concatenate([np.ones((n_series, 1)), 1 + np.cumsum(var_terms, axis=1)], axis=1)
+        holt_band = _Z_95 * sigma[:, None] * np.sqrt(var_factor)
+
+        # Regressão linear em forma fechada sobre a data ordinal (somente pontos válidos)
+        count = valid.sum(axis=1)
+        x_mean = np.where(valid, ordinals, 0).sum(axis=1) / count
+        y_mean = np.where(valid, y, 0).sum(axis=1) / count
+        x_centered = np.where(valid, ordinals - x_mean[:, None], 0)
+        denom = (x_centered ** 2).sum(axis=1)
+        slope = np.divide((x_centered * np.where(valid, y - y_mean[:, None], 0)).sum(axis=1), denom,
+                          out=np.zeros(n_series), where=denom > 0)
+        intercept = y_mean - slope * x_mean
+
+        results = {}
+        for row, name in enumerate(names):
+            last_ordinal = int(ordinals[row, -1])
+            future_dates = [datetime.fromordinal(last_ordinal + int(h)) for h in steps]
+            linear_yhat = intercept[row] + slope[row] * (last_ordinal + steps)
+            results[name] = {
+                "forecast_backend": "holt",
+                "holt_forecast": [
+                    {"ds": d.isoformat(), "yhat": float(v), "yhat_lower": float(v - b), "yhat_upper": float(v + b)}
+                    for d, v, b in zip(future_dates, holt_yhat[row], holt_band[row])
+                ],
+                "linear_regression_forecast": [
+                    {"ds": d.isoformat(), "yhat": float(v)} for d, v in zip(future_dates, linear_yhat)
+                ]
+            }
+
+        self.stats["holt_fits"] += n_series
+        logger.info(f"✅ {n_series} série(s) ajustada(s) em lote (Holt + regressão linear)")
+        return results
+
+
+# Instância global
+forecast_engine = ForecastEngine()
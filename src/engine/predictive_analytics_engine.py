@@ -28,7 +28,7 @@ except ImportError:
 
 try:
     from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.cluster import KMeans
+    from sklearn.cluster import KMeans, MiniBatchKMeans
     from sklearn.decomposition import LatentDirichletAllocation
     from sklearn.linear_model import LinearRegression
     from sklearn.preprocessing import StandardScaler
@@ -68,12 +68,6 @@ try:
 except ImportError:
     HAS_OPENCV = False
 
-try:
-    from prophet import Prophet
-    HAS_PROPHET = True
-except ImportError:
-    HAS_PROPHET = False
-
 try:
     import plotly.graph_objects as go
     import plotly.express as px
@@ -88,7 +82,17 @@ try:
 except ImportError:
     HAS_NETWORKX = False
 
+try:
+    from scipy import sparse
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from engine.forecasting import forecast_engine
+from engine import shared_models
+from services.perceptual_image_index import perceptual_image_index
+from services.screenshot_encoder import screenshot_encoder
 
 logger = logging.getLogger(__name__)
 
@@ -110,7 +114,16 @@ class PredictiveAnalyticsEngine:
             'n_clusters_kmeans': 5,
             'confidence_threshold': 0.7,
             'prediction_horizon_days': 90,
-            'min_data_points_prediction': 5
+            'min_data_points_prediction': 5,
+            'color_thumbnail_size': 100,
+            'n_dominant_colors': 5,
+            'n_session_palette_colors': 8,
+            'max_network_nodes': 500,
+            'min_edge_weight': 1,
+            'betweenness_sample_pivots': 100,
+            'exact_network_metrics_max_nodes': 200,
+            'anomaly_rolling_window': 30,
+            'anomaly_zscore_threshold': 3.0
         }
         
         self._initialize_models()
@@ -119,23 +132,14 @@ class PredictiveAnalyticsEngine:
     def _initialize_models(self):
         """Inicializa modelos de ML e NLP"""
         
-        # Carrega modelo SpaCy para português
+        # Modelos somente-leitura vêm do cache por processo (compartilhado com os
+        # workers do gunicorn quando carregado no master, ver engine/shared_models.py)
         if HAS_SPACY:
-            try:
-                self.nlp_model = spacy.load("pt_core_news_sm")
-                logger.info("✅ Modelo SpaCy português carregado")
-            except OSError:
-                try:
-                    self.nlp_model = spacy.load("pt_core_news_lg")
-                    logger.info("✅ Modelo SpaCy português (large) carregado")
-                except OSError:
-                    logger.warning("⚠️ Modelo SpaCy não encontrado. Execute: python -m spacy download pt_core_news_sm")
-                    self.nlp_model = None
+            self.nlp_model = shared_models.get_nlp_model()
         
         # Inicializa analisador de sentimento
         if HAS_VADER:
-            self.sentiment_analyzer = SentimentIntensityAnalyzer()
-            logger.info("✅ Analisador de sentimento VADER carregado")
+            self.sentiment_analyzer = shared_models.get_sentiment_analyzer()
         
         # Inicializa TF-IDF
         if HAS_SKLEARN:
@@ -417,16 +421,12 @@ class PredictiveAnalyticsEngine:
             logger.warning("⚠️ Dados temporais insuficientes para análise")
             return results
 
-        results["data_points_analyzed"] = len(temporal_data)
-
         try:
-            # Converte para DataFrame para análise
-            df = pd.DataFrame(temporal_data)
+            # Um único DataFrame tipado (índice temporal ordenado, valores float64) para toda a fase
+            df = self._build_temporal_frame(temporal_data)
+            results["data_points_analyzed"] = len(df)
             
-            if 'timestamp' in df.columns and len(df) >= self.config['min_data_points_prediction']:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                df = df.sort_values('timestamp')
-                
+            if len(df) >= self.config['min_data_points_prediction']:
                 # Análise de crescimento
                 growth_analysis = self._analyze_growth_patterns(df)
                 results["growth_rates"] = growth_analysis
@@ -449,8 +449,8 @@ class PredictiveAnalyticsEngine:
                 results["anomaly_detection"] = anomalies
                 
                 # Modelos de previsão
-                if HAS_PROPHET and len(df) >= 10:
-                    forecast = self._create_forecast_models(df)
+                if len(df) >= 10:
+                    forecast = self._create_forecast_models(df.reset_index())
                     results["forecast_models"] = forecast
 
         except Exception as e:
@@ -478,15 +478,20 @@ class PredictiveAnalyticsEngine:
             logger.warning("⚠️ OCR não disponível - análise visual limitada")
             return results
 
-        files_dir = Path(f"analyses_data/files/{session_id}")
+        files_dir = Path(f"analyses_data/files/{session_dir.name}")
         if not files_dir.exists():
             logger.info("📂 Diretório de screenshots não encontrado")
             return results
 
         extracted_texts = []
         visual_features = []
+        thumbnails = []
+        thumbnail_names = []
+        thumb_size = self.config['color_thumbnail_size']
 
-        for img_file in files_dir.glob("*.png"):
+        # Screenshots visualmente idênticos passam uma vez só por OCR e análise de cores
+        screenshot_files = perceptual_image_index.dedupe(screenshot_encoder.list_screenshots(files_dir), session_dir.name, 'screenshot')
+        for img_file in map(Path, screenshot_files):
             try:
                 logger.info(f"🔍 Analisando imagem: {img_file.name}")
                 
@@ -503,10 +508,9 @@ class PredictiveAnalyticsEngine:
                         "word_count": len(ocr_text.split())
                     })
                 
-                # Análise de cores (se OpenCV disponível)
-                if HAS_OPENCV:
-                    color_analysis = self._analyze_image_colors(img_file)
-                    results["color_analysis"][img_file.name] = color_analysis
+                # Miniatura para a análise de cores em lote (feita após o loop)
+                thumbnails.append(np.asarray(image.convert("RGB").resize((thumb_size, thumb_size)), dtype=np.uint8))
+                thumbnail_names.append(img_file.name)
                 
                 # Análise de layout e elementos UI
                 ui_elements = self._detect_ui_elements(ocr_text)
@@ -526,6 +530,13 @@ class PredictiveAnalyticsEngine:
                 logger.error(f"❌ Erro na análise visual de {img_file.name}: {e}")
                 continue
 
+        # Análise de cores em lote: um único passe sobre todas as miniaturas da sessão
+        if thumbnails:
+            batch_colors = self._analyze_image_colors_batch(np.stack(thumbnails))
+            for name, palette in zip(thumbnail_names, batch_colors["per_image"]):
+                results["color_analysis"][name] = palette
+            results["session_palette"] = batch_colors["session_palette"]
+
         # Análise agregada do texto extraído
         if extracted_texts:
             combined_text = " ".join(extracted_texts)
@@ -563,24 +574,12 @@ class PredictiveAnalyticsEngine:
             # Carrega dados de entidades e relacionamentos
             entities_data = self._extract_entities_relationships(session_dir)
             
-            if not entities_data:
+            if not entities_data or not entities_data['entities']:
                 logger.warning("⚠️ Dados insuficientes para análise de rede")
                 return results
 
-            # Cria grafo
-            G = nx.Graph()
-            
-            # Adiciona nós (entidades)
-            for entity in entities_data['entities']:
-                G.add_node(entity['name'], **entity['attributes'])
-            
-            # Adiciona arestas (relacionamentos)
-            for relationship in entities_data['relationships']:
-                G.add_edge(
-                    relationship['source'], 
-                    relationship['target'], 
-                    weight=relationship['strength']
-                )
+            # Cria grafo ponderado (arestas duplicadas agregadas e nós podados por peso)
+            G = self._build_entity_graph(entities_data)
 
             results["network_nodes"] = G.number_of_nodes()
             results["network_edges"] = G.number_of_edges()
@@ -588,24 +587,37 @@ class PredictiveAnalyticsEngine:
 
             # Métricas de centralidade
             if G.number_of_nodes() > 0:
+                n_nodes = G.number_of_nodes()
+                exact_metrics = n_nodes <= self.config['exact_network_metrics_max_nodes']
+                pivots = min(n_nodes, self.config['betweenness_sample_pivots'])
+
                 centrality = {
-                    "betweenness": dict(nx.betweenness_centrality(G)),
-                    "closeness": dict(nx.closeness_centrality(G)),
-                    "degree": dict(nx.degree_centrality(G)),
-                    "eigenvector": dict(nx.eigenvector_centrality(G, max_iter=1000))
+                    # Betweenness amostrada por k pivôs (exata quando k == n); o peso é
+                    # força de co-ocorrência, não distância, por isso os caminhos são não ponderados
+                    "betweenness": dict(nx.betweenness_centrality(G, k=pivots, seed=42)),
+                    "degree": dict(nx.degree_centrality(G))
                 }
+                if exact_metrics:
+                    centrality["closeness"] = dict(nx.closeness_centrality(G))
+                try:
+                    centrality["eigenvector"] = dict(nx.eigenvector_centrality(G, max_iter=1000, weight="weight"))
+                except Exception as e:
+                    logger.warning(f"⚠️ Centralidade de autovetor não convergiu: {e}")
                 results["centrality_metrics"] = centrality
-                
-                # Detecção de comunidades
-                communities = list(nx.community.greedy_modularity_communities(G))
+
+                # Detecção de comunidades (Louvain)
+                communities = nx.community.louvain_communities(G, weight="weight", seed=42)
                 results["community_detection"] = {
                     "num_communities": len(communities),
-                    "modularity": nx.community.modularity(G, communities),
+                    "modularity": nx.community.modularity(G, communities, weight="weight"),
                     "communities": [list(community) for community in communities]
                 }
-                
-                # Coeficiente de clustering
-                results["clustering_coefficient"] = nx.average_clustering(G)
+
+                # Coeficiente de clustering (aproximado em grafos grandes)
+                if exact_metrics:
+                    results["clustering_coefficient"] = nx.average_clustering(G)
+                else:
+                    results["clustering_coefficient"] = nx.approximation.average_clustering(G, trials=1000, seed=42)
 
         except Exception as e:
             logger.error(f"❌ Erro na análise de rede: {e}")
@@ -1002,206 +1014,189 @@ class PredictiveAnalyticsEngine:
             try:
                 with open(f, 'r', encoding='utf-8') as infile:
                     data = json.load(infile)
+                    # Timestamps ficam como texto: a conversão e a ordenação são feitas
+                    # de uma vez em _build_temporal_frame
                     if isinstance(data, list):
-                        for item in data:
-                            if "timestamp" in item and "value" in item:
-                                try:
-                                    item["timestamp"] = datetime.fromisoformat(item["timestamp"])
-                                    temporal_data.append(item)
-                                except ValueError:
-                                    continue
+                        temporal_data.extend(
+                            item for item in data
+                            if isinstance(item, dict) and "timestamp" in item and "value" in item
+                        )
                     elif isinstance(data, dict):
                         if "timestamp" in data and "value" in data:
-                            try:
-                                data["timestamp"] = datetime.fromisoformat(data["timestamp"])
-                                temporal_data.append(data)
-                            except ValueError:
-                                continue
+                            temporal_data.append(data)
             except json.JSONDecodeError:
                 continue
         
-        # Ordena os dados por timestamp
-        temporal_data.sort(key=lambda x: x["timestamp"])
         return temporal_data
 
+    def _build_temporal_frame(self, temporal_data: Any) -> pd.DataFrame:
+        """
+        Converte os dados temporais em um DataFrame tipado: índice DatetimeIndex ordenado
+        ("timestamp") e coluna "value" float64. Registros com timestamp ou valor inválido
+        são descartados. Um DataFrame já tipado é devolvido sem cópia.
+        """
+        if (isinstance(temporal_data, pd.DataFrame) and isinstance(temporal_data.index, pd.DatetimeIndex)
+                and "value" in temporal_data.columns):
+            return temporal_data
+
+        raw = temporal_data if isinstance(temporal_data, pd.DataFrame) else pd.DataFrame(temporal_data)
+        if raw.empty or "timestamp" not in raw.columns or "value" not in raw.columns:
+            return pd.DataFrame({"value": pd.Series(dtype=np.float64)}, index=pd.DatetimeIndex([], name="timestamp"))
+
+        timestamps = pd.to_datetime(raw["timestamp"], errors="coerce", format="ISO8601", utc=True).dt.tz_convert(None)
+        values = pd.to_numeric(raw["value"], errors="coerce").to_numpy(dtype=np.float64)
 
+        valid = timestamps.notna().to_numpy() & ~np.isnan(values)
+        index = pd.DatetimeIndex(timestamps.to_numpy()[valid], name="timestamp")
+        frame = pd.DataFrame({"value": values[valid]}, index=index)
+        return frame.sort_index(kind="stable")
 
 
-    def _analyze_growth_patterns(self, temporal_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+
+
+    def _analyze_growth_patterns(self, temporal_data: Any) -> Dict[str, Any]:
         """Analisa padrões de crescimento em dados temporais."""
-        if not temporal_data:
+        df = self._build_temporal_frame(temporal_data)
+        if df.empty:
             return {}
 
-        df = pd.DataFrame(temporal_data)
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df = df.set_index("timestamp").sort_index()
-
+        values = df["value"].to_numpy()
         growth_patterns = {}
-        # Exemplo: cálculo de crescimento diário, semanal, mensal
-        # Isso pode ser expandido para diferentes granularidades e métricas
-        if "value" in df.columns:
-            # Crescimento diário
-            daily_growth = df["value"].diff().mean()
-            growth_patterns["daily_average_growth"] = daily_growth
-
-            # Crescimento percentual mensal (exemplo simplificado)
-            monthly_resampled = df["value"].resample("M").last()
-            if len(monthly_resampled) > 1:
-                monthly_growth_rate = (monthly_resampled.iloc[-1] - monthly_resampled.iloc[-2]) / monthly_resampled.iloc[-2]
-                growth_patterns["monthly_growth_rate"] = monthly_growth_rate
+
+        # Crescimento médio por período
+        if len(values) > 1:
+            growth_patterns["daily_average_growth"] = float(np.diff(values).mean())
+
+        # Crescimento percentual mensal: último valor de cada mês, dois últimos meses
+        month_key = df.index.year * 12 + df.index.month
+        month_last = np.flatnonzero(np.r_[month_key[1:] != month_key[:-1], True])
+        if len(month_last) > 1:
+            current, previous = values[month_last[-1]], values[month_last[-2]]
+            if previous != 0:
+                growth_patterns["monthly_growth_rate"] = float((current - previous) / previous)
 
         return growth_patterns
 
 
 
 
-    def _detect_seasonality(self, temporal_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Detecta padrões de sazonalidade em dados temporais."""
-        if not temporal_data:
+    def _detect_seasonality(self, temporal_data: Any) -> Dict[str, Any]:
+        """Detecta padrões de sazonalidade em dados temporais (médias por calendário + FFT)."""
+        df = self._build_temporal_frame(temporal_data)
+        if df.empty:
             return {}
 
-        df = pd.DataFrame(temporal_data)
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df = df.set_index("timestamp").sort_index()
-
         seasonality_patterns = {}
 
-        if "value" in df.columns and len(df) > 2 * 7: # Mínimo de duas semanas para detectar sazonalidade semanal
-            # Exemplo: Sazonalidade semanal (média por dia da semana)
-            df["day_of_week"] = df.index.dayofweek
-            weekly_seasonality = df.groupby("day_of_week")["value"].mean().to_dict()
-            seasonality_patterns["weekly_seasonality"] = weekly_seasonality
-
-            # Exemplo: Sazonalidade mensal (média por mês)
-            df["month"] = df.index.month
-            monthly_seasonality = df.groupby("month")["value"].mean().to_dict()
-            seasonality_patterns["monthly_seasonality"] = monthly_seasonality
+        if len(df) > 2 * 7: # Mínimo de duas semanas para detectar sazonalidade semanal
+            values = df["value"]
+            # Sazonalidade semanal (média por dia da semana)
+            seasonality_patterns["weekly_seasonality"] = values.groupby(df.index.dayofweek).mean().to_dict()
+
+            # Sazonalidade mensal (média por mês)
+            seasonality_patterns["monthly_seasonality"] = values.groupby(df.index.month).mean().to_dict()
+
+            # Periodicidade dominante via FFT da série diária sem tendência
+            daily = values.resample("D").mean().interpolate(limit_direction="both").to_numpy()
+            if len(daily) >= 14:
+                t = np.arange(len(daily))
+                detrended = daily - np.polyval(np.polyfit(t, daily, 1), t)
+                power = np.abs(np.fft.rfft(detrended)) ** 2
+                freqs = np.fft.rfftfreq(len(daily), d=1.0)
+                power[0] = 0.0
+                total_power = power.sum()
+                if total_power > 0:
+                    top = np.argsort(power)[::-1][:3]
+                    seasonality_patterns["dominant_periods_days"] = [
+                        {"period_days": float(1.0 / freqs[i]), "power_share": float(power[i] / total_power)}
+                        for i in top if freqs[i] > 0
+                    ]
+                    seasonality_patterns["seasonality_strength"] = float(power[top[0]] / total_power)
 
         return seasonality_patterns
 
 
 
 
-    def _calculate_velocity_of_change(self, temporal_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _calculate_velocity_of_change(self, temporal_data: Any) -> Dict[str, Any]:
         """Calcula a velocidade de mudança de uma métrica ao longo do tempo."""
-        if not temporal_data or len(temporal_data) < 2:
+        df = self._build_temporal_frame(temporal_data)
+        if len(df) < 2:
             return {}
 
-        df = pd.DataFrame(temporal_data)
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df = df.set_index("timestamp").sort_index()
-
-        velocity_of_change = {}
-        if "value" in df.columns:
-            # Calcula a primeira derivada (taxa de mudança)
-            df["change"] = df["value"].diff()
-            velocity_of_change["average_change_per_period"] = df["change"].mean()
-            velocity_of_change["max_change_per_period"] = df["change"].max()
-            velocity_of_change["min_change_per_period"] = df["change"].min()
-
-        return velocity_of_change
+        # Primeira derivada (taxa de mudança)
+        change = np.diff(df["value"].to_numpy())
+        return {
+            "average_change_per_period": float(change.mean()),
+            "max_change_per_period": float(change.max()),
+            "min_change_per_period": float(change.min())
+        }
 
 
 
 
-    def _calculate_trend_acceleration(self, temporal_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _calculate_trend_acceleration(self, temporal_data: Any) -> Dict[str, Any]:
         """Calcula a aceleração da tendência (segunda derivada)."""
-        if not temporal_data or len(temporal_data) < 3:
+        df = self._build_temporal_frame(temporal_data)
+        if len(df) < 3:
             return {}
 
-        df = pd.DataFrame(temporal_data)
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df = df.set_index("timestamp").sort_index()
-
-        trend_acceleration = {}
-        if "value" in df.columns:
-            # Calcula a primeira derivada (velocidade)
-            df["velocity"] = df["value"].diff()
-            # Calcula a segunda derivada (aceleração)
-            df["acceleration"] = df["velocity"].diff()
-            trend_acceleration["average_acceleration"] = df["acceleration"].mean()
-            trend_acceleration["max_acceleration"] = df["acceleration"].max()
-            trend_acceleration["min_acceleration"] = df["acceleration"].min()
-
-        return trend_acceleration
+        acceleration = np.diff(df["value"].to_numpy(), n=2)
+        return {
+            "average_acceleration": float(acceleration.mean()),
+            "max_acceleration": float(acceleration.max()),
+            "min_acceleration": float(acceleration.min())
+        }
 
 
 
 
-    def _detect_anomalies(self, temporal_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Detecta anomalias em dados temporais usando um método simples (e.g., IQR)."""
-        if not temporal_data or len(temporal_data) < 5:
+    def _detect_anomalies(self, temporal_data: Any) -> List[Dict[str, Any]]:
+        """Detecta anomalias por IQR global e por z-score em janela móvel."""
+        df = self._build_temporal_frame(temporal_data)
+        if len(df) < 5:
             return []
 
-        df = pd.DataFrame(temporal_data)
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df = df.set_index("timestamp").sort_index()
-
-        anomalies = []
-        if "value" in df.columns:
-            Q1 = df["value"].quantile(0.25)
-            Q3 = df["value"].quantile(0.75)
-            IQR = Q3 - Q1
-            
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-
-            for index, row in df.iterrows():
-                if row["value"] < lower_bound or row["value"] > upper_bound:
-                    anomalies.append({"timestamp": index.isoformat(), "value": row["value"], "type": "outlier"})
-
+        values = df["value"]
+        q1, q3 = values.quantile(0.25), values.quantile(0.75)
+        iqr = q3 - q1
+        outlier = ((values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)).to_numpy()
+
+        # z-score em relação à janela anterior (sem incluir o próprio ponto)
+        window = self.config['anomaly_rolling_window']
+        history = values.shift(1).rolling(window, min_periods=max(3, window // 2))
+        std = history.std().to_numpy()
+        zscore = np.divide(values.to_numpy() - history.mean().to_numpy(), std,
+                           out=np.zeros(len(values)), where=std > 0)
+        local_spike = (np.abs(zscore) > self.config['anomaly_zscore_threshold']) & ~outlier
+
+        timestamps = df.index
+        anomalies = [
+            {"timestamp": timestamps[i].isoformat(), "value": float(values.iat[i]), "type": "outlier"}
+            for i in np.flatnonzero(outlier)
+        ]
+        anomalies.extend(
+            {"timestamp": timestamps[i].isoformat(), "value": float(values.iat[i]), "type": "rolling_zscore",
+             "zscore": float(zscore[i])}
+            for i in np.flatnonzero(local_spike)
+        )
+        anomalies.sort(key=lambda anomaly: anomaly["timestamp"])
         return anomalies
 
 
 
 
     def _create_forecast_models(self, temporal_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Cria modelos de previsão usando Prophet (se disponível) ou regressão linear."""
-        forecast_models = {}
-        if not temporal_data or len(temporal_data) < self.config["min_data_points_prediction"]:
+        """Cria modelos de previsão (Holt/regressão linear em séries curtas, Prophet nas longas) com cache."""
+        if temporal_data is None or len(temporal_data) < self.config["min_data_points_prediction"]:
             logger.warning("⚠️ Dados insuficientes para criar modelos de previsão.")
-            return forecast_models
-
-        df = pd.DataFrame(temporal_data)
-        df["ds"] = pd.to_datetime(df["timestamp"])
-        df["y"] = df["value"]
-
-        if HAS_PROPHET:
-            try:
-                m = Prophet()
-                m.fit(df)
-                future = m.make_future_dataframe(periods=self.config["prediction_horizon_days"])
-                forecast = m.predict(future)
-                forecast_models["prophet_forecast"] = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].to_dict(orient="records")
-                logger.info("✅ Modelo Prophet criado e previsão gerada.")
-            except Exception as e:
-                logger.error(f"❌ Erro ao criar modelo Prophet: {e}")
-        
-        if HAS_SKLEARN:
-            try:
-                # Regressão Linear como fallback ou modelo adicional
-                df["ordinal_date"] = df["ds"].apply(lambda date: date.toordinal())
-                X = df[["ordinal_date"]]
-                y = df["y"]
-
-                if len(X) > 1:
-                    model = LinearRegression()
-                    model.fit(X, y)
-
-                    # Prever para o futuro
-                    last_date_ordinal = df["ordinal_date"].max()
-                    future_dates_ordinal = np.array([last_date_ordinal + i for i in range(1, self.config["prediction_horizon_days"] + 1)]).reshape(-1, 1)
-                    future_predictions = model.predict(future_dates_ordinal)
-                    
-                    forecast_models["linear_regression_forecast"] = [
-                        {"ds": datetime.fromordinal(int(d)).isoformat(), "yhat": p}
-                        for d, p in zip(future_dates_ordinal.flatten(), future_predictions)
-                    ]
-                    logger.info("✅ Modelo de Regressão Linear criado e previsão gerada.")
-            except Exception as e:
-                logger.error(f"❌ Erro ao criar modelo de Regressão Linear: {e}")
+            return {}
 
-        return forecast_models
+        try:
+            return forecast_engine.forecast(temporal_data, self.config["prediction_horizon_days"])
+        except Exception as e:
+            logger.error(f"❌ Erro ao criar modelos de previsão: {e}")
+            return {}
 
 
 
@@ -1255,6 +1250,90 @@ class PredictiveAnalyticsEngine:
 
 
 
+    def _analyze_image_colors_batch(self, thumbnails: np.ndarray) -> Dict[str, Any]:
+        """
+        Calcula as paletas dominantes de várias imagens em um único passe vetorizado.
+
+        Todas as miniaturas compartilham um mesmo dicionário de cores (MiniBatchKMeans
+        quando o scikit-learn está disponível, quantização por histograma caso contrário),
+        e as paletas por imagem saem de uma contagem agrupada dos rótulos.
+
+        Args:
+            thumbnails: Array uint8 (n_imagens, altura, largura, 3) em RGB
+
+        Returns:
+            Dict com "per_image" (lista de {"dominant_colors": [...]}, na ordem de entrada)
+            e "session_palette" (paleta agregada de todas as imagens)
+        """
+        n_images = thumbnails.shape[0]
+        if n_images == 0:
+            return {"per_image": [], "session_palette": []}
+
+        pixels = thumbnails.reshape(-1, 3)
+        pixels_per_image = pixels.shape[0] // n_images
+        image_index = np.repeat(np.arange(n_images), pixels_per_image)
+
+        try:
+            if HAS_SKLEARN:
+                labels, centers = self._quantize_colors_kmeans(pixels)
+            else:
+                labels, centers = self._quantize_colors_histogram(pixels)
+        except Exception as e:
+            logger.error(f"❌ Erro na quantização de cores em lote: {e}")
+            return {"per_image": [{} for _ in range(n_images)], "session_palette": []}
+
+        n_colors = centers.shape[0]
+        counts = np.bincount(image_index * n_colors + labels, minlength=n_images * n_colors).reshape(n_images, n_colors)
+        centers = np.clip(np.rint(centers), 0, 255).astype(np.uint8)
+
+        top_n = min(self.config['n_dominant_colors'], n_colors)
+        top_colors = np.argsort(-counts, axis=1, kind="stable")[:, :top_n]
+
+        per_image = []
+        for row, color_ids in zip(counts, top_colors):
+            per_image.append({
+                "dominant_colors": [
+                    {"rgb": centers[c].tolist(), "percentage": float(row[c] / pixels_per_image * 100)}
+                    for c in color_ids if row[c] > 0
+                ]
+            })
+
+        session_counts = counts.sum(axis=0)
+        session_top = np.argsort(-session_counts, kind="stable")[:self.config['n_session_palette_colors']]
+        session_palette = [
+            {"rgb": centers[c].tolist(), "percentage": float(session_counts[c] / pixels.shape[0] * 100)}
+            for c in session_top if session_counts[c] > 0
+        ]
+
+        return {"per_image": per_image, "session_palette": session_palette}
+
+    def _quantize_colors_kmeans(self, pixels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Quantiza pixels RGB com um único MiniBatchKMeans para a sessão inteira."""
+        data = pixels.astype(np.float32)
+
+        # Ajusta numa amostra e rotula todos os pixels de uma vez
+        rng = np.random.default_rng(42)
+        sample = data[rng.choice(len(data), size=min(len(data), 50000), replace=False)]
+        n_colors = min(self.config['n_session_palette_colors'] * 2, len(np.unique(sample, axis=0)))
+        model = MiniBatchKMeans(n_clusters=n_colors, batch_size=4096, n_init=3, random_state=42)
+        model.fit(sample)
+
+        return model.predict(data), model.cluster_centers_
+
+    def _quantize_colors_histogram(self, pixels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Quantiza pixels RGB em 8 níveis por canal (512 cores) e usa a cor média de cada bin."""
+        levels = (pixels >> 5).astype(np.int64)
+        codes = (levels[:, 0] << 6) | (levels[:, 1] << 3) | levels[:, 2]
+
+        used, labels = np.unique(codes, return_inverse=True)
+        bin_counts = np.bincount(labels, minlength=len(used)).astype(np.float64)
+        centers = np.stack([
+            np.bincount(labels, weights=pixels[:, channel], minlength=len(used)) / bin_counts
+            for channel in range(3)
+        ], axis=1)
+
+        return labels.reshape(-1), centers
+
     def _detect_ui_elements(self, text_content: str) -> Dict[str, Any]:
         """Detecta elementos de UI em texto extraído de imagens (OCR)."""
         # Esta é uma implementação simplificada baseada em padrões de texto.
@@ -1393,43 +1472,99 @@ class PredictiveAnalyticsEngine:
 
 
     def _extract_entities_relationships(self, session_dir: Path) -> Dict[str, Any]:
-        """Extrai entidades e relacionamentos de dados textuais na sessão."""
-        entities = []
-        relationships = []
+        """Extrai entidades e relacionamentos (co-ocorrências agregadas) de dados textuais na sessão."""
+        entities = {}
+        edge_weights = Counter()
 
         # Simula a leitura de dados textuais para extração de entidades
         textual_data = self._gather_comprehensive_textual_data(session_dir)
 
         if not HAS_SPACY or not self.nlp_model:
             logger.warning("⚠️ SpaCy não disponível para extração de entidades e relacionamentos.")
-            return {"entities": entities, "relationships": relationships}
+            return {"entities": [], "relationships": []}
 
         for source, text_content in textual_data.items():
             try:
                 doc = self.nlp_model(text_content[:1000000]) # Limita para performance
                 
-                # Extrai entidades
+                # Extrai entidades (uma entrada por nome, com contagem de menções)
                 for ent in doc.ents:
-                    entities.append({"name": ent.text.strip(), "type": ent.label_, "source": source})
+                    name = ent.text.strip()
+                    if not name:
+                        continue
+                    entity = entities.setdefault(name, {"name": name, "type": ent.label_, "sources": set(), "mentions": 0})
+                    entity["sources"].add(source)
+                    entity["mentions"] += 1
                 
                 # Extrai relacionamentos (simplificado: co-ocorrência de entidades na mesma frase)
                 for sentence in doc.sents:
-                    sentence_entities = [ent.text.strip() for ent in sentence.ents if ent.label_ in ["PERSON", "ORG", "GPE"]]
-                    if len(sentence_entities) >= 2:
-                        # Cria relacionamentos entre todas as pares de entidades na frase
-                        for i in range(len(sentence_entities)):
-                            for j in range(i + 1, len(sentence_entities)):
-                                relationships.append({
-                                    "source": sentence_entities[i],
-                                    "target": sentence_entities[j],
-                                    "type": "co-occurrence",
-                                    "strength": 1.0 # Pode ser aprimorado com análise de dependência
-                                })
+                    sentence_entities = sorted({ent.text.strip() for ent in sentence.ents if ent.label_ in ["PERSON", "ORG", "GPE"]} - {""})
+                    # Cada par distinto da frase soma 1 ao peso da aresta
+                    for i in range(len(sentence_entities)):
+                        for j in range(i + 1, len(sentence_entities)):
+                            edge_weights[(sentence_entities[i], sentence_entities[j])] += 1
             except Exception as e:
                 logger.error(f"❌ Erro ao extrair entidades/relacionamentos de {source}: {e}")
                 continue
 
-        return {"entities": entities, "relationships": relationships}
+        return {
+            "entities": [
+                {**entity, "sources": sorted(entity["sources"])} for entity in entities.values()
+            ],
+            "relationships": [
+                {"source": a, "target": b, "type": "co-occurrence", "strength": float(weight)}
+                for (a, b), weight in edge_weights.items()
+            ]
+        }
+
+    def _build_entity_graph(self, entities_data: Dict[str, Any]) -> "nx.Graph":
+        """
+        Constrói o grafo de entidades a partir de uma matriz de adjacência esparsa.
+
+        Arestas repetidas são somadas, arestas abaixo de ``min_edge_weight`` são
+        descartadas e apenas os ``max_network_nodes`` nós de maior peso (força
+        ponderada + menções) são mantidos, limitando o custo das métricas seguintes.
+        """
+        relationships = entities_data.get("relationships", [])
+        mentions = {entity["name"]: entity.get("mentions", 1) for entity in entities_data.get("entities", [])}
+
+        names = sorted(set(mentions) | {r["source"] for r in relationships} | {r["target"] for r in relationships})
+        index = {name: i for i, name in enumerate(names)}
+        n = len(names)
+        max_nodes = self.config['max_network_nodes']
+
+        if not HAS_SCIPY or n == 0:
+            G = nx.Graph()
+            G.add_nodes_from(names)
+            for r in relationships:
+                weight = r["strength"] + (G[r["source"]][r["target"]]["weight"] if G.has_edge(r["source"], r["target"]) else 0)
+                G.add_edge(r["source"], r["target"], weight=weight)
+            if n > max_nodes:
+                strength = dict(G.degree(weight="weight"))
+                keep = sorted(names, key=lambda name: (strength[name] + mentions.get(name, 0)), reverse=True)[:max_nodes]
+                G = G.subgraph(keep).copy()
+            return G
+
+        rows = np.fromiter((index[r["source"]] for r in relationships), dtype=np.int64, count=len(relationships))
+        cols = np.fromiter((index[r["target"]] for r in relationships), dtype=np.int64, count=len(relationships))
+        weights = np.fromiter((r["strength"] for r in relationships), dtype=np.float64, count=len(relationships))
+
+        # COO -> CSR soma as entradas duplicadas; a simetrização gera o grafo não-direcionado
+        adjacency = sparse.coo_matrix((weights, (rows, cols)), shape=(n, n)).tocsr()
+        adjacency = adjacency + adjacency.T
+        adjacency.setdiag(0)
+        adjacency.data[adjacency.data < self.config['min_edge_weight']] = 0
+        adjacency.eliminate_zeros()
+
+        if n > max_nodes:
+            node_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+            node_weight += np.array([mentions.get(name, 0) for name in names], dtype=np.float64)
+            keep = np.sort(np.argpartition(-node_weight, max_nodes - 1)[:max_nodes])
+            adjacency = adjacency[keep][:, keep]
+            names = [names[i] for i in keep]
+
+        G = nx.from_scipy_sparse_array(adjacency, edge_attribute="weight")
+        return nx.relabel_nodes(G, dict(enumerate(names)), copy=False)
 
 
 
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Shared Models
+Modelos NLP somente-leitura carregados uma vez por processo e compartilhados entre workers
+"""
+
+import gc
+import logging
+import threading
+from typing import Dict, Any
+
+try:
+    import spacy
+    HAS_SPACY = True
+except ImportError:
+    HAS_SPACY = False
+
+try:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    HAS_VADER = True
+except ImportError:
+    HAS_VADER = False
+
+logger = logging.getLogger(__name__)
+
+# Cache por processo. Sob gunicorn com preload_app, é preenchido no master antes do
+# fork e herdado pelos workers via copy-on-write, sem recarregar os modelos.
+_models: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def get_nlp_model():
+    """Retorna o modelo SpaCy português (sm, com fallback para lg) ou None"""
+    with _lock:
+        if "nlp" not in _models:
+            _models["nlp"] = _load_spacy_model()
+        return _models["nlp"]
+
+
+def get_sentiment_analyzer():
+    """Retorna o analisador VADER compartilhado ou None"""
+    with _lock:
+        if "vader" not in _models:
+            _models["vader"] = SentimentIntensityAnalyzer() if HAS_VADER else None
+            if _models["vader"] is not None:
+                logger.info("✅ Analisador de sentimento VADER carregado")
+        return _models["vader"]
+
+
+def _load_spacy_model():
+    if not HAS_SPACY:
+        return None
+    try:
+        model = spacy.load("pt_core_news_sm")
+        logger.info("✅ Modelo SpaCy português carregado")
+        return model
+    except OSError:
+        try:
+            model = spacy.load("pt_core_news_lg")
+            logger.info("✅ Modelo SpaCy português (large) carregado")
+            return model
+        except OSError:
+            logger.warning("⚠️ Modelo SpaCy não encontrado. Execute: python -m spacy download pt_core_news_sm")
+            return None
+
+
+def models_loaded() -> Dict[str, bool]:
+    """Indica quais modelos já estão no cache do processo"""
+    return {name: _models.get(name) is not None for name in ("nlp", "vader")}
+
+
+def warm_shared_models(freeze: bool = True) -> Dict[str, bool]:
+    """
+    Carrega todos os modelos somente-leitura no processo atual.
+
+    Chamado no master do gunicorn (preload_app) antes do fork. Com ``freeze=True``,
+    executa ``gc.collect()`` + ``gc.freeze()`` para mover os objetos existentes para a
+    geração permanente: o coletor dos workers deixa de percorrê-los e não suja as
+    páginas compartilhadas.
+    """
+    get_nlp_model()
+    get_sentiment_analyzer()
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+        logger.info(f"🧊 gc.freeze(): {gc.get_freeze_count()} objetos congelados")
+
+    loaded = models_loaded()
+    logger.info(f"🔥 Modelos compartilhados aquecidos: {loaded}")
+    return loaded
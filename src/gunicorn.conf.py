@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Configuração do Gunicorn
+Preload do app e dos modelos NLP no master para compartilhá-los (copy-on-write) com os workers
+
+Uso (a partir de src/):
+    gunicorn -c gunicorn.conf.py "run:create_app()"
+"""
+
+import os
+import gc
+import logging
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '300'))
+
+# O app é importado no master; os modelos carregados em when_ready são herdados pelos workers
+preload_app = True
+
+# Sinaliza ao create_app que o aquecimento em thread deve esperar o fork (ver post_fork)
+os.environ.setdefault('GUNICORN_PRELOAD', '1')
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def _rss_summary() -> str:
+    from services.service_registry import get_memory_report
+    memory = get_memory_report().get('current_process', {})
+    return f"rss={memory.get('rss_mb')}MB uss={memory.get('uss_mb')}MB"
+
+
+def when_ready(server):
+    """Master: carrega os modelos somente-leitura uma única vez e congela o heap"""
+    if os.getenv('PRELOAD_MODELS', 'true').lower() != 'true':
+        return
+
+    logger.info(f"📏 Master antes do aquecimento: {_rss_summary()}")
+    from engine.shared_models import warm_shared_models
+    warm_shared_models(freeze=True)
+    logger.info(f"📏 Master após aquecimento: {_rss_summary()}")
+
+
+def pre_fork(server, worker):
+    """Master: congela objetos criados desde o último fork para não serem tocados pelo GC do worker"""
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Worker: reporta memória logo após o fork e aquece serviços, se configurado"""
+    logger.info(f"📏 Worker {worker.pid} após fork: {_rss_summary()}")
+
+    warmup = os.getenv('SERVICE_WARMUP', '').strip()
+    if warmup:
+        from services.service_registry import service_registry
+        names = None if warmup == 'all' else [name.strip() for name in warmup.split(',') if name.strip()]
+        service_registry.warm_up(names, background=True)
@@ -11,12 +11,15 @@ import uuid
 import random
 from datetime import datetime
 from flask import Blueprint, request, jsonify
-from services.master_analysis_orchestrator import master_analysis_orchestrator
-from services.auto_save_manager import salvar_etapa
-from services.progress_tracker_enhanced import progress_tracker
-from services.real_search_orchestrator import real_search_orchestrator
-from services.viral_content_analyzer import viral_content_analyzer
-from services.enhanced_synthesis_engine import enhanced_synthesis_engine
+from services.service_registry import service_registry
+
+# Serviços carregados sob demanda (ver services/service_registry.py)
+master_analysis_orchestrator = service_registry.lazy('master_analysis_orchestrator')
+salvar_etapa = service_registry.lazy('salvar_etapa')
+progress_tracker = service_registry.lazy('progress_tracker')
+real_search_orchestrator = service_registry.lazy('real_search_orchestrator')
+viral_content_analyzer = service_registry.lazy('viral_content_analyzer')
+enhanced_synthesis_engine = service_registry.lazy('enhanced_synthesis_engine')
 
 logger = logging.getLogger(__name__)
 
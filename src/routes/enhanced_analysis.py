@@ -11,9 +11,12 @@ import uuid
 import json
 from datetime import datetime
 from flask import Blueprint, request, jsonify
-from services.ai_manager import ai_manager
-from services.massive_data_collector import massive_data_collector
-from services.auto_save_manager import salvar_etapa
+from services.service_registry import service_registry
+
+# Serviços carregados sob demanda (ver services/service_registry.py)
+ai_manager = service_registry.lazy('ai_manager')
+massive_data_collector = service_registry.lazy('massive_data_collector')
+salvar_etapa = service_registry.lazy('salvar_etapa')
 
 logger = logging.getLogger(__name__)
 
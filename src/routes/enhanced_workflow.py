@@ -20,29 +20,27 @@ from flask import Blueprint, request, jsonify, send_file
 
 # --- CORRECTED IMPORTS ---
 # Import the class, not a non-existent name
-from services.real_search_orchestrator import real_search_orchestrator
-from services.viral_content_analyzer import viral_content_analyzer
-from services.enhanced_synthesis_engine import enhanced_synthesis_engine
-from services.enhanced_module_processor import enhanced_module_processor
-from services.comprehensive_report_generator_v3 import comprehensive_report_generator_v3
-from services.auto_save_manager import salvar_etapa
-# Import the ViralImageFinder CLASS
-from services.viral_integration_service import ViralImageFinder
+from services.service_registry import service_registry
+
+# Serviços carregados sob demanda (ver services/service_registry.py)
+real_search_orchestrator = service_registry.lazy('real_search_orchestrator')
+viral_content_analyzer = service_registry.lazy('viral_content_analyzer')
+enhanced_synthesis_engine = service_registry.lazy('enhanced_synthesis_engine')
+enhanced_module_processor = service_registry.lazy('enhanced_module_processor')
+comprehensive_report_generator_v3 = service_registry.lazy('comprehensive_report_generator_v3')
+salvar_etapa = service_registry.lazy('salvar_etapa')
+# Instância global de ViralImageFinder definida em services.viral_integration_service
+viral_integration_service = service_registry.lazy('viral_integration_service')
+near_duplicate_detector = service_registry.lazy('near_duplicate_detector')
+session_corpus_index = service_registry.lazy('session_corpus_index')
+image_store = service_registry.lazy('image_store')
+perceptual_image_index = service_registry.lazy('perceptual_image_index')
+screenshot_encoder = service_registry.lazy('screenshot_encoder')
 
 logger = logging.getLogger(__name__)
 
 enhanced_workflow_bp = Blueprint('enhanced_workflow', __name__)
 
-# --- CREATE AN INSTANCE OF THE SERVICE ---
-# Create an instance of ViralImageFinder to use its methods.
-# Using the default config loading from the class __init__.
-# If you need specific config, pass it here.
-viral_integration_service = ViralImageFinder()
-
-# --- REST OF THE FILE REMAINS THE SAME ---
-# (The rest of your routes code follows exactly as before,
-# now using the correctly instantiated `viral_integration_service`)
-
 @enhanced_workflow_bp.route('/workflow/step1/start', methods=['POST'])
 def start_step1_collection():
     """ETAPA 1: Coleta Massiva de Dados com Screenshots"""
@@ -76,7 +74,9 @@ def start_step1_collection():
             "publico": publico,
             "query_original": query,
             "etapa": 1,
-            "workflow_type": "enhanced_v3"
+            "workflow_type": "enhanced_v3",
+            # Recaptura screenshots mesmo com renderização válida no cache entre sessões
+            "force_refresh": bool(data.get('force_refresh', False))
         }
 
         logger.info(f"🚀 ETAPA 1 INICIADA - Sessão: {session_id}")
@@ -102,7 +102,7 @@ def start_step1_collection():
                     # --- CORRECTED CALL ---
                     # Call the find_viral_images method which returns a list and filepath
                     viral_data = loop.run_until_complete(
-                        viral_integration_service.find_viral_images(query=query)
+                        viral_integration_service.find_viral_images(query=query, session_id=session_id)
                     )
                     # The method returns a tuple (List[ViralImage], str), extract list
                     viral_results_list = viral_data[0] if viral_data and len(viral_data) > 0 else []
@@ -150,7 +150,8 @@ def start_step1_collection():
                         viral_content_analyzer.analyze_and_capture_viral_content(
                             search_results=search_results,
                             session_id=session_id,
-                            max_captures=15
+                            max_captures=15,
+                            force_refresh=context['force_refresh']
                         )
                     )
 
@@ -173,6 +174,12 @@ def start_step1_collection():
                 # Salva o JSON massivo consolidado
                 salvar_etapa("etapa1_massive_data", massive_data_json, categoria="consolidated", session_id=session_id)
 
+                # Indexa o corpus uma única vez para as consultas por tópico dos módulos
+                try:
+                    session_corpus_index.build(session_id, massive_data_json.get("consolidated_text_content", {}))
+                except Exception as e:
+                    logger.warning(f"⚠️ Índice do corpus não construído: {e}")
+
                 # Salva resultado da etapa 1
                 salvar_etapa("etapa1_concluida", {
                     "session_id": session_id,
@@ -484,14 +491,15 @@ def execute_complete_workflow():
                         "publico": data.get('publico', ''),
                         "preco": data.get('preco', ''),
                         "objetivo_receita": data.get('objetivo_receita', ''),
-                        "workflow_type": "complete"
+                        "workflow_type": "complete",
+                        "force_refresh": bool(data.get('force_refresh', False))
                     }
 
                     # PRIMEIRA ETAPA: Busca viral
                     logger.info(f"🔥 Executando busca viral para: {query}")
                     # --- CORRECTED CALL ---
                     viral_data = loop.run_until_complete(
-                        viral_integration_service.find_viral_images(query=query)
+                        viral_integration_service.find_viral_images(query=query, session_id=session_id)
                     )
                     viral_results_list = viral_data[0] if viral_data and len(viral_data) > 0 else []
                     viral_results_dicts = [img.__dict__ for img in viral_results_list]
@@ -526,7 +534,8 @@ def execute_complete_workflow():
                     viral_analysis = loop.run_until_complete(
                         viral_content_analyzer.analyze_and_capture_viral_content(
                             search_results=search_results,
-                            session_id=session_id
+                            session_id=session_id,
+                            force_refresh=context['force_refresh']
                         )
                     )
 
@@ -690,7 +699,7 @@ def get_workflow_results(session_id):
         # Conta screenshots
         files_dir = f"analyses_data/files/{session_id}"
         if os.path.exists(files_dir):
-            screenshots = [f for f in os.listdir(files_dir) if f.endswith('.png')]
+            screenshots = [path.name for path in screenshot_encoder.list_screenshots(files_dir)]
             results["screenshots_captured"] = len(screenshots)
             results["screenshots_list"] = screenshots
 
@@ -828,6 +837,10 @@ def serve_viral_image(session_id, image_name):
         # and search for the filename.
         # This is fragile but might work if filenames are unique.
         potential_paths = [
+            # Referências da sessão no armazenamento de imagens (hardlinks para os blobs)
+            Path(image_store.sessions_dir) / session_id / image_name,
+            # Sem session_id (find_viral_images_sync) o caminho salvo é o próprio blob: store/<ab>/<sha>.<ext>
+            Path(image_store.blob_path(*image_name.rsplit('.', 1))) if '.' in image_name else None,
             Path(viral_integration_service.config.get('images_dir', 'downloaded_images')) / image_name,
             Path(viral_integration_service.config.get('screenshots_dir', 'screenshots')) / image_name,
             # Add other potential directories if needed
@@ -835,7 +848,7 @@ def serve_viral_image(session_id, image_name):
 
         image_path = None
         for p in potential_paths:
-            if p.exists():
+            if p and p.exists():
                 image_path = p
                 break
 
@@ -858,6 +871,12 @@ def serve_viral_image(session_id, image_name):
         if not image_path or not image_path.exists():
             return jsonify({"error": "Imagem não encontrada"}), 404
 
+        # Miniatura WebP por padrão; ?full=1 devolve o arquivo original
+        if request.args.get('full') != '1':
+            thumbnail = perceptual_image_index.thumbnail_for(str(image_path))
+            if thumbnail:
+                return send_file(thumbnail, mimetype='image/webp')
+
         return send_file(str(image_path))
 
     except Exception as e:
@@ -968,7 +987,7 @@ def _consolidate_step1_massive_data(search_results, viral_analysis, viral_result
         },
         
         # CONTEÚDO TEXTUAL CONSOLIDADO
-        "consolidated_text_content": _extract_all_text_content(search_results, viral_analysis, viral_results, additional_data),
+        "consolidated_text_content": _extract_all_text_content(search_results, viral_analysis, viral_results, additional_data, session_id),
         
         # METADADOS DE QUALIDADE
         "data_quality_metrics": {
@@ -984,10 +1003,14 @@ def _consolidate_step1_massive_data(search_results, viral_analysis, viral_result
     
     return massive_data
 
-def _extract_all_text_content(search_results, viral_analysis, viral_results, additional_data):
+def _extract_all_text_content(search_results, viral_analysis, viral_results, additional_data, session_id=None):
     """
     Extrai todo o conteúdo textual dos dados para facilitar processamento pela IA
     
+    Com ``session_id``, textos quase duplicados (cópias sindicadas, arquivos que repetem
+    os mesmos dados) são colapsados em um representante; a proveniência dos removidos
+    fica em ``near_duplicate_clusters``.
+    
     Returns:
         Dict: Conteúdo textual organizado por categoria
     """
@@ -1012,6 +1035,11 @@ def _extract_all_text_content(search_results, viral_analysis, viral_results, add
             for source in search_results['sources']:
                 if isinstance(source, dict) and source.get('content'):
                     text_content["search_content"].append(source['content'])
+        
+        # Resultados web com conteúdo completo (base de conhecimento e provedores que extraem a página)
+        for result in search_results.get('web_results') or []:
+            if isinstance(result, dict) and result.get('content'):
+                text_content["search_content"].append(result['content'])
     
     # Extrai conteúdo viral
     if viral_analysis:
@@ -1034,6 +1062,16 @@ def _extract_all_text_content(search_results, viral_analysis, viral_results, add
     for file_name, file_data in additional_data.items():
         text_content["additional_content"].append(f"Arquivo {file_name}: {str(file_data)}")
     
+    # Remove quase duplicatas entre todas as categorias (índice próprio da consolidação)
+    if session_id:
+        scope = f"{session_id}:etapa1"
+        near_duplicate_detector.reset_session(scope)
+        text_content["near_duplicate_clusters"] = []
+        for category in ("search_content", "viral_content", "additional_content"):
+            kept, clusters = near_duplicate_detector.deduplicate_texts(text_content[category], scope, label=category)
+            text_content[category] = kept
+            text_content["near_duplicate_clusters"].extend(clusters)
+    
     return text_content
 
 def _load_step1_massive_data(session_id):
@@ -1224,7 +1262,13 @@ def _generate_collection_report(
                             rel_img_path = os.path.relpath(abs_img_path, analyses_base)
                             # Ensure forward slashes for markdown
                             rel_img_path_md = rel_img_path.replace(os.sep, '/')
-                            report += f"**Imagem Local:** ![Viral {i}](/files/{rel_img_path_md})  \n"
+                            # Miniatura WebP no corpo do relatório, com link para a imagem completa
+                            thumbnail = viral_img.get('thumbnail_path')
+                            if thumbnail and os.path.exists(thumbnail):
+                                rel_thumb_md = os.path.relpath(os.path.abspath(thumbnail), analyses_base).replace(os.sep, '/')
+                                report += f"**Imagem Local:** [![Viral {i}](/files/{rel_thumb_md})](/files/{rel_img_path_md})  \n"
+                            else:
+                                report += f"**Imagem Local:** ![Viral {i}](/files/{rel_img_path_md})  \n"
                         else:
                             # If image is outside analyses_data, link might not work or needs adjustment
                             report += f"**Imagem Local:** *Path outside analyses_data: {local_path}*  \n"
@@ -1238,6 +1282,11 @@ def _generate_collection_report(
                    # No local path stored
                    report += f"**Imagem Local:** *Não disponível*  \n"
 
+                # Outros posts com a mesma imagem (agrupados pelo hash perceptual)
+                duplicate_posts = viral_img.get('duplicate_posts') or []
+                if duplicate_posts:
+                    report += f"**Mesma imagem em:** {len(duplicate_posts)} outro(s) post(s)  \n"
+
                 # Descrição
                 description = viral_img.get('description', '')
                 if description:
@@ -1250,7 +1299,10 @@ def _generate_collection_report(
         report += "---\n\n## CONTEÚDO VIRAL COLETADO\n\nMódulo viral não disponível ou falhou.\n\n"
 
     # Adiciona screenshots capturados
-    screenshots = viral_analysis.get('screenshots_captured', [])
+    screenshots = [
+        screenshot for screenshot in viral_analysis.get('screenshots_captured', [])
+        if not screenshot.get('duplicate_of')  # visualmente idêntico a outro screenshot já listado
+    ]
     if screenshots:
         report += "---\n\n## EVIDÊNCIAS VISUAIS CAPTURADAS\n\n"
         for i, screenshot in enumerate(screenshots, 1):
@@ -1285,7 +1337,11 @@ def _generate_collection_report(
             if img_path:
                  # Ensure forward slashes for markdown
                  img_path_md = img_path.replace(os.sep, '/')
-                 report += f"![Screenshot {i}](/files/{img_path_md})  \n\n"
+                 thumbnail = screenshot.get('thumbnail_relative_path')
+                 if thumbnail:
+                     report += f"[![Screenshot {i}](/files/{thumbnail})](/files/{img_path_md})  \n\n"
+                 else:
+                     report += f"![Screenshot {i}](/files/{img_path_md})  \n\n"
             else:
                  report += "*Imagem não disponível.*  \n\n"
     else:
@@ -9,8 +9,11 @@ import os
 import logging
 from datetime import datetime
 from flask import Blueprint, request, jsonify, send_file
-from services.local_file_manager import local_file_manager
-from database import db_manager
+from services.service_registry import service_registry
+
+# Serviços carregados sob demanda (ver services/service_registry.py)
+local_file_manager = service_registry.lazy('local_file_manager')
+db_manager = service_registry.lazy('db_manager')
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +10,10 @@ import time
 import uuid
 from datetime import datetime
 from flask import Blueprint, request, jsonify
-from services.ai_manager import ai_manager
+from services.service_registry import service_registry
+
+# Serviço carregado sob demanda (ver services/service_registry.py)
+ai_manager = service_registry.lazy('ai_manager')
 
 logger = logging.getLogger(__name__)
 
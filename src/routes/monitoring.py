@@ -9,7 +9,10 @@ import logging
 import psutil
 from datetime import datetime
 from flask import Blueprint, jsonify
-from services.health_checker import health_checker
+from services.service_registry import service_registry, get_memory_report
+
+# Serviço carregado sob demanda (ver services/service_registry.py)
+health_checker = service_registry.lazy('health_checker')
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +66,21 @@ def system_metrics():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@monitoring_bp.route('/services', methods=['GET'])
+def registry_status():
+    """Estado do registro de serviços (carregados sob demanda) e memória por worker"""
+    try:
+        status = service_registry.get_status()
+        status['memory'] = get_memory_report()
+        return jsonify(status), 200
+
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter estado dos serviços: {e}")
+        return jsonify({
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
 @monitoring_bp.route('/status', methods=['GET'])
 def service_status():
     """Status dos serviços"""
@@ -16,15 +16,10 @@ import threading
 from queue import Queue
 import uuid
 
-# Importar auto_save_manager aqui
-try:
-    from services.auto_save_manager import auto_save_manager
-except ImportError:
-    #logger.error("Falha ao importar auto_save_manager. Verifique a configuração dos serviços.")
-    # Tenta configurar o logger antes de usá-lo
-    logger = logging.getLogger(__name__)
-    logger.error("Falha ao importar auto_save_manager. Verifique a configuração dos serviços.")
-    auto_save_manager = None
+from services.service_registry import service_registry
+
+# auto_save_manager é carregado sob demanda (ver services/service_registry.py)
+auto_save_manager = service_registry.lazy('auto_save_manager')
 
 logger = logging.getLogger(__name__)
 
@@ -773,7 +768,7 @@ def get_progress(session_id: str):
             })
 
         # Se não encontrou no dicionário, busca nos arquivos salvos
-        if auto_save_manager is None:
+        if not service_registry.is_available('auto_save_manager'):
             logger.error("auto_save_manager não está disponível. Não é possível buscar progresso de arquivos.")
             return jsonify({'error': 'Serviço de salvamento automático indisponível'}), 500
 
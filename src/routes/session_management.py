@@ -8,7 +8,10 @@ APIs para gerenciamento completo de sessões
 import logging
 from flask import Blueprint, request, jsonify
 from typing import Dict, Any
-from services.session_persistence_manager import session_manager
+from services.service_registry import service_registry
+
+# Serviço carregado sob demanda (ver services/service_registry.py)
+session_manager = service_registry.lazy('session_manager')
 
 logger = logging.getLogger(__name__)
 
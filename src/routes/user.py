@@ -9,7 +9,10 @@ import logging
 import uuid
 from datetime import datetime
 from flask import Blueprint, request, jsonify, session
-from database import db_manager
+from services.service_registry import service_registry
+
+# Serviço carregado sob demanda (ver services/service_registry.py)
+db_manager = service_registry.lazy('db_manager')
 
 logger = logging.getLogger(__name__)
 
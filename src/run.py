@@ -119,6 +119,16 @@ def create_app():
     app.register_blueprint(mcp_bp, url_prefix='/mcp')
     app.register_blueprint(session_bp, url_prefix='/api')
 
+    # Serviços pesados são criados no primeiro uso; SERVICE_WARMUP ("all" ou lista
+    # separada por vírgulas) pré-carrega em segundo plano sem atrasar o startup
+    from services.service_registry import service_registry
+    # Sob gunicorn com preload_app o aquecimento acontece em cada worker (post_fork em
+    # gunicorn.conf.py): threads iniciadas no master não sobrevivem ao fork
+    warmup = os.getenv('SERVICE_WARMUP', '').strip()
+    if warmup and not os.getenv('GUNICORN_PRELOAD'):
+        names = None if warmup == 'all' else [name.strip() for name in warmup.split(',') if name.strip()]
+        service_registry.warm_up(names, background=True)
+
     @app.route('/')
     def index():
         """Página principal"""
@@ -193,6 +203,8 @@ def create_app():
     def app_status():
         """Status da aplicação"""
         try:
+            ai_manager = service_registry.get('ai_manager')
+
             # Status dos serviços principais
             services_status = {
                 'ai_manager': ai_manager.is_available(),
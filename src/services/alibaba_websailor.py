@@ -18,6 +18,10 @@ from datetime import datetime
 import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.url_canonicalizer import url_canonicalizer
+from services.near_duplicate_detector import near_duplicate_detector
+from services.research_knowledge_base import research_knowledge_base
+from services.provider_telemetry import provider_telemetry
 
 logger = logging.getLogger(__name__)
 
@@ -136,6 +140,8 @@ class AlibabaWebSailorAgent:
 
             all_content = []
             search_engines_used = []
+            # Páginas já reservadas para extração (por sessão, ou só nesta navegação)
+            seen_session = session_id or f"websailor_{id(all_content)}"
 
             # NÍVEL 1: BUSCA MASSIVA MULTI-ENGINE
             logger.info("🔍 NÍVEL 1: Busca massiva com múltiplos engines")
@@ -160,6 +166,10 @@ class AlibabaWebSailorAgent:
 
                         # Extrai conteúdo de cada resultado
                         for result in results:
+                            result['url'] = url_canonicalizer.clean(result['url'])
+                            if not url_canonicalizer.claim(seen_session, result['url']):
+                                continue
+
                             content_data = self._extract_intelligent_content(
                                 result['url'], result.get('title', ''), result.get('snippet', ''), context
                             )
@@ -198,6 +208,10 @@ class AlibabaWebSailorAgent:
                     internal_links = self._extract_internal_links(page['url'], page['content'])
 
                     for link in internal_links[:3]:  # Top 3 links por página
+                        link = url_canonicalizer.clean(link)
+                        if not url_canonicalizer.claim(seen_session, link):
+                            continue
+
                         internal_content = self._extract_intelligent_content(link, "", "", context)
 
                         if internal_content and internal_content['success']:
@@ -218,6 +232,10 @@ class AlibabaWebSailorAgent:
                         related_results = self._google_search_deep(related_query, 5)
 
                         for result in related_results:
+                            result['url'] = url_canonicalizer.clean(result['url'])
+                            if not url_canonicalizer.claim(seen_session, result['url']):
+                                continue
+
                             related_content = self._extract_intelligent_content(
                                 result['url'], result.get('title', ''), result.get('snippet', ''), context
                             )
@@ -232,6 +250,20 @@ class AlibabaWebSailorAgent:
                         logger.warning(f"⚠️ Erro em query relacionada '{related_query}': {str(e)}")
                         continue
 
+            # Cópias sindicadas em URLs diferentes: mantém a de maior qualidade, com proveniência
+            all_content = near_duplicate_detector.deduplicate(
+                all_content, seen_session, score_key='quality_score', cross_session=bool(session_id)
+            )
+
+            # Páginas extraídas ficam disponíveis para as próximas sessões do mesmo nicho
+            research_knowledge_base.add_documents(
+                all_content, niche=context.get('segmento', ''), query=query, provider='ALIBABA_WEBSAILOR'
+            )
+
+            if not session_id:
+                url_canonicalizer.reset_session(seen_session)
+                near_duplicate_detector.reset_session(seen_session)
+
             # PROCESSAMENTO E ANÁLISE FINAL
             processed_research = self._process_and_analyze_content(all_content, query, context)
 
@@ -587,7 +619,18 @@ class AlibabaWebSailorAgent:
 
             jina_url = f"{self.jina_reader_url}{url}"
 
-            response = requests.get(jina_url, headers=headers, timeout=60)
+            # Timeout derivado do p99 observado (até 60s)
+            start = time.time()
+            try:
+                response = requests.get(
+                    jina_url, headers=headers, timeout=provider_telemetry.timeout_for('extract:jina', 60)
+                )
+            except requests.exceptions.Timeout:
+                provider_telemetry.record('extract:jina', time.time() - start, False,
+                                          api_key=self.jina_api_key, timed_out=True)
+                raise
+            provider_telemetry.record('extract:jina', time.time() - start, response.status_code == 200,
+                                      api_key=self.jina_api_key)
 
             if response.status_code == 200:
                 content = response.text
@@ -742,56 +785,7 @@ class AlibabaWebSailorAgent:
 
     def _resolve_bing_url(self, url: str) -> str:
         """Resolve URLs de redirecionamento do Bing"""
-
-        if "bing.com/ck/a" not in url or "u=a1" not in url:
-            return url
-
-        try:
-            import base64
-
-            # Extrai parâmetro u=a1...
-            if "u=a1" in url:
-                u_param_start = url.find("u=a1") + 4
-                u_param_end = url.find("&", u_param_start)
-                if u_param_end == -1:
-                    u_param_end = len(url)
-
-                encoded_part = url[u_param_start:u_param_end]
-
-                # Decodifica Base64
-                try:
-                    # Limpa e adiciona padding
-                    encoded_part = encoded_part.replace('%3d', '=').replace('%3D', '=')
-                    missing_padding = len(encoded_part) % 4
-                    if missing_padding:
-                        encoded_part += '=' * (4 - missing_padding)
-
-                    # Primeira decodificação
-                    first_decode = base64.b64decode(encoded_part)
-                    first_decode_str = first_decode.decode('utf-8', errors='ignore')
-
-                    if first_decode_str.startswith('aHR0'):
-                        # Segunda decodificação necessária
-                        missing_padding = len(first_decode_str) % 4
-                        if missing_padding:
-                            first_decode_str += '=' * (4 - missing_padding)
-
-                        second_decode = base64.b64decode(first_decode_str)
-                        final_url = second_decode.decode('utf-8', errors='ignore')
-
-                        if final_url.startswith('http'):
-                            return final_url
-
-                    elif first_decode_str.startswith('http'):
-                        return first_decode_str
-
-                except Exception:
-                    pass
-
-            return url
-
-        except Exception:
-            return url
+        return url_canonicalizer.resolve_redirect(url)
 
     def _enhance_query_for_brazil(self, query: str) -> str:
         """Melhora query para pesquisa no Brasil"""
@@ -1089,7 +1083,8 @@ class AlibabaWebSailorAgent:
                         'quality_score': item['quality_score'],
                         'content_length': item['content_length'],
                         'search_engine': item['search_engine'],
-                        'is_preferred': item.get('is_preferred_source', False)
+                        'is_preferred': item.get('is_preferred_source', False),
+                        'near_duplicates': item.get('near_duplicates', [])
                     } for item in all_content[:15]
                 ]
             },
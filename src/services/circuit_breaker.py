@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Circuit Breaker
+Disjuntores (fechado/aberto/meio-aberto) compartilhados pelos provedores de busca e de IA
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de um provedor
+
+    Fechado: chamadas liberadas; abre quando a taxa de falhas na janela móvel passa do
+    limite (com um mínimo de chamadas) ou após ``consecutive_failures`` falhas seguidas.
+    Aberto: chamadas recusadas até ``recovery_timeout``; então passa a meio-aberto.
+    Meio-aberto: libera uma única chamada de teste; sucesso fecha, falha reabre com o
+    tempo de recuperação dobrado (até ``max_recovery_timeout``).
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60.0,
+        min_calls: int = 4,
+        failure_rate_threshold: float = 0.5,
+        consecutive_failures: int = 3,
+        recovery_timeout: float = 30.0,
+        max_recovery_timeout: float = 600.0,
+        slow_call_seconds: Optional[float] = None
+    ):
+        """
+        Inicializa o disjuntor
+
+        Args:
+            name: Nome do provedor
+            window_seconds: Duração da janela móvel de chamadas
+            min_calls: Chamadas mínimas na janela para avaliar a taxa de falhas
+            failure_rate_threshold: Taxa de falhas (0-1) que abre o disjuntor
+            consecutive_failures: Falhas seguidas que abrem o disjuntor
+            recovery_timeout: Tempo aberto antes da chamada de teste
+            max_recovery_timeout: Teto do tempo aberto após testes mal-sucedidos
+            slow_call_seconds: Chamadas bem-sucedidas mais lentas que isso contam como falha na taxa
+        """
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.consecutive_failures = consecutive_failures
+        self.base_recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.slow_call_seconds = slow_call_seconds
+
+        self._lock = threading.Lock()
+        self._calls = deque()  # (instante, sucesso)
+        self._consecutive = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._recovery_timeout = recovery_timeout
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0, 'last_failure': None}
+
+    # ------------------------------------------------------------------ estado
+
+    def _trim(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _failure_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, ok in self._calls if not ok) / len(self._calls)
+
+    def _open(self, now: float, reason: str):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self.stats['opened'] += 1
+        logger.warning(f"⚡ Disjuntor de {self.name} aberto ({reason}); novo teste em {self._recovery_timeout:.0f}s")
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._calls.clear()
+        self._consecutive = 0
+        self._probe_in_flight = False
+        self._recovery_timeout = self.base_recovery_timeout
+        logger.info(f"✅ Disjuntor de {self.name} fechado: provedor recuperado")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_available(self) -> bool:
+        """Consulta sem efeito colateral: o provedor aceitaria uma chamada agora?"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self._recovery_timeout
+            return not self._probe_in_flight or self._probe_expired(time.monotonic())
+
+    def _probe_expired(self, now: float) -> bool:
+        # Chamada de teste sem resposta (thread presa, resultado nunca registrado) não trava o disjuntor
+        return now - self._probe_started >= self._recovery_timeout
+
+    def allow_request(self) -> bool:
+        """Reserva uma chamada; no meio-aberto, só a primeira (chamada de teste) é liberada"""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.OPEN and now - self._opened_at >= self._recovery_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"🔌 Disjuntor de {self.name} meio-aberto: enviando chamada de teste")
+
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and (not self._probe_in_flight or self._probe_expired(now)):
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+
+            self.stats['rejected'] += 1
+            return False
+
+    # ------------------------------------------------------------------ resultados
+
+    def record_success(self, duration: Optional[float] = None):
+        """Registra chamada bem-sucedida (lenta demais conta como falha na taxa)"""
+        slow = self.slow_call_seconds is not None and duration is not None and duration >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            self.stats['calls'] += 1
+            if self._state == self.HALF_OPEN:
+                if slow:
+                    self._reopen_after_probe(now, f"teste lento: {duration:.1f}s")
+                else:
+                    self._close()
+                return
+
+            self._consecutive = 0
+            self._calls.append((now, not slow))
+            self._evaluate(now)
+
+    def record_failure(self, error: Optional[Any] = None):
+        """Registra chamada com falha"""
+        with self._lock:
+            now = time.monotonic()
+            self.stats['calls'] += 1
+            self.stats['failures'] += 1
+            self.stats['last_failure'] = str(error)[:200] if error else None
+            if self._state == self.HALF_OPEN:
+                self._reopen_after_probe(now, "teste falhou")
+                return
+            if self._state == self.OPEN:
+                return
+
+            self._consecutive += 1
+            self._calls.append((now, False))
+            if self._consecutive >= self.consecutive_failures:
+                self._open(now, f"{self._consecutive} falhas seguidas")
+                return
+            self._evaluate(now)
+
+    def _reopen_after_probe(self, now: float, reason: str):
+        self._recovery_timeout = min(self._recovery_timeout * 2, self.max_recovery_timeout)
+        self._open(now, reason)
+
+    def _evaluate(self, now: float):
+        self._trim(now)
+        if len(self._calls) >= self.min_calls and self._failure_rate() >= self.failure_rate_threshold:
+            self._open(now, f"taxa de falhas {self._failure_rate():.0%} em {len(self._calls)} chamadas")
+
+    def reset(self):
+        """Fecha o disjuntor manualmente"""
+        with self._lock:
+            self._close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado para monitoramento"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            retry_in = None
+            if self._state == self.OPEN:
+                retry_in = round(max(0.0, self._recovery_timeout - (now - self._opened_at)), 1)
+            return {
+                'state': self._state,
+                'failure_rate': round(self._failure_rate(), 3),
+                'window_calls': len(self._calls),
+                'consecutive_failures': self._consecutive,
+                'recovery_timeout': self._recovery_timeout,
+                'retry_in_seconds': retry_in,
+                **self.stats
+            }
+
+
+class CircuitBreakerRegistry:
+    """Disjuntores por nome, compartilhados entre os gerenciadores do processo"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, **config) -> CircuitBreaker:
+        """Retorna o disjuntor ``name``, criando-o com ``config`` na primeira chamada"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **config)
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Estado de todos os disjuntores"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+# Instância global
+circuit_breakers = CircuitBreakerRegistry()
@@ -12,6 +12,9 @@ from typing import Dict, Any, List
 from datetime import datetime
 from pathlib import Path
 
+from services.perceptual_image_index import perceptual_image_index
+from services.screenshot_encoder import screenshot_encoder
+
 logger = logging.getLogger(__name__)
 
 class ComprehensiveReportGeneratorV3:
@@ -190,8 +193,9 @@ class ComprehensiveReportGeneratorV3:
                 logger.warning(f"⚠️ Diretório de arquivos não existe: {files_dir}")
                 return screenshot_paths
 
-            # Busca por arquivos PNG (screenshots)
-            for screenshot_file in files_dir.glob("*.png"):
+            # Busca screenshots (PNG, WebP ou JPEG), um por grupo de screenshots visualmente idênticos
+            screenshot_files = perceptual_image_index.dedupe(screenshot_encoder.list_screenshots(files_dir), files_dir.name, 'screenshot')
+            for screenshot_file in map(Path, screenshot_files):
                 relative_path = f"files/{files_dir.name}/{screenshot_file.name}"
                 screenshot_paths.append(relative_path)
                 logger.debug(f"📸 Screenshot encontrado: {screenshot_file.name}")
@@ -241,7 +245,12 @@ Este relatório consolida a análise ultra-detalhada realizada pelo sistema ARQV
             report += "## EVIDÊNCIAS VISUAIS\n\n"
             for i, screenshot in enumerate(screenshots, 1):
                 report += f"### Screenshot {i}\n"
-                report += f"![Screenshot {i}]({screenshot})\n\n"
+                # Miniatura WebP no corpo do relatório, com link para o screenshot completo
+                thumbnail = perceptual_image_index.thumbnail_path(screenshot).replace(os.sep, '/')
+                if (Path("analyses_data") / thumbnail).exists():
+                    report += f"[![Screenshot {i}]({thumbnail})]({screenshot})\n\n"
+                else:
+                    report += f"![Screenshot {i}]({screenshot})\n\n"
             report += "---\n\n"
 
         # Compila módulos na ordem definida
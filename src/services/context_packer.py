@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Context Packer
+Seleção de passagens por relevância (BM25 + MMR) dentro de um orçamento de tokens
+"""
+
+import os
+import re
+import math
+import zlib
+import logging
+from collections import Counter
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+try:
+    from scipy import sparse
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+# Palavras muito frequentes em português que não ajudam a ranquear passagens
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'um', 'uma', 'de', 'da', 'do', 'das', 'dos', 'e', 'é', 'em', 'no',
+    'na', 'nos', 'nas', 'para', 'por', 'com', 'que', 'se', 'ao', 'aos', 'ou', 'mais', 'como',
+    'mas', 'foi', 'ser', 'são', 'sua', 'seu', 'suas', 'seus', 'pelo', 'pela', 'isso', 'este',
+    'esta', 'esse', 'essa', 'já', 'também', 'não', 'sim', 'the', 'of', 'and', 'to', 'in', 'is'
+}
+
+# Orçamento de tokens (contexto de dados) por modelo; deixa folga para prompt e resposta
+MODEL_CONTEXT_BUDGETS = {
+    'qwen/qwen2.5-vl-32b-instruct:free': 20000,
+    'gemini-2.0-flash-exp': 60000,
+    'llama3-70b-8192': 4000,
+    'gpt-4o': 40000,
+}
+DEFAULT_CONTEXT_BUDGET = 12000
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata de tokens (~4 caracteres por token)"""
+    return len(text) // 4 + 1
+
+
+def context_budget_for(provider: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Orçamento de tokens de contexto para o provedor/modelo
+
+    ``SYNTHESIS_CONTEXT_TOKENS`` no ambiente sobrepõe a tabela.
+    """
+    override = os.getenv('SYNTHESIS_CONTEXT_TOKENS')
+    if override and override.isdigit():
+        return int(override)
+    model = (provider or {}).get('model')
+    return MODEL_CONTEXT_BUDGETS.get(model, DEFAULT_CONTEXT_BUDGET)
+
+
+class ContextPacker:
+    """Divide textos em passagens, ranqueia contra a consulta e empacota as melhores"""
+
+    def __init__(
+        self,
+        passage_words: int = 120,
+        k1: float = 1.5,
+        b: float = 0.75,
+        mmr_lambda: float = 0.7,
+        mmr_pool: int = 300
+    ):
+        """
+        Inicializa o empacotador
+
+        Args:
+            passage_words: Tamanho alvo das passagens, em palavras
+            k1, b: Parâmetros do BM25
+            mmr_lambda: Peso da relevância frente à diversidade no MMR (1.0 = só relevância)
+            mmr_pool: Mínimo de passagens mais relevantes que entram na seleção MMR
+        """
+        self.passage_words = passage_words
+        self.k1 = k1
+        self.b = b
+        self.mmr_lambda = mmr_lambda
+        self.mmr_pool = mmr_pool
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+    def split_passages(self, text: str, source: str) -> List[Dict[str, Any]]:
+        """Agrupa frases em passagens de até ``passage_words`` palavras"""
+        passages, current, current_words = [], [], 0
+
+        def flush():
+            if current:
+                passages.append({'source': source, 'text': ' '.join(current).strip()})
+
+        for sentence in _SENTENCE_RE.split(text or ''):
+            words = sentence.split()
+            if not words:
+                continue
+            # Frases enormes (JSON serializado, listas) são cortadas em janelas fixas
+            while len(words) > self.passage_words:
+                flush()
+                current, current_words = [], 0
+                passages.append({'source': source, 'text': ' '.join(words[:self.passage_words])})
+                words = words[self.passage_words:]
+            if current_words + len(words) > self.passage_words:
+                flush()
+                current, current_words = [], 0
+            current.append(' '.join(words))
+            current_words += len(words)
+        flush()
+        return passages
+
+    def bm25_scores(self, passages_tokens: List[List[str]], query_tokens: List[str]) -> np.ndarray:
+        """Escore BM25 de cada passagem para a consulta"""
+        n_docs = len(passages_tokens)
+        if n_docs == 0:
+            return np.zeros(0)
+
+        lengths = np.array([len(tokens) for tokens in passages_tokens], dtype=np.float64)
+        avg_length = lengths.mean() or 1.0
+        query_terms = set(query_tokens)
+
+        doc_freq = Counter()
+        term_freqs = []
+        for tokens in passages_tokens:
+            counts = Counter(t for t in tokens if t in query_terms)
+            term_freqs.append(counts)
+            doc_freq.update(counts.keys())
+
+        scores = np.zeros(n_docs)
+        norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        for term in query_terms:
+            df = doc_freq.get(term, 0)
+            if not df:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            tf = np.array([counts.get(term, 0) for counts in term_freqs], dtype=np.float64)
+            scores += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def _tfidf_matrix(self, passages_tokens: List[List[str]], n_features: int = 4096):
+        """
+        Vetores TF-IDF normalizados (hashing de termos) para medir redundância entre passagens
+
+        Matriz CSR (cada passagem tem poucas dezenas de termos); sem SciPy, densa float32
+        com dimensão menor.
+        """
+        if not HAS_SCIPY:
+            n_features = min(n_features, 1024)
+        rows, cols, counts = [], [], []
+        for i, tokens in enumerate(passages_tokens):
+            for term, count in Counter(tokens).items():
+                rows.append(i)
+                cols.append(zlib.crc32(term.encode('utf-8')) % n_features)
+                counts.append(count)
+        rows, cols = np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+        counts = np.array(counts, dtype=np.float32)
+
+        shape = (len(passages_tokens), n_features)
+        if HAS_SCIPY:
+            matrix = sparse.csr_matrix((counts, (rows, cols)), shape=shape)
+            matrix.sum_duplicates()
+            idf = np.log((1 + shape[0]) / (1 + np.bincount(matrix.indices, minlength=n_features))) + 1
+            matrix.data *= idf[matrix.indices].astype(np.float32)
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+            return sparse.diags(inverse.astype(np.float32)) @ matrix
+
+        matrix = np.zeros(shape, dtype=np.float32)
+        np.add.at(matrix, (rows, cols), counts)
+        idf = np.log((1 + shape[0]) / (1 + (matrix > 0).sum(axis=0))) + 1
+        matrix *= idf.astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    @staticmethod
+    def _similarities(vectors, index: int) -> np.ndarray:
+        """Cosseno de todas as passagens com a passagem ``index``"""
+        if HAS_SCIPY and sparse.issparse(vectors):
+            return (vectors @ vectors[index].T).toarray().ravel()
+        return vectors @ vectors[index]
+
+    def pack(
+        self,
+        sections: Dict[str, List[str]],
+        query: str,
+        token_budget: int,
+        section_shares: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Seleciona passagens de todas as seções até o orçamento de tokens
+
+        Args:
+            sections: Nome da seção -> lista de textos
+            query: Consulta (nicho, produto, público)
+            token_budget: Máximo de tokens estimados das passagens escolhidas
+            section_shares: Fração máxima do orçamento por seção (padrão: sem limite)
+
+        Returns:
+            Dict com "passages" (por seção, na ordem de seleção) e "stats"
+        """
+        passages = []
+        for section, texts in sections.items():
+            for i, text in enumerate(texts or []):
+                if isinstance(text, str) and text.strip():
+                    passages.extend(
+                        {**passage, 'section': section} for passage in self.split_passages(text, f"{section}_{i + 1}")
+                    )
+
+        total_tokens = sum(estimate_tokens(p['text']) for p in passages)
+        if not passages:
+            return {'passages': {}, 'stats': {'candidates': 0, 'selected': 0, 'tokens_used': 0, 'tokens_available': 0}}
+
+        passages_tokens = [self.tokenize(p['text']) for p in passages]
+        relevance = self.bm25_scores(passages_tokens, self.tokenize(query))
+        if relevance.max() > 0:
+            relevance = relevance / relevance.max()
+
+        # MMR sobre as passagens mais relevantes (pool grande o bastante para encher o orçamento)
+        avg_cost = total_tokens / len(passages)
+        pool_size = max(self.mmr_pool, int(2 * token_budget / max(avg_cost, 1)))
+        pool = np.argsort(-relevance, kind='stable')[:pool_size]
+        vectors = self._tfidf_matrix([passages_tokens[i] for i in pool])
+        costs = np.array([estimate_tokens(passages[i]['text']) for i in pool])
+        max_similarity = np.zeros(len(pool))
+        available = np.ones(len(pool), dtype=bool)
+
+        shares = section_shares or {}
+        section_used = Counter()
+        selected, tokens_used = [], 0
+
+        while True:
+            # Passagens que não cabem mais no orçamento saem do pool; orçamento cheio encerra
+            available &= costs <= token_budget - tokens_used
+            if not available.any():
+                break
+            mmr = self.mmr_lambda * relevance[pool] - (1 - self.mmr_lambda) * max_similarity
+            mmr[~available] = -np.inf
+            best = int(np.argmax(mmr))
+            available[best] = False
+
+            passage = passages[pool[best]]
+            cost = int(costs[best])
+            section_limit = shares.get(passage['section'], 1.0) * token_budget
+            if section_used[passage['section']] + cost > section_limit:
+                continue
+
+            selected.append(passage)
+            tokens_used += cost
+            section_used[passage['section']] += cost
+            np.maximum(max_similarity, self._similarities(vectors, best), out=max_similarity)
+
+        packed = {}
+        for passage in selected:
+            packed.setdefault(passage['section'], []).append(passage)
+
+        stats = {
+            'candidates': len(passages),
+            'selected': len(selected),
+            'tokens_used': tokens_used,
+            'tokens_available': total_tokens,
+            'token_budget': token_budget
+        }
+        logger.info(f"📦 Contexto empacotado: {len(selected)}/{len(passages)} passagens, {tokens_used}/{total_tokens} tokens (orçamento {token_budget})")
+        return {'passages': packed, 'stats': stats}
+
+
+# Instância global
+context_packer = ContextPacker()
@@ -9,9 +9,12 @@ import os
 import logging
 import asyncio
 import json
+import time
 from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
 
+from services.circuit_breaker import circuit_breakers
+
 # Imports condicionais
 try:
     import google.generativeai as genai
@@ -49,9 +52,13 @@ class EnhancedAIManager:
         self.providers = {}
         self.current_provider = None
         self.search_orchestrator = None
+        self.breakers = {}
 
         self._initialize_providers()
         self._initialize_search_tools()
+        # Disjuntores compartilhados: um provedor com falhas é pulado e volta sozinho após uma chamada de teste
+        for name in self.providers:
+            self.breakers[name] = circuit_breakers.get(f"ai:{name}", consecutive_failures=3, recovery_timeout=60.0)
 
         logger.info(f"🤖 Enhanced AI Manager inicializado com {len(self.providers)} provedores")
 
@@ -137,7 +144,7 @@ class EnhancedAIManager:
         available = []
 
         for name, provider in self.providers.items():
-            if not provider["available"]:
+            if not provider["available"] or not self.breakers[name].is_available():
                 continue
 
             available.append((name, provider["priority"]))
@@ -149,29 +156,61 @@ class EnhancedAIManager:
 
         return None
 
-    async def generate_text(self, prompt: str, max_tokens: int = 4000, temperature: float = 0.7) -> str:
-        """Gera texto usando o melhor provedor disponível"""
-        provider_name = self._get_best_provider()
+    def get_available_providers(self) -> List[str]:
+        """Provedores disponíveis, do mais para o menos prioritário"""
+        available = [
+            (name, provider["priority"]) for name, provider in self.providers.items()
+            if provider["available"] and self.breakers[name].is_available()
+        ]
+        return [name for name, _ in sorted(available, key=lambda x: x[1])]
+
+    def _acquire_provider(self, preferred: Optional[str] = None) -> Optional[str]:
+        """Reserva a chamada no disjuntor de ``preferred`` ou do primeiro provedor disponível por prioridade"""
+        candidates = self.get_available_providers()
+        if preferred in candidates:
+            candidates.remove(preferred)
+            candidates.insert(0, preferred)
+        for name in candidates:
+            if self.breakers[name].allow_request():
+                return name
+        return None
+
+    async def generate_text(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        temperature: float = 0.7,
+        provider_name: Optional[str] = None
+    ) -> str:
+        """
+        Gera texto usando o melhor provedor disponível (ou ``provider_name``, se informado)
+
+        As chamadas dos clientes são bloqueantes e rodam em uma thread, para que várias
+        gerações possam ser aguardadas em paralelo com ``asyncio.gather``. Provedor com
+        disjuntor aberto é pulado; se a falha abrir o disjuntor, o próximo é tentado.
+        """
+        provider_name = self._acquire_provider(provider_name)
 
         if not provider_name:
             logger.warning("⚠️ Nenhum provedor disponível")
             return "Erro: Nenhum provedor de IA disponível para gerar texto."
 
-        provider = self.providers[provider_name]
         logger.info(f"🤖 Usando {provider_name} para geração de texto")
+        result = await asyncio.to_thread(self._call_provider, provider_name, prompt, max_tokens, temperature)
 
-        try:
-            if provider_name == "openrouter":
-                client = provider["client"]
-                response = client.chat.completions.create(
-                    model=provider["model"],
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=max_tokens,
-                    temperature=temperature
-                )
-                return response.choices[0].message.content
+        # Disjuntor aberto: tenta o próximo provedor (este volta após o tempo de recuperação)
+        if (result or "").startswith("Erro") and not self.breakers[provider_name].is_available():
+            return await self.generate_text(prompt, max_tokens, temperature)
+        return result
+
+    def _call_provider(self, provider_name: str, prompt: str, max_tokens: int, temperature: float) -> str:
+        """Chamada síncrona ao cliente do provedor (resultado registrado no disjuntor)"""
+        provider = self.providers[provider_name]
+        breaker = self.breakers[provider_name]
+        start_time = time.time()
 
-            elif provider_name == "gemini":
+        try:
+            if provider_name == "gemini":
                 model = genai.GenerativeModel("gemini-2.0-flash-exp")
                 response = model.generate_content(
                     prompt,
@@ -180,9 +219,9 @@ class EnhancedAIManager:
                         temperature=temperature,
                     )
                 )
-                return response.text
+                result = response.text
 
-            elif provider_name == "groq":
+            elif provider_name in ("openrouter", "groq", "openai"):
                 client = provider["client"]
                 response = client.chat.completions.create(
                     model=provider["model"],
@@ -190,27 +229,25 @@ class EnhancedAIManager:
                     max_tokens=max_tokens,
                     temperature=temperature
                 )
-                return response.choices[0].message.content
+                result = response.choices[0].message.content
 
-            elif provider_name == "openai":
-                client = provider["client"]
-                response = client.chat.completions.create(
-                    model=provider["model"],
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=max_tokens,
-                    temperature=temperature
-                )
-                return response.choices[0].message.content
+            else:
+                return "Erro: Método de geração não implementado para este provedor"
 
         except Exception as e:
+            breaker.record_failure(e)
             logger.error(f"❌ Erro na geração de texto com {provider_name}: {e}")
             return f"Erro na geração: {str(e)}"
 
-        return "Erro: Método de geração não implementado para este provedor"
+        breaker.record_success(time.time() - start_time)
+        return result
 
     def is_available(self) -> bool:
         """Verifica se há pelo menos um provedor disponível"""
-        return any(provider['available'] for provider in self.providers.values())
+        return any(
+            provider['available'] and self.breakers[name].is_available()
+            for name, provider in self.providers.items()
+        )
 
     def generate_analysis(self, prompt: str, max_tokens: int = 4000, temperature: float = 0.7) -> str:
         """Método de compatibilidade para generate_analysis"""
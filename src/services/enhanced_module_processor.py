@@ -13,14 +13,38 @@ from typing import Dict, Any, List
 from datetime import datetime
 from pathlib import Path
 from services.ai_manager import ai_manager
+from services.session_corpus_index import session_corpus_index
 
 logger = logging.getLogger(__name__)
 
+# Termos de consulta ao corpus da etapa 1 por módulo (somados a produto/nicho/público)
+MODULE_TOPIC_QUERIES = {
+    'avatars': "perfil público cliente idade renda dores desejos medos comportamento compra rotina",
+    'drivers_mentais': "emoção desejo medo urgência gatilho motivação sonho frustração",
+    'anti_objecao': "objeção dúvida preço caro medo desconfiança reclamação problema garantia",
+    'provas_visuais': "resultado depoimento antes depois prova caso estudo número dados",
+    'pre_pitch': "dor problema urgência transformação promessa oferta",
+    'predicoes_futuro': "tendência futuro crescimento previsão projeção mercado",
+    'posicionamento': "diferencial posicionamento marca proposta valor autoridade",
+    'concorrencia': "concorrente concorrência empresa marca líder mercado preço comparação",
+    'palavras_chave': "busca termo palavra pesquisa tendência hashtag",
+    'funil_vendas': "funil venda conversão lead jornada compra campanha",
+    'insights_mercado': "mercado tendência dados pesquisa crescimento oportunidade",
+    'plano_acao': "estratégia ação implementação etapa meta",
+    'metricas_conversao': "métrica conversão taxa custo ticket retorno engajamento",
+    'estrategia_preco': "preço valor ticket desconto plano assinatura caro barato",
+    'canais_aquisicao': "canal instagram youtube tiktok anúncio tráfego orgânico parceria",
+    'cronograma_lancamento': "lançamento data evento campanha sazonalidade prazo"
+}
+
 class EnhancedModuleProcessor:
     """Processador de módulos aprimorado"""
 
     def __init__(self):
         """Inicializa o processador"""
+        # Passagens do corpus por módulo e limite de tokens do bloco de pesquisa no prompt
+        self.research_top_k = int(os.getenv('MODULE_RESEARCH_TOP_K', '8'))
+        self.research_max_tokens = int(os.getenv('MODULE_RESEARCH_MAX_TOKENS', '2500'))
         self.modules = [
             'avatars',
             'drivers_mentais',
@@ -225,6 +249,7 @@ class EnhancedModuleProcessor:
             """
             
             prompt = module_prompts.get(module_name, default_prompt)
+            prompt += self._build_research_context(module_name, context, session_id)
             
             # Gera conteúdo usando IA
             content = ai_manager.generate_analysis(prompt, max_tokens=3000)
@@ -239,6 +264,39 @@ class EnhancedModuleProcessor:
             logger.error(f"❌ Erro ao gerar módulo {module_name}: {e}")
             return self._generate_fallback_module(module_name, session_data.get('context', {}))
 
+    def _build_research_context(self, module_name: str, context: Dict[str, Any], session_id: str) -> str:
+        """Bloco com as passagens do corpus da etapa 1 mais relevantes para o tópico do módulo"""
+        
+        try:
+            if not session_corpus_index.ensure_index(session_id):
+                return ""
+            
+            query = " ".join([
+                MODULE_TOPIC_QUERIES.get(module_name, module_name.replace('_', ' ')),
+                str(context.get('produto', '')),
+                str(context.get('nicho') or context.get('segmento', '')),
+                str(context.get('publico', ''))
+            ])
+            passages = session_corpus_index.search(
+                session_id, query, k=self.research_top_k, max_tokens=self.research_max_tokens
+            )
+            if not passages:
+                return ""
+            
+            logger.info(f"🔎 Módulo {module_name}: {len(passages)} passagens relevantes do corpus")
+            excerpts = "\n\n".join(f"[{passage['source']}] {passage['text']}" for passage in passages)
+            return f"""
+            
+            ## DADOS RELEVANTES DA PESQUISA (etapa 1)
+            Use estes trechos reais como base da análise:
+            
+{excerpts}
+            """
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Corpus da sessão indisponível para {module_name}: {e}")
+            return ""
+
     def _generate_fallback_module(self, module_name: str, context: Dict[str, Any]) -> str:
         """Gera conteúdo de fallback para um módulo"""
         
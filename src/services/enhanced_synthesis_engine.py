@@ -9,10 +9,13 @@ import os
 import logging
 import json
 import asyncio
-from typing import Dict, Any, Optional
+import hashlib
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 from pathlib import Path
 
+from services.context_packer import context_packer, context_budget_for, estimate_tokens
+
 logger = logging.getLogger(__name__)
 
 class EnhancedSynthesisEngine:
@@ -22,6 +25,16 @@ class EnhancedSynthesisEngine:
         """Inicializa o motor de síntese"""
         self.synthesis_prompts = self._load_enhanced_prompts()
         self.ai_manager = None
+        # Fração máxima do orçamento de contexto que cada seção pode ocupar
+        self.context_section_shares = {
+            'search_content': 0.7,
+            'viral_content': 0.3,
+            'additional_content': 0.3
+        }
+        # Map-reduce: "auto" ativa quando o corpus não cabe no orçamento de contexto
+        self.map_reduce_mode = os.getenv('SYNTHESIS_MAP_REDUCE', 'auto').lower()
+        self.map_chunk_tokens = int(os.getenv('SYNTHESIS_MAP_CHUNK_TOKENS', '6000'))
+        self.map_concurrency = int(os.getenv('SYNTHESIS_MAP_CONCURRENCY', '4'))
         self._initialize_ai_manager()
         
         logger.info("🧠 Enhanced Synthesis Engine inicializado")
@@ -224,13 +237,17 @@ DADOS PARA ANÁLISE:
         logger.info(f"📊 Dados massivos: {massive_data['consolidated_statistics']['total_data_size']} caracteres")
         
         try:
-            # Prepara contexto com dados massivos
-            synthesis_context = self._prepare_massive_data_context(massive_data, session_id)
-            
-            # Executa síntese com IA usando dados massivos
-            synthesis_result = await self._execute_ai_synthesis_with_massive_data(
-                synthesis_context, synthesis_type, session_id, massive_data
-            )
+            if self._should_use_map_reduce(massive_data):
+                # Corpus maior que a janela de contexto: map concorrente + reduce final
+                synthesis_result = await self._execute_map_reduce_synthesis(massive_data, synthesis_type, session_id)
+            else:
+                # Prepara contexto com dados massivos
+                synthesis_context = self._prepare_massive_data_context(massive_data, session_id)
+                
+                # Executa síntese com IA usando dados massivos
+                synthesis_result = await self._execute_ai_synthesis_with_massive_data(
+                    synthesis_context, synthesis_type, session_id, massive_data
+                )
             
             # Salva resultado
             from services.auto_save_manager import salvar_etapa
@@ -657,26 +674,28 @@ DADOS PARA ANÁLISE:
 ### CONTEÚDO DE BUSCA
 """
         
-        # Adiciona conteúdo de busca
+        # Seleciona as passagens mais relevantes de TODO o conteúdo, dentro do orçamento do modelo
         text_content = massive_data.get('consolidated_text_content', {})
-        search_content = text_content.get('search_content', [])
-        
-        for i, content in enumerate(search_content[:10]):  # Limita a 10 primeiros
-            context += f"\n**Fonte {i+1}**: {content[:1000]}...\n"
-        
-        context += "\n### CONTEÚDO VIRAL\n"
-        
-        # Adiciona conteúdo viral
-        viral_content = text_content.get('viral_content', [])
-        for i, content in enumerate(viral_content[:5]):  # Limita a 5 primeiros
-            context += f"\n**Viral {i+1}**: {content[:500]}...\n"
-        
-        context += "\n### DADOS ADICIONAIS\n"
+        packed = context_packer.pack(
+            {
+                'search_content': text_content.get('search_content', []),
+                'viral_content': text_content.get('viral_content', []),
+                'additional_content': text_content.get('additional_content', [])
+            },
+            query=self._build_relevance_query(massive_data),
+            token_budget=self._get_context_budget(),
+            section_shares=self.context_section_shares
+        )
         
-        # Adiciona dados adicionais
-        additional_content = text_content.get('additional_content', [])
-        for i, content in enumerate(additional_content[:5]):  # Limita a 5 primeiros
-            context += f"\n**Adicional {i+1}**: {content[:500]}...\n"
+        section_titles = {
+            'search_content': "",
+            'viral_content': "\n### CONTEÚDO VIRAL\n",
+            'additional_content': "\n### DADOS ADICIONAIS\n"
+        }
+        for section, title in section_titles.items():
+            context += title
+            for passage in packed['passages'].get(section, []):
+                context += f"\n**{passage['source']}**: {passage['text']}\n"
         
         # Adiciona metadados de qualidade
         quality_metrics = massive_data.get('data_quality_metrics', {})
@@ -691,9 +710,240 @@ DADOS PARA ANÁLISE:
 {massive_data.get('session_metadata', {}).get('context', 'N/A')}
 """
         
-        logger.info(f"✅ Contexto preparado: {len(context)} caracteres")
+        logger.info(f"✅ Contexto preparado: {len(context)} caracteres ({packed['stats']['selected']} passagens de {packed['stats']['candidates']})")
         return context
 
+    def _build_relevance_query(self, massive_data: Dict[str, Any]) -> str:
+        """Consulta usada para ranquear passagens: nicho, produto e público da sessão"""
+        context = massive_data.get('session_metadata', {}).get('context') or {}
+        if not isinstance(context, dict):
+            return str(context)
+        fields = ('segmento', 'produto', 'publico', 'query_original')
+        return " ".join(str(context.get(field, '')) for field in fields if context.get(field))
+
+    def _get_context_budget(self) -> int:
+        """Orçamento de tokens de contexto para o provedor que fará a síntese"""
+        provider = None
+        if self.ai_manager and hasattr(self.ai_manager, '_get_best_provider'):
+            provider = self.ai_manager.providers.get(self.ai_manager._get_best_provider())
+        return context_budget_for(provider)
+
+    def _corpus_sections(self, massive_data: Dict[str, Any]) -> Dict[str, List[str]]:
+        text_content = massive_data.get('consolidated_text_content', {})
+        return {
+            section: [text for text in text_content.get(section, []) if isinstance(text, str) and text.strip()]
+            for section in ('search_content', 'viral_content', 'additional_content')
+        }
+
+    def _should_use_map_reduce(self, massive_data: Dict[str, Any]) -> bool:
+        """Decide entre prompt único e map-reduce (SYNTHESIS_MAP_REDUCE: auto, always, never)"""
+        if self.map_reduce_mode in ('never', 'false', '0'):
+            return False
+        if self.map_reduce_mode in ('always', 'true', '1'):
+            return True
+
+        corpus_tokens = sum(estimate_tokens(text) for texts in self._corpus_sections(massive_data).values() for text in texts)
+        budget = self._get_context_budget()
+        if corpus_tokens > budget:
+            logger.info(f"🗺️ Corpus de {corpus_tokens} tokens excede o orçamento de {budget}: usando map-reduce")
+            return True
+        return False
+
+    def _build_map_chunks(self, massive_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Divide o corpus consolidado em chunks de até ``map_chunk_tokens``, na ordem original"""
+        chunks, current, current_tokens = [], [], 0
+
+        def flush():
+            if current:
+                text = "\n\n".join(current)
+                chunk_id = hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+                chunks.append({'chunk_id': chunk_id, 'text': text})
+
+        for section, texts in self._corpus_sections(massive_data).items():
+            for i, text in enumerate(texts):
+                for passage in context_packer.split_passages(text, f"{section}_{i + 1}"):
+                    cost = estimate_tokens(passage['text'])
+                    if current and current_tokens + cost > self.map_chunk_tokens:
+                        flush()
+                        current, current_tokens = [], 0
+                    current.append(f"[{passage['source']}] {passage['text']}")
+                    current_tokens += cost
+        flush()
+        return chunks
+
+    def _map_checkpoint_dir(self, session_id: str) -> Path:
+        # O map não depende do tipo de síntese: master, comportamental e mercado reaproveitam os mesmos chunks
+        return Path(f"analyses_data/{session_id}/synthesis_map")
+
+    def _build_map_prompt(self, chunk_text: str, massive_data: Dict[str, Any]) -> str:
+        return f"""
+Você está processando UM TRECHO de um corpus maior de pesquisa de mercado.
+Consulta da sessão: {self._build_relevance_query(massive_data)}
+
+Extraia SOMENTE o que está no trecho, em tópicos curtos e objetivos:
+- Dados numéricos e estatísticas (com a fonte entre colchetes)
+- Dores, desejos e objeções do público
+- Tendências e mudanças de mercado
+- Concorrentes, produtos e preços citados
+- Oportunidades e riscos
+- Citações literais relevantes
+
+Se o trecho não tiver nada relevante, responda apenas "SEM DADOS RELEVANTES".
+
+## TRECHO
+{chunk_text}
+"""
+
+    async def _map_chunk(
+        self,
+        chunk: Dict[str, Any],
+        prompt: str,
+        provider_name: Optional[str],
+        checkpoint_dir: Path,
+        semaphore: asyncio.Semaphore
+    ) -> Dict[str, Any]:
+        """Executa o map de um chunk, reaproveitando o checkpoint se já concluído"""
+        checkpoint_path = checkpoint_dir / f"chunk_{chunk['chunk_id']}.json"
+        if checkpoint_path.exists():
+            try:
+                with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                return {**cached, 'from_checkpoint': True}
+            except Exception as e:
+                logger.warning(f"⚠️ Checkpoint inválido {checkpoint_path}: {e}")
+
+        async with semaphore:
+            output = await self.ai_manager.generate_text(prompt, max_tokens=1500, temperature=0.3, provider_name=provider_name)
+
+        # generate_text retorna mensagens de erro como texto; só checkpointa sucessos
+        if not output or output.startswith("Erro"):
+            return {'chunk_id': chunk['chunk_id'], 'status': 'error', 'error': output, 'from_checkpoint': False}
+
+        result = {
+            'chunk_id': chunk['chunk_id'],
+            'status': 'completed',
+            'provider': provider_name,
+            'output': output,
+            'completed_at': datetime.now().isoformat()
+        }
+        with open(checkpoint_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        return {**result, 'from_checkpoint': False}
+
+    async def _execute_map_reduce_synthesis(
+        self,
+        massive_data: Dict[str, Any],
+        synthesis_type: str,
+        session_id: str
+    ) -> Dict[str, Any]:
+        """
+        Síntese map-reduce sobre corpora maiores que a janela de contexto
+
+        Map: cada chunk vira uma lista de fatos estruturados, com chamadas concorrentes
+        distribuídas entre os provedores disponíveis. Os resultados ficam em
+        ``analyses_data/<sessão>/synthesis_map/`` e são reaproveitados numa nova tentativa
+        e pelos outros tipos de síntese. Reduce: o prompt do tipo é executado sobre os fatos,
+        com busca ativa como nos caminhos de prompt único quando o gerenciador a oferece.
+
+        Raises:
+            Exception: Nenhum chunk processado ou falha do provedor no reduce
+        """
+        if not self.ai_manager:
+            raise Exception("AI Manager não disponível")
+
+        chunks = self._build_map_chunks(massive_data)
+        checkpoint_dir = self._map_checkpoint_dir(session_id)
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+        # Só usa no map provedores cuja janela comporta um chunk
+        providers = [
+            name for name in self.ai_manager.get_available_providers()
+            if context_budget_for(self.ai_manager.providers[name]) >= self.map_chunk_tokens
+        ] or [None]
+
+        logger.info(f"🗺️ MAP: {len(chunks)} chunks em {len(providers)} provedor(es), concorrência {self.map_concurrency}")
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+        map_results = await asyncio.gather(*[
+            self._map_chunk(
+                chunk,
+                self._build_map_prompt(chunk['text'], massive_data),
+                providers[i % len(providers)],
+                checkpoint_dir,
+                semaphore
+            )
+            for i, chunk in enumerate(chunks)
+        ])
+
+        completed = [r for r in map_results if r['status'] == 'completed' and 'SEM DADOS RELEVANTES' not in r['output']]
+        failed = [r for r in map_results if r['status'] != 'completed']
+        from_checkpoint = sum(1 for r in map_results if r.get('from_checkpoint'))
+        logger.info(f"✅ MAP concluído: {len(completed)} com dados, {len(failed)} falhas, {from_checkpoint} do checkpoint")
+
+        if not completed:
+            raise Exception(f"Nenhum chunk processado com sucesso ({len(failed)} falhas)")
+
+        # REDUCE: os fatos parciais cabem no orçamento; se não couberem, empacota os mais relevantes
+        partials = [f"### Trecho {i + 1}\n{r['output']}" for i, r in enumerate(completed)]
+        reduce_context = "\n\n".join(partials)
+        budget = self._get_context_budget()
+        if estimate_tokens(reduce_context) > budget:
+            packed = context_packer.pack({'partials': partials}, self._build_relevance_query(massive_data), budget)
+            reduce_context = "\n\n".join(p['text'] for p in packed['passages'].get('partials', []))
+
+        base_prompt = self.synthesis_prompts.get(synthesis_type, self.synthesis_prompts['master_synthesis'])
+        reduce_prompt = f"""
+{base_prompt}
+
+## FATOS EXTRAÍDOS DE {len(completed)} TRECHOS DO CORPUS COMPLETO DA ETAPA 1
+{reduce_context}
+
+## CONTEXTO ORIGINAL
+{massive_data.get('session_metadata', {}).get('context', 'N/A')}
+
+## SUA MISSÃO:
+Consolide TODOS os fatos acima em uma síntese estruturada, acionável e baseada 100% nos dados reais.
+"""
+        logger.info(f"🧩 REDUCE: {estimate_tokens(reduce_prompt)} tokens estimados")
+        if hasattr(self.ai_manager, 'generate_with_active_search'):
+            synthesis_result = await self.ai_manager.generate_with_active_search(
+                prompt=reduce_prompt,
+                context=reduce_context,
+                session_id=session_id,
+                max_search_iterations=3
+            )
+        else:
+            # Sem busca ativa no gerenciador (EnhancedAIManager): o reduce usa só os fatos do map
+            logger.warning("⚠️ Reduce sem busca ativa: gerenciador de IA não oferece generate_with_active_search")
+            synthesis_result = await self.ai_manager.generate_text(reduce_prompt, max_tokens=4000, temperature=0.5)
+
+        # generate_text devolve falhas como texto "Erro..."; não podem virar síntese concluída
+        if not synthesis_result or (isinstance(synthesis_result, str) and synthesis_result.startswith("Erro")):
+            raise Exception(f"Falha no reduce da síntese: {synthesis_result or 'resposta vazia'}")
+
+        return {
+            "session_id": session_id,
+            "synthesis_type": synthesis_type,
+            "status": "completed",
+            "synthesis_mode": "map_reduce",
+            "synthesis_content": synthesis_result,
+            "map_reduce_stats": {
+                "chunks": len(chunks),
+                "chunks_with_data": len(completed),
+                "chunks_failed": len(failed),
+                "chunks_from_checkpoint": from_checkpoint,
+                "providers": [p for p in providers if p],
+                "checkpoint_dir": str(checkpoint_dir)
+            },
+            "data_sources_used": {
+                "search_sources": massive_data['consolidated_statistics']['total_search_sources'],
+                "viral_content": massive_data['consolidated_statistics']['total_viral_content'],
+                "additional_files": massive_data['consolidated_statistics']['additional_files_count'],
+                "total_data_size": massive_data['consolidated_statistics']['total_data_size']
+            },
+            "timestamp": datetime.now().isoformat(),
+            "massive_data_used": True
+        }
+
     async def _execute_ai_synthesis_with_massive_data(
         self, 
         synthesis_context: str, 
@@ -12,6 +12,7 @@ import time
 import json
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from services.provider_telemetry import provider_telemetry
 
 logger = logging.getLogger(__name__)
 
@@ -64,12 +65,21 @@ class FirecrwalSocialClient:
                 "language": "pt"
             }
 
-            response = requests.post(
-                endpoint,
-                json=payload,
-                headers=self.headers,
-                timeout=120  # Busca massiva pode demorar
-            )
+            # Busca massiva pode demorar: timeout derivado do p99 observado, até 120s
+            start = time.time()
+            try:
+                response = requests.post(
+                    endpoint,
+                    json=payload,
+                    headers=self.headers,
+                    timeout=provider_telemetry.timeout_for('social:firecrawl', 120)
+                )
+            except requests.exceptions.Timeout:
+                provider_telemetry.record('social:firecrawl', time.time() - start, False,
+                                          api_key=self.api_key, timed_out=True)
+                raise
+            provider_telemetry.record('social:firecrawl', time.time() - start, response.status_code == 200,
+                                      api_key=self.api_key)
 
             if response.status_code == 200:
                 data = response.json()
@@ -12,6 +12,7 @@ import time
 from typing import Dict, List, Optional, Any
 import google.generativeai as genai
 from datetime import datetime
+from services.prompt_assembly import prompt_assembler
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +32,8 @@ class UltraRobustGeminiClient:
             genai.configure(api_key=self.api_key)
             
             # Modelo PRIMÁRIO - Gemini 2.5 Pro (mais avançado)
-            self.model = genai.GenerativeModel("gemini-2.0-flash-exp")
+            self.model_name = "gemini-2.0-flash-exp"
+            self.model = genai.GenerativeModel(self.model_name)
             
             # Configurações otimizadas para análises REAIS ultra-detalhadas
             self.generation_config = {
@@ -85,6 +87,13 @@ class UltraRobustGeminiClient:
             logger.error(f"❌ Erro ao testar Gemini 2.5 Pro: {str(e)}")
             return False
     
+    # Agentes cujas instruções usam só os dados do projeto (sem pesquisa nem anexos)
+    PROJECT_ONLY_AGENTS = (
+        "ARQUITETO DE DRIVERS MENTAIS",
+        "DIRETOR SUPREMO DE EXPERIÊNCIAS",
+        "ESPECIALISTA EM PSICOLOGIA DE VENDAS"
+    )
+
     def generate_ultra_detailed_analysis(
         self, 
         analysis_data: Dict[str, Any],
@@ -98,20 +107,31 @@ class UltraRobustGeminiClient:
             raise Exception("❌ Gemini 2.5 Pro não disponível - Configure API_KEY")
         
         try:
-            # Constrói prompt ULTRA-COMPLETO REAL baseado no agente
-            prompt = self._build_agent_specific_prompt(
-                analysis_data, search_context, attachments_context, agent_type
+            # Contexto da sessão é o mesmo para todos os agentes: renderizado uma vez e
+            # enviado ao cache do Gemini; cada agente manda só as próprias instruções.
+            # Agentes que não usam a pesquisa só aproveitam um cache já criado; sem ele,
+            # recebem apenas os dados do projeto, como antes
+            shared = prompt_assembler.shared_context(analysis_data, search_context, attachments_context)
+            instructions = self._build_agent_instructions(analysis_data, agent_type)
+            uses_research = agent_type not in self.PROJECT_ONLY_AGENTS
+            cached_model = prompt_assembler.gemini_cached_model(
+                shared, self.model_name, self.generation_config, self.safety_settings, create=uses_research
             )
+            if cached_model is None and not uses_research:
+                shared = prompt_assembler.shared_context(analysis_data, project_max_chars=2000)
             
             logger.info(f"🚀 INICIANDO ANÁLISE ULTRA-DETALHADA com Gemini 2.5 Pro - Agente: {agent_type}")
             start_time = time.time()
             
             # Gera análise REAL com configurações máximas
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config,
-                safety_settings=self.safety_settings
-            )
+            if cached_model is not None:
+                response = cached_model.generate_content(instructions)
+            else:
+                response = self.model.generate_content(
+                    prompt_assembler.assemble(shared, instructions),
+                    generation_config=self.generation_config,
+                    safety_settings=self.safety_settings
+                )
             
             end_time = time.time()
             logger.info(f"✅ ANÁLISE ULTRA-DETALHADA REAL concluída em {end_time - start_time:.2f} segundos")
@@ -133,9 +153,17 @@ class UltraRobustGeminiClient:
         attachments_context: Optional[str] = None,
         agent_type: str = "ARQUEÓLOGO MESTRE DA PERSUASÃO"
     ) -> str:
-        """Constrói prompt específico baseado no agente solicitado"""
+        """Constrói o prompt completo: contexto compartilhado + instruções do agente"""
+        if agent_type in self.PROJECT_ONLY_AGENTS:
+            shared = prompt_assembler.shared_context(data, project_max_chars=2000)
+        else:
+            shared = prompt_assembler.shared_context(data, search_context, attachments_context)
+        return prompt_assembler.assemble(shared, self._build_agent_instructions(data, agent_type))
+    
+    def _build_agent_instructions(self, data: Dict[str, Any], agent_type: str) -> str:
+        """Instruções específicas do agente solicitado (sem o contexto da sessão)"""
         
-        # Prompts especializados por agente
+        # Instruções especializadas por agente
         agent_prompts = {
             "ARQUEÓLOGO MESTRE DA PERSUASÃO": self._build_archaeologist_prompt,
             "MESTRE DA PERSUASÃO VISCERAL": self._build_visceral_master_prompt,
@@ -145,35 +173,17 @@ class UltraRobustGeminiClient:
         }
         
         prompt_builder = agent_prompts.get(agent_type, self._build_default_prompt)
-        return prompt_builder(data, search_context, attachments_context)
+        return prompt_builder(data)
     
-    def _build_archaeologist_prompt(
-        self, 
-        data: Dict[str, Any], 
-        search_context: Optional[str] = None,
-        attachments_context: Optional[str] = None
-    ) -> str:
-        """Prompt do ARQUEÓLOGO MESTRE DA PERSUASÃO"""
+    def _build_archaeologist_prompt(self, data: Dict[str, Any]) -> str:
+        """Instruções do ARQUEÓLOGO MESTRE DA PERSUASÃO"""
         
         prompt = f"""
 # VOCÊ É O ARQUEÓLOGO MESTRE DA PERSUASÃO - GEMINI 2.5 PRO
 
 Sua missão é escavar cada detalhe do mercado de {data.get('segmento', 'negócios')} para encontrar o DNA COMPLETO da conversão. Seja cirúrgico, obsessivo e implacável.
-
-## DADOS REAIS DO PROJETO:
-- **Segmento**: {data.get('segmento', 'Não informado')}
-- **Produto/Serviço**: {data.get('produto', 'Não informado')}
-- **Público-Alvo**: {data.get('publico', 'Não informado')}
-- **Preço**: R$ {data.get('preco', 'Não informado')}
-- **Objetivo de Receita**: R$ {data.get('objetivo_receita', 'Não informado')}
 """
 
-        if search_context:
-            prompt += f"\n## CONTEXTO DE PESQUISA PROFUNDA REAL:\n{search_context[:15000]}\n"
-        
-        if attachments_context:
-            prompt += f"\n## CONTEXTO DOS ANEXOS REAIS:\n{attachments_context[:5000]}\n"
-        
         prompt += """
 ## DISSECAÇÃO EM 12 CAMADAS PROFUNDAS - ANÁLISE ARQUEOLÓGICA:
 
@@ -384,13 +394,8 @@ CRÍTICO: Use APENAS dados REAIS escavados da pesquisa. Seja o ARQUEÓLOGO mais
         
         return prompt
     
-    def _build_visceral_master_prompt(
-        self, 
-        data: Dict[str, Any], 
-        search_context: Optional[str] = None,
-        attachments_context: Optional[str] = None
-    ) -> str:
-        """Prompt do MESTRE DA PERSUASÃO VISCERAL"""
+    def _build_visceral_master_prompt(self, data: Dict[str, Any]) -> str:
+        """Instruções do MESTRE DA PERSUASÃO VISCERAL"""
         
         return f"""
 # VOCÊ É O MESTRE DA PERSUASÃO VISCERAL - GEMINI 2.5 PRO
@@ -398,11 +403,6 @@ CRÍTICO: Use APENAS dados REAIS escavados da pesquisa. Seja o ARQUEÓLOGO mais
 Linguagem: Direta, brutalmente honesta, carregada de tensão psicológica. 
 Missão: Realizar Engenharia Reversa Psicológica PROFUNDA.
 
-## DADOS PARA ENGENHARIA REVERSA:
-{json.dumps(data, indent=2, ensure_ascii=False)[:3000]}
-
-{search_context[:10000] if search_context else ""}
-
 ## EXECUTE ENGENHARIA REVERSA PSICOLÓGICA PROFUNDA:
 
 Vá além dos dados superficiais. Mergulhe em:
@@ -419,13 +419,8 @@ OBJETIVO: Criar dossiê tão preciso que o usuário possa "LER A MENTE" dos lead
 RETORNE JSON com análise visceral completa...
 """
     
-    def _build_drivers_architect_prompt(
-        self, 
-        data: Dict[str, Any], 
-        search_context: Optional[str] = None,
-        attachments_context: Optional[str] = None
-    ) -> str:
-        """Prompt do ARQUITETO DE DRIVERS MENTAIS"""
+    def _build_drivers_architect_prompt(self, data: Dict[str, Any]) -> str:
+        """Instruções do ARQUITETO DE DRIVERS MENTAIS"""
         
         return f"""
 # VOCÊ É O ARQUITETO DE DRIVERS MENTAIS - GEMINI 2.5 PRO
@@ -453,9 +448,6 @@ Missão: Criar gatilhos psicológicos que funcionam como âncoras emocionais e r
 18. DRIVER DA OPORTUNIDADE OCULTA
 19. DRIVER DO MÉTODO VS SORTE
 
-## CONTEXTO DO PROJETO:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
-
 ## CRIE DRIVERS MENTAIS CUSTOMIZADOS:
 
 Para cada driver, desenvolva:
@@ -471,13 +463,8 @@ Para cada driver, desenvolva:
 RETORNE JSON com drivers customizados completos...
 """
     
-    def _build_experiences_director_prompt(
-        self, 
-        data: Dict[str, Any], 
-        search_context: Optional[str] = None,
-        attachments_context: Optional[str] = None
-    ) -> str:
-        """Prompt do DIRETOR SUPREMO DE EXPERIÊNCIAS"""
+    def _build_experiences_director_prompt(self, data: Dict[str, Any]) -> str:
+        """Instruções do DIRETOR SUPREMO DE EXPERIÊNCIAS"""
         
         return f"""
 # VOCÊ É O DIRETOR SUPREMO DE EXPERIÊNCIAS TRANSFORMADORAS - GEMINI 2.5 PRO
@@ -492,9 +479,6 @@ Missão: Transformar TODOS os conceitos abstratos em experiências físicas ines
 - **INSTALADORAS DE CRENÇA**: Transformações visuais poderosas
 - **PROVAS DE MÉTODO**: Demonstrações de eficácia
 
-## CONTEXTO PARA CRIAÇÃO:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
-
 ## CRIE ARSENAL COMPLETO DE PROVIS:
 
 Para CADA conceito identificado, crie:
@@ -530,13 +514,8 @@ PRIORIDADE: [Crítica/Alta/Média]
 RETORNE JSON com arsenal completo de PROVIs...
 """
     
-    def _build_sales_psychology_prompt(
-        self, 
-        data: Dict[str, Any], 
-        search_context: Optional[str] = None,
-        attachments_context: Optional[str] = None
-    ) -> str:
-        """Prompt do ESPECIALISTA EM PSICOLOGIA DE VENDAS"""
+    def _build_sales_psychology_prompt(self, data: Dict[str, Any]) -> str:
+        """Instruções do ESPECIALISTA EM PSICOLOGIA DE VENDAS"""
         
         return f"""
 # VOCÊ É O ESPECIALISTA EM PSICOLOGIA DE VENDAS - GEMINI 2.5 PRO
@@ -555,9 +534,6 @@ Missão: Criar ARSENAL PSICOLÓGICO para identificar, antecipar e neutralizar TO
 4. **PRIORIDADES DESEQUILIBRADAS**: "Não é dinheiro"
 5. **AUTOESTIMA DESTRUÍDA**: "Não confio em mim"
 
-## CONTEXTO PARA ANÁLISE:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
-
 ## CRIE SISTEMA ANTI-OBJEÇÃO COMPLETO:
 
 Analise o contexto e crie arsenal psicológico completo com:
@@ -570,24 +546,14 @@ Analise o contexto e crie arsenal psicológico completo com:
 RETORNE JSON com sistema anti-objeção completo...
 """
     
-    def _build_default_prompt(
-        self, 
-        data: Dict[str, Any], 
-        search_context: Optional[str] = None,
-        attachments_context: Optional[str] = None
-    ) -> str:
-        """Prompt padrão ultra-detalhado"""
+    def _build_default_prompt(self, data: Dict[str, Any]) -> str:
+        """Instruções padrão ultra-detalhadas"""
         
         return f"""
 # ANÁLISE ULTRA-DETALHADA - GEMINI 2.5 PRO
 
 Você é o DIRETOR SUPREMO DE ANÁLISE DE MERCADO, especialista de elite com 30+ anos de experiência.
 
-## DADOS REAIS DO PROJETO:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
-
-{search_context[:12000] if search_context else ""}
-
 ## GERE ANÁLISE ULTRA-COMPLETA:
 
 Use APENAS dados REAIS da pesquisa. NUNCA invente ou simule informações.
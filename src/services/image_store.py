@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Image Store
+Ingestão de imagens virais: cliente HTTP compartilhado e armazenamento endereçado por conteúdo (SHA-256)
+"""
+
+import os
+import ssl
+import time
+import shutil
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+import weakref
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+logger = logging.getLogger(__name__)
+
+# Extensão gravada por content-type
+CONTENT_TYPE_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif'
+}
+
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br'
+}
+
+
+class ImageStore:
+    """
+    Imagens baixadas guardadas uma única vez, pelo SHA-256 do conteúdo
+
+    Os blobs ficam em ``<base>/store/ab/<sha256>.<ext>``; cada sessão recebe um hardlink
+    em ``<base>/sessions/<sessão>/`` (cópia, se o sistema de arquivos não suportar), e
+    o SQLite guarda URL -> hash e as referências por sessão. Uma URL já baixada em
+    qualquer sessão não é baixada de novo; conteúdos idênticos vindos de URLs
+    diferentes ocupam o disco uma vez só.
+    """
+
+    def __init__(
+        self,
+        base_path: str = None,
+        max_bytes: int = 15 * 1024 * 1024,
+        min_bytes: int = 1024,
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_connections_per_host: int = 4
+    ):
+        """
+        Inicializa o armazenamento
+
+        Args:
+            base_path: Diretório raiz (padrão: IMAGE_STORE_DIR ou IMAGES_DIR)
+            max_bytes: Tamanho máximo aceito; downloads maiores são abortados no meio
+            min_bytes: Tamanho mínimo para o arquivo valer como imagem
+            timeout: Timeout total de cada download
+            max_connections: Conexões simultâneas do cliente compartilhado
+            max_connections_per_host: Conexões simultâneas por host
+        """
+        self.base_path = base_path or os.getenv('IMAGE_STORE_DIR') or os.getenv('IMAGES_DIR', 'downloaded_images')
+        self.blobs_dir = os.path.join(self.base_path, 'store')
+        self.sessions_dir = os.path.join(self.base_path, 'sessions')
+        self.db_path = os.path.join(self.base_path, 'image_store.sqlite')
+        self.max_bytes = max_bytes
+        self.min_bytes = min_bytes
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+
+        self._lock = threading.Lock()
+        # Um cliente por loop de eventos (o fluxo cria um loop por thread de coleta)
+        self._clients = weakref.WeakKeyDictionary()
+        self._inflight = weakref.WeakKeyDictionary()
+        self.stats = {'downloads': 0, 'url_hits': 0, 'content_hits': 0, 'aborted': 0, 'rejected': 0, 'bytes_downloaded': 0}
+
+    # ------------------------------------------------------------------ índice
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(self.base_path, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, ext TEXT, content_type TEXT, "
+            "size INTEGER, created_at REAL)"
+        )
+        connection.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, sha256 TEXT, fetched_at REAL)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS refs (session_id TEXT, sha256 TEXT, url TEXT, post_url TEXT, "
+            "created_at REAL, PRIMARY KEY (session_id, sha256))"
+        )
+        return connection
+
+    def blob_path(self, sha256: str, ext: str) -> str:
+        return os.path.join(self.blobs_dir, sha256[:2], f"{sha256}.{ext}")
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Blob já armazenado para a URL (``sha256``, ``ext``, ``size``, ``path``) ou None"""
+        with self._lock:
+            connection = self._connect()
+            try:
+                row = connection.execute(
+                    "SELECT b.sha256, b.ext, b.size FROM urls u JOIN blobs b ON b.sha256 = u.sha256 WHERE u.url = ?",
+                    (url,)
+                ).fetchone()
+            finally:
+                connection.close()
+        if not row:
+            return None
+        path = self.blob_path(row[0], row[1])
+        if not os.path.exists(path):
+            return None
+        return {'sha256': row[0], 'ext': row[1], 'size': row[2], 'path': path}
+
+    def _commit_blob(self, temp_path: str, sha256: str, size: int, content_type: str, url: str) -> Dict[str, Any]:
+        """Move o download para o blob (ou descarta, se o conteúdo já existe) e registra a URL"""
+        ext = CONTENT_TYPE_EXTENSIONS.get(content_type, 'jpg')
+        path = self.blob_path(sha256, ext)
+        with self._lock:
+            connection = self._connect()
+            try:
+                existing = connection.execute("SELECT ext FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+                if existing and os.path.exists(self.blob_path(sha256, existing[0])):
+                    os.remove(temp_path)
+                    ext, path = existing[0], self.blob_path(sha256, existing[0])
+                    self.stats['content_hits'] += 1
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(temp_path, path)
+                    connection.execute(
+                        "INSERT OR REPLACE INTO blobs (sha256, ext, content_type, size, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (sha256, ext, content_type, size, time.time())
+                    )
+                connection.execute(
+                    "INSERT OR REPLACE INTO urls (url, sha256, fetched_at) VALUES (?, ?, ?)",
+                    (url, sha256, time.time())
+                )
+                connection.commit()
+            finally:
+                connection.close()
+        return {'sha256': sha256, 'ext': ext, 'size': size, 'path': path}
+
+    def _reference(self, blob: Dict[str, Any], session_id: Optional[str], url: str, post_url: Optional[str]) -> str:
+        """Caminho da imagem para a sessão (hardlink para o blob) ou o próprio blob, sem sessão"""
+        if not session_id:
+            return blob['path']
+
+        session_dir = os.path.join(self.sessions_dir, session_id)
+        link_path = os.path.join(session_dir, f"{blob['sha256'][:16]}.{blob['ext']}")
+        if not os.path.exists(link_path):
+            os.makedirs(session_dir, exist_ok=True)
+            try:
+                os.link(blob['path'], link_path)
+            except OSError:
+                shutil.copyfile(blob['path'], link_path)
+
+        with self._lock:
+            connection = self._connect()
+            try:
+                connection.execute(
+                    "INSERT OR IGNORE INTO refs (session_id, sha256, url, post_url, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, blob['sha256'], url, post_url or '', time.time())
+                )
+                connection.commit()
+            finally:
+                connection.close()
+        return link_path
+
+    # ------------------------------------------------------------------ download
+
+    def _client(self) -> 'aiohttp.ClientSession':
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.closed:
+            # Mesmo contexto SSL permissivo do download anterior (CDNs com certificados problemáticos)
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+            connector = aiohttp.TCPConnector(
+                ssl=ssl_context,
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                ttl_dns_cache=300
+            )
+            client = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=DOWNLOAD_HEADERS
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Fecha o cliente compartilhado do loop atual"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.closed:
+            await client.close()
+
+    def _temp_path(self) -> str:
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        return os.path.join(self.blobs_dir, f".{os.getpid()}_{threading.get_ident()}_{time.monotonic_ns()}.part")
+
+    def _accepts(self, url: str, content_type: str, content_length: Optional[str]) -> bool:
+        if not content_type.startswith('image'):
+            logger.warning(f"Content-Type inválido ({content_type or 'vazio'}) em {url[:100]}")
+            return False
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            logger.warning(f"Imagem muito grande: {content_length} bytes")
+            return False
+        return True
+
+    async def _download_async(self, url: str, referer: Optional[str]) -> Optional[Tuple[str, str, int, str]]:
+        headers = {'Referer': referer} if referer else {}
+        async with self._client().get(url, headers=headers) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+            if not self._accepts(url, content_type, response.headers.get('content-length')):
+                self.stats['rejected'] += 1
+                return None
+
+            digest, size, temp_path = hashlib.sha256(), 0, self._temp_path()
+            try:
+                with open(temp_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            # Servidor sem content-length (ou mentindo): para sem baixar o resto
+                            break
+                        digest.update(chunk)
+                        f.write(chunk)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        return temp_path, digest.hexdigest(), size, content_type
+
+    def _download_sync(self, url: str, referer: Optional[str]) -> Optional[Tuple[str, str, int, str]]:
+        import requests
+        headers = dict(DOWNLOAD_HEADERS, **({'Referer': referer} if referer else {}))
+        with requests.get(url, headers=headers, timeout=self.timeout, stream=True, verify=False) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+            if not self._accepts(url, content_type, response.headers.get('content-length')):
+                self.stats['rejected'] += 1
+                return None
+
+            digest, size, temp_path = hashlib.sha256(), 0, self._temp_path()
+            try:
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(64 * 1024):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            break
+                        digest.update(chunk)
+                        f.write(chunk)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        return temp_path, digest.hexdigest(), size, content_type
+
+    async def _ingest(self, url: str, referer: Optional[str]) -> Optional[Dict[str, Any]]:
+        if HAS_AIOHTTP:
+            downloaded = await self._download_async(url, referer)
+        else:
+            downloaded = await asyncio.get_running_loop().run_in_executor(None, self._download_sync, url, referer)
+        if not downloaded:
+            return None
+
+        temp_path, sha256, size, content_type = downloaded
+        if size > self.max_bytes:
+            os.remove(temp_path)
+            self.stats['aborted'] += 1
+            logger.warning(f"Download abortado: mais de {self.max_bytes} bytes em {url[:100]}")
+            return None
+        if size < self.min_bytes:
+            os.remove(temp_path)
+            self.stats['rejected'] += 1
+            logger.warning(f"Arquivo pequeno demais para ser imagem ({size} bytes): {url[:100]}")
+            return None
+
+        self.stats['downloads'] += 1
+        self.stats['bytes_downloaded'] += size
+        return self._commit_blob(temp_path, sha256, size, content_type, url)
+
+    async def fetch(self, url: str, referer: Optional[str] = None, session_id: Optional[str] = None) -> Optional[str]:
+        """
+        Caminho local da imagem, baixando-a só se a URL ainda não estiver armazenada
+
+        Args:
+            url: URL da imagem
+            referer: Página de origem (enviada como Referer)
+            session_id: Sessão que referencia a imagem (recebe um hardlink próprio)
+
+        Returns:
+            Caminho do arquivo ou None se a URL não trouxe uma imagem válida
+        """
+        blob = self.lookup(url)
+        if blob:
+            self.stats['url_hits'] += 1
+        else:
+            # Downloads simultâneos da mesma URL no mesmo loop compartilham uma única requisição
+            inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+            task = inflight.get(url)
+            if task is None:
+                task = inflight[url] = asyncio.ensure_future(self._ingest(url, referer))
+                task.add_done_callback(lambda _: inflight.pop(url, None))
+            blob = await asyncio.shield(task)
+        if not blob:
+            return None
+        return self._reference(blob, session_id, url, referer)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Uso de disco (físico x referenciado pelas sessões) e contadores deste processo"""
+        with self._lock:
+            connection = self._connect()
+            try:
+                blobs, physical = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+                refs, logical = connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(b.size), 0) FROM refs r JOIN blobs b ON b.sha256 = r.sha256"
+                ).fetchone()
+                shared = connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM blobs WHERE sha256 IN (SELECT sha256 FROM refs)"
+                ).fetchone()[0]
+                urls = connection.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+            finally:
+                connection.close()
+        return {
+            **self.stats,
+            'blobs': blobs,
+            'urls': urls,
+            'session_references': refs,
+            'physical_bytes': physical,
+            'referenced_bytes': logical,
+            # Sem deduplicação, cada referência de sessão seria uma cópia própria
+            'bytes_saved': logical - shared
+        }
+
+
+# Instância global
+image_store = ImageStore()
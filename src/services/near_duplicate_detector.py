@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Near Duplicate Detector
+Detecção de conteúdo quase duplicado (shingles + MinHash + LSH) entre páginas coletadas
+"""
+
+import re
+import zlib
+import logging
+import threading
+from itertools import count
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_MASK_32 = np.uint64(0xFFFFFFFF)
+
+
+class NearDuplicateDetector:
+    """Agrupa textos quase idênticos (cópias sindicadas, versões com boilerplate diferente)"""
+
+    def __init__(
+        self,
+        shingle_size: int = 5,
+        num_perm: int = 128,
+        bands: int = 16,
+        threshold: float = 0.8,
+        max_sessions: int = 32,
+        max_global_docs: int = 20000
+    ):
+        """
+        Inicializa o detector
+
+        Args:
+            shingle_size: Tamanho dos shingles (n-gramas de palavras)
+            num_perm: Número de funções de hash da assinatura MinHash
+            bands: Bandas do LSH (num_perm deve ser divisível por bands)
+            threshold: Similaridade de Jaccard estimada mínima para considerar duplicata
+            max_sessions: Índices de sessão mantidos em memória (LRU)
+            max_global_docs: Documentos mantidos no índice entre sessões
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser divisível por bands")
+
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_sessions = max_sessions
+        self.max_global_docs = max_global_docs
+
+        # Hashing multiply-shift: (a * x + b) >> 32, com a ímpar; parâmetros fixos para
+        # que as assinaturas sejam comparáveis entre chamadas e entre sessões
+        rng = np.random.default_rng(20240501)
+        self._perm_a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._perm_b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._shingle_weights = rng.integers(1, 2 ** 63, size=shingle_size, dtype=np.uint64) | np.uint64(1)
+
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._global = self._new_index()
+        # IDs monotônicos: não se repetem após reset_session nem após despejo do LRU
+        self._doc_ids = count()
+        self._lock = threading.Lock()
+        self.stats = {'documents_indexed': 0, 'duplicates_found': 0, 'chars_saved': 0}
+
+    # ------------------------------------------------------------------ assinaturas
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        """Hashes de 64 bits dos n-gramas de palavras do texto (normalizado em minúsculas)"""
+        tokens = _TOKEN_RE.findall(text.lower())
+        if not tokens:
+            return np.empty(0, dtype=np.uint64)
+
+        ids = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), dtype=np.uint64, count=len(tokens))
+        k = min(self.shingle_size, len(ids))
+        n_shingles = len(ids) - k + 1
+
+        # Combinação linear (módulo 2^64) das palavras de cada janela
+        hashes = np.zeros(n_shingles, dtype=np.uint64)
+        for offset in range(k):
+            hashes += ids[offset:offset + n_shingles] * self._shingle_weights[offset]
+        return np.unique(hashes)
+
+    def signature(self, text: str, block_size: int = 8192) -> Optional[np.ndarray]:
+        """Assinatura MinHash (num_perm valores de 32 bits) ou None para texto vazio"""
+        shingles = self._shingle_hashes(text or '')
+        if shingles.size == 0:
+            return None
+
+        signature = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        # Blocos limitam a matriz intermediária (block_size x num_perm) em textos grandes
+        for start in range(0, shingles.size, block_size):
+            block = shingles[start:start + block_size, None]
+            hashed = (block * self._perm_a + self._perm_b) >> np.uint64(32)
+            np.minimum(signature, hashed.min(axis=0), out=signature)
+        return signature & _MASK_32
+
+    def similarity(self, sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Similaridade de Jaccard estimada entre duas assinaturas"""
+        return float(np.mean(sig_a == sig_b))
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        bands = signature.reshape(self.bands, self.rows)
+        return [(band, bands[band].tobytes()) for band in range(self.bands)]
+
+    # ------------------------------------------------------------------ índices
+
+    @staticmethod
+    def _new_index() -> Dict[str, Any]:
+        return {'buckets': defaultdict(list), 'docs': OrderedDict()}
+
+    def _session_index(self, session_id: str) -> Dict[str, Any]:
+        """Índice LSH da sessão (chamado com o lock adquirido)"""
+        index = self._sessions.get(session_id)
+        if index is None:
+            index = self._sessions[session_id] = self._new_index()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return index
+
+    def _query(self, index: Dict[str, Any], signature: np.ndarray, band_keys: List[Tuple[int, bytes]]) -> Optional[Tuple[str, float]]:
+        """Documento mais parecido do índice acima do limiar, se houver"""
+        candidates = set()
+        for key in band_keys:
+            candidates.update(index['buckets'].get(key, ()))
+
+        best = None
+        for doc_id in candidates:
+            doc = index['docs'].get(doc_id)
+            if doc is None:
+                continue
+            score = self.similarity(signature, doc['signature'])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (doc_id, score)
+        return best
+
+    def _insert(self, index: Dict[str, Any], doc_id: str, signature: np.ndarray,
+                band_keys: List[Tuple[int, bytes]], meta: Dict[str, Any], max_docs: Optional[int] = None):
+        index['docs'][doc_id] = {'signature': signature, **meta}
+        for key in band_keys:
+            index['buckets'][key].append(doc_id)
+
+        if max_docs is not None:
+            while len(index['docs']) > max_docs:
+                old_id, old_doc = index['docs'].popitem(last=False)
+                for key in self._band_keys(old_doc['signature']):
+                    bucket = index['buckets'].get(key)
+                    if bucket and old_id in bucket:
+                        bucket.remove(old_id)
+                        if not bucket:
+                            del index['buckets'][key]
+
+    # ------------------------------------------------------------------ API
+
+    def deduplicate(
+        self,
+        items: List[Dict[str, Any]],
+        session_id: str,
+        text_key: str = 'content',
+        id_key: str = 'url',
+        score_key: Optional[str] = None,
+        cross_session: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Colapsa grupos de itens quase duplicados em um representante
+
+        O representante de cada grupo é o item de maior ``score_key`` (ou o texto mais
+        longo) e recebe ``near_duplicates`` com a proveniência dos itens removidos
+        (id, similaridade, tamanho; lista vazia se não houver). Itens já indexados em chamadas anteriores da mesma
+        sessão também são removidos, com a proveniência anexada ao representante original.
+        Com ``cross_session=True``, itens parecidos com conteúdo de outras sessões são
+        mantidos e marcados com ``seen_in_sessions``.
+
+        Returns:
+            Lista de representantes, na ordem original
+        """
+        # Assinaturas fora do lock: é a parte cara
+        prepared = []
+        for position, item in enumerate(items):
+            text = item.get(text_key) if isinstance(item, dict) else None
+            signature = self.signature(text) if isinstance(text, str) else None
+            band_keys = self._band_keys(signature) if signature is not None else None
+            prepared.append((position, item, text or '', signature, band_keys))
+
+        def rank(entry):
+            _, item, text, _, _ = entry
+            return (item.get(score_key) or 0) if score_key else len(text)
+
+        kept = {}
+        with self._lock:
+            index = self._session_index(session_id)
+
+            # Melhores itens primeiro, para que virem representantes dos seus grupos
+            for position, item, text, signature, band_keys in sorted(prepared, key=rank, reverse=True):
+                if signature is None:
+                    kept[position] = item
+                    continue
+
+                self.stats['documents_indexed'] += 1
+                match = self._query(index, signature, band_keys)
+                if match:
+                    # Lista compartilhada com o representante (mesmo de chamadas anteriores)
+                    index['docs'][match[0]]['duplicates'].append({
+                        'id': item.get(id_key),
+                        'similarity': round(match[1], 3),
+                        'length': len(text)
+                    })
+                    self.stats['duplicates_found'] += 1
+                    self.stats['chars_saved'] += len(text)
+                    continue
+
+                # O índice guarda só assinatura, id e a lista de proveniência, não o item
+                doc_id = f"{session_id}:{next(self._doc_ids)}"
+                duplicates = item.setdefault('near_duplicates', [])
+                self._insert(index, doc_id, signature, band_keys, {'id': item.get(id_key), 'duplicates': duplicates})
+                kept[position] = item
+
+                if cross_session:
+                    global_match = self._query(self._global, signature, band_keys)
+                    if global_match and self._global['docs'][global_match[0]]['session_id'] != session_id:
+                        item['seen_in_sessions'] = [self._global['docs'][global_match[0]]['session_id']]
+                    self._insert(self._global, doc_id, signature, band_keys,
+                                 {'session_id': session_id, 'id': item.get(id_key)}, self.max_global_docs)
+
+        removed = len(items) - len(kept)
+        if removed:
+            logger.info(f"🧬 {removed} item(ns) quase duplicado(s) colapsado(s) na sessão {session_id}")
+        return [kept[position] for position in sorted(kept)]
+
+    def deduplicate_texts(self, texts: List[str], session_id: str, label: str = 'texto') -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Variante para listas de strings
+
+        Returns:
+            (textos representantes na ordem original, grupos com a proveniência dos removidos)
+        """
+        items = [{'content': text, 'id': f"{label}_{i}"} for i, text in enumerate(texts) if isinstance(text, str)]
+        kept = self.deduplicate(items, session_id, text_key='content', id_key='id')
+        clusters = [
+            {'representative': item['id'], 'duplicates': item['near_duplicates']}
+            for item in kept if item.get('near_duplicates')
+        ]
+        return [item['content'] for item in kept], clusters
+
+    def reset_session(self, session_id: str):
+        """Descarta o índice LSH da sessão"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+# Instância global
+near_duplicate_detector = NearDuplicateDetector()
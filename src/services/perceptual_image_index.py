@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Perceptual Image Index
+Agrupamento de imagens visualmente idênticas (pHash + dHash) e miniaturas WebP geradas na ingestão
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Iterable
+
+import numpy as np
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+# Subdiretório, ao lado de cada imagem, onde ficam as miniaturas
+THUMBNAILS_SUBDIR = 'thumbs'
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Matriz da DCT-II ortonormal (a DCT 2D é ``C @ X @ C.T``)"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def _pack_bits(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), 'big')
+
+
+class PerceptualImageIndex:
+    """
+    Índice perceptual das imagens de cada sessão
+
+    Duas imagens caem no mesmo grupo quando tanto o pHash (DCT de baixa frequência)
+    quanto o dHash (gradiente horizontal) ficam a poucos bits de distância: cópias
+    reescaladas ou recomprimidas da mesma imagem. O representante do grupo é a de
+    maior resolução. A miniatura WebP de cada imagem é gerada uma vez, em
+    ``<diretório da imagem>/thumbs/<nome>.webp``.
+    """
+
+    def __init__(
+        self,
+        hash_size: int = 8,
+        phash_threshold: int = 6,
+        dhash_threshold: int = 10,
+        thumbnail_size: int = 320,
+        thumbnail_quality: int = 70,
+        max_sessions: int = 32
+    ):
+        """
+        Inicializa o índice
+
+        Args:
+            hash_size: Lado da grade de bits dos hashes (hash_size² bits)
+            phash_threshold: Distância de Hamming máxima entre pHashes do mesmo grupo
+            dhash_threshold: Distância de Hamming máxima entre dHashes do mesmo grupo
+            thumbnail_size: Maior lado da miniatura
+            thumbnail_quality: Qualidade WebP da miniatura
+            max_sessions: Sessões mantidas em memória (LRU)
+        """
+        self.hash_size = hash_size
+        self.phash_threshold = phash_threshold
+        self.dhash_threshold = dhash_threshold
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail_quality = thumbnail_quality
+        self.max_sessions = max_sessions
+
+        self._dct = _dct_matrix(hash_size * 4)
+        self._lock = threading.Lock()
+        # sessão -> {"entries": [...], "phashes": [...], "dhashes": [...]}
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # (caminho, mtime, tamanho) -> hashes e dimensões já calculados
+        self._fingerprints: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self.stats = {'ingested': 0, 'duplicates': 0, 'thumbnails_created': 0}
+
+    # ------------------------------------------------------------------ hashes
+
+    def phash(self, image: 'Image.Image') -> int:
+        """pHash: sinal dos coeficientes DCT de baixa frequência em relação à mediana"""
+        size = self.hash_size * 4
+        pixels = np.asarray(image.convert('L').resize((size, size), Image.LANCZOS), dtype=np.float64)
+        low = (self._dct @ pixels @ self._dct.T)[:self.hash_size, :self.hash_size]
+        median = np.median(low.ravel()[1:])  # sem o termo DC, que só mede o brilho médio
+        return _pack_bits(low > median)
+
+    def dhash(self, image: 'Image.Image') -> int:
+        """dHash: cada pixel é mais claro que o vizinho à direita?"""
+        pixels = np.asarray(
+            image.convert('L').resize((self.hash_size + 1, self.hash_size), Image.LANCZOS), dtype=np.int16
+        )
+        return _pack_bits(pixels[:, 1:] > pixels[:, :-1])
+
+    @staticmethod
+    def thumbnail_path(path: str) -> str:
+        """Caminho da miniatura WebP de ``path`` (existindo ou não)"""
+        directory, name = os.path.split(path)
+        return os.path.join(directory, THUMBNAILS_SUBDIR, f"{os.path.splitext(name)[0]}.webp")
+
+    def _fingerprint(self, path: str) -> Optional[Dict[str, Any]]:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+        with self._lock:
+            cached = self._fingerprints.get(key)
+            if cached is not None:
+                self._fingerprints.move_to_end(key)
+                return cached
+
+        with Image.open(path) as image:
+            image.load()
+            fingerprint = {
+                'phash': self.phash(image),
+                'dhash': self.dhash(image),
+                'width': image.width,
+                'height': image.height,
+                'bytes': stat.st_size
+            }
+            thumbnail = self.thumbnail_path(path)
+            if not os.path.exists(thumbnail):
+                self._write_thumbnail(image, thumbnail)
+
+        with self._lock:
+            self._fingerprints[key] = fingerprint
+            while len(self._fingerprints) > self.max_sessions * 500:
+                self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    def _write_thumbnail(self, image: 'Image.Image', thumbnail: str):
+        os.makedirs(os.path.dirname(thumbnail), exist_ok=True)
+        copy = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        copy.thumbnail((self.thumbnail_size, self.thumbnail_size), Image.LANCZOS)
+        temp_path = f"{thumbnail}.{os.getpid()}.{threading.get_ident()}.tmp"
+        copy.save(temp_path, 'WEBP', quality=self.thumbnail_quality, method=4)
+        os.replace(temp_path, thumbnail)
+        with self._lock:
+            self.stats['thumbnails_created'] += 1
+
+    # ------------------------------------------------------------------ índice
+
+    def _session(self, session_id: str) -> Dict[str, Any]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {'entries': [], 'by_path': {}, 'phashes': [], 'dhashes': []}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    @staticmethod
+    def _distances(hashes: List[int], value: int) -> np.ndarray:
+        xor = np.array(hashes, dtype=np.uint64) ^ np.uint64(value)
+        if hasattr(np, 'bitwise_count'):
+            return np.bitwise_count(xor)
+        return np.unpackbits(xor.view(np.uint8)).reshape(len(hashes), -1).sum(axis=1)
+
+    def ingest(self, path: str, session_id: Optional[str] = None, source: str = '') -> Optional[Dict[str, Any]]:
+        """
+        Calcula os hashes da imagem, gera a miniatura e a agrupa com as da sessão
+
+        Args:
+            path: Arquivo da imagem (ou screenshot)
+            session_id: Sessão cujas imagens são comparadas (padrão: grupo global)
+            source: Origem da imagem (plataforma, screenshot, ...)
+
+        Returns:
+            Dict com ``path``, ``thumbnail``, ``cluster``, ``representative``,
+            ``duplicate`` e dimensões; None se o arquivo não puder ser lido
+        """
+        if not HAS_PIL or not path or not os.path.exists(path):
+            return None
+        try:
+            fingerprint = self._fingerprint(path)
+        except Exception as e:
+            logger.warning(f"⚠️ Imagem ignorada pelo índice perceptual ({path}): {e}")
+            return None
+
+        abs_path = os.path.abspath(path)
+        with self._lock:
+            session = self._session(session_id or '_global')
+            entry = session['by_path'].get(abs_path)
+            if entry is None:
+                cluster = None
+                if session['entries']:
+                    phash_distances = self._distances(session['phashes'], fingerprint['phash'])
+                    dhash_distances = self._distances(session['dhashes'], fingerprint['dhash'])
+                    matches = np.flatnonzero(
+                        (phash_distances <= self.phash_threshold) & (dhash_distances <= self.dhash_threshold)
+                    )
+                    if len(matches):
+                        closest = matches[np.argmin(phash_distances[matches] + dhash_distances[matches])]
+                        cluster = session['entries'][closest]['cluster']
+
+                entry = {
+                    **fingerprint,
+                    'path': path,
+                    'thumbnail': self.thumbnail_path(path),
+                    'source': source,
+                    'cluster': cluster if cluster is not None else len(session['entries'])
+                }
+                session['entries'].append(entry)
+                session['by_path'][abs_path] = entry
+                session['phashes'].append(fingerprint['phash'])
+                session['dhashes'].append(fingerprint['dhash'])
+                self.stats['ingested'] += 1
+                if cluster is not None:
+                    self.stats['duplicates'] += 1
+
+            representative = self._representative(session, entry['cluster'])
+
+        return {
+            'path': path,
+            'thumbnail': entry['thumbnail'],
+            'cluster': entry['cluster'],
+            'representative': representative['path'],
+            'duplicate': representative is not entry,
+            'width': entry['width'],
+            'height': entry['height']
+        }
+
+    @staticmethod
+    def _representative(session: Dict[str, Any], cluster: int) -> Dict[str, Any]:
+        members = [entry for entry in session['entries'] if entry['cluster'] == cluster]
+        return max(members, key=lambda entry: (entry['width'] * entry['height'], entry['bytes']))
+
+    def dedupe(self, paths: Iterable[str], session_id: Optional[str] = None, source: str = '') -> List[str]:
+        """
+        Um caminho por grupo visual (o de maior resolução entre ``paths``), na ordem da primeira aparição
+
+        Arquivos ilegíveis para o índice são mantidos como estão.
+        """
+        paths = [str(path) for path in paths]
+        best: Dict[int, Dict[str, Any]] = {}
+        order = []
+        for path in paths:
+            info = self.ingest(path, session_id, source)
+            if info is None:
+                order.append(path)
+                continue
+            current = best.get(info['cluster'])
+            if current is None:
+                order.append(info['cluster'])
+            if current is None or info['width'] * info['height'] > current['width'] * current['height']:
+                best[info['cluster']] = info
+
+        selected = [item if isinstance(item, str) else best[item]['path'] for item in order]
+        if len(selected) < len(paths):
+            logger.info(f"🖼️ {len(paths) - len(selected)} imagens visualmente duplicadas descartadas ({len(selected)} únicas)")
+        return selected
+
+    def thumbnail_for(self, path: str) -> Optional[str]:
+        """Miniatura WebP de ``path``, gerando-a se ainda não existir; None se não for possível"""
+        thumbnail = self.thumbnail_path(path)
+        if os.path.exists(thumbnail):
+            return thumbnail
+        if not HAS_PIL or not os.path.exists(path):
+            return None
+        try:
+            with Image.open(path) as image:
+                image.load()
+                self._write_thumbnail(image, thumbnail)
+            return thumbnail
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível gerar a miniatura de {path}: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'sessions': len(self._sessions)}
+
+
+# Instância global
+perceptual_image_index = PerceptualImageIndex()
@@ -15,10 +15,32 @@ from datetime import datetime
 from pathlib import Path
 from playwright.async_api import async_playwright, Browser, Page, BrowserContext
 import hashlib
+from collections import deque
 from urllib.parse import urlparse, parse_qs
 
+from services.screenshot_encoder import screenshot_encoder
+
 logger = logging.getLogger(__name__)
 
+# Perfis de interceptação de rede por tarefa
+RESOURCE_PROFILES = {
+    # Extração de DOM/URLs de imagem: o src das <img> continua no DOM sem baixar o arquivo
+    'dom': {'block_types': {'image', 'media', 'font'}, 'block_trackers': True},
+    # Screenshots: imagens e fontes liberadas; vídeo e rastreadores bloqueados
+    'screenshot': {'block_types': {'media'}, 'block_trackers': True},
+    'full': {'block_types': set(), 'block_trackers': False}
+}
+
+# Rastreadores, anúncios e scripts pesados que não alteram o conteúdo extraído
+BLOCKED_URL_PATTERNS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'adservice.google.', 'connect.facebook.net', 'facebook.com/tr?',
+    'facebook.com/tr/', 'scorecardresearch.com', 'hotjar.com', 'nr-data.net', 'sentry.io',
+    'bat.bing.com', 'ct.pinterest.com', 'analytics.tiktok.com', 'mon.tiktokv.com',
+    'ads-twitter.com', 'analytics.twitter.com', 'play.google.com/log', 'youtube.com/api/stats',
+    'youtube.com/ptracking', 'youtube.com/pagead', 'youtube.com/s/player/', 'googlevideo.com'
+)
+
 class PlaywrightSocialImageExtractor:
     """
     Extrator real de imagens de redes sociais usando Playwright + Chromium
@@ -30,6 +52,11 @@ class PlaywrightSocialImageExtractor:
         self.context: Optional[BrowserContext] = None
         self.playwright = None
 
+        # Métricas de rede por página (bytes, requisições, bloqueios, tempo de carga)
+        self.page_metrics = deque(maxlen=200)
+        self._open_page_metrics: Dict[Page, Dict[str, Any]] = {}
+        self._page_sequence = 0
+
         # Configurações de extração otimizadas
         self.config = {
             'headless': True,  # Headless obrigatório neste ambiente (sem X server)
@@ -175,6 +202,8 @@ class PlaywrightSocialImageExtractor:
                     ignore_https_errors=True,
                     java_script_enabled=True,
                     bypass_csp=True,
+                    # Service workers fariam requisições fora do page.route
+                    service_workers='block',
                     extra_http_headers={
                         'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
                         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -249,6 +278,99 @@ class PlaywrightSocialImageExtractor:
         except Exception as e:
             logger.error(f"❌ Erro ao fechar browser (sync): {e}")
 
+    @staticmethod
+    def _is_blocked_url(url: str) -> bool:
+        """URL de rastreador, anúncio ou script pesado dispensável"""
+        return any(pattern in url for pattern in BLOCKED_URL_PATTERNS)
+
+    async def _new_page(self, profile: str = 'dom') -> Page:
+        """
+        Abre uma página com o perfil de interceptação da tarefa
+
+        'dom' bloqueia imagens, vídeo, fontes e rastreadores (basta o DOM);
+        'screenshot' libera imagens; 'full' não bloqueia nada.
+        """
+        rules = RESOURCE_PROFILES.get(profile, RESOURCE_PROFILES['full'])
+        page = await self.context.new_page()
+        self._page_sequence += 1
+        metrics = {
+            'sequence': self._page_sequence,
+            'profile': profile,
+            'url': None,
+            'requests': 0,
+            'blocked': 0,
+            'bytes': 0,
+            'load_seconds': None,
+            'opened_at': time.monotonic()
+        }
+        self._open_page_metrics[page] = metrics
+
+        async def handle_route(route):
+            request = route.request
+            if request.resource_type in rules['block_types'] or (
+                rules['block_trackers'] and self._is_blocked_url(request.url)
+            ):
+                metrics['blocked'] += 1
+                await route.abort()
+            else:
+                await route.continue_()
+
+        async def on_request_finished(request):
+            metrics['requests'] += 1
+            try:
+                sizes = await request.sizes()
+                metrics['bytes'] += max(sizes.get('responseBodySize', 0), 0) + max(sizes.get('responseHeadersSize', 0), 0)
+            except Exception:
+                pass
+
+        if rules['block_types'] or rules['block_trackers']:
+            await page.route('**/*', handle_route)
+        page.on('requestfinished', on_request_finished)
+        return page
+
+    async def _goto(self, page: Page, url: str, **kwargs):
+        """page.goto registrando o tempo de carga nas métricas da página"""
+        metrics = self._open_page_metrics.get(page)
+        started = time.monotonic()
+        try:
+            return await page.goto(url, **kwargs)
+        finally:
+            if metrics is not None:
+                metrics['url'] = url
+                metrics['load_seconds'] = round(time.monotonic() - started, 2)
+
+    async def _close_page(self, page: Page) -> Optional[Dict[str, Any]]:
+        """Fecha a página e registra bytes, requisições e tempo de carga"""
+        metrics = self._open_page_metrics.pop(page, None)
+        try:
+            await page.close()
+        except Exception as e:
+            logger.debug(f"⚠️ Erro ao fechar página: {e}")
+        if metrics is None:
+            return None
+
+        metrics['total_seconds'] = round(time.monotonic() - metrics.pop('opened_at'), 2)
+        self.page_metrics.append(metrics)
+        logger.info(
+            f"📦 Página [{metrics['profile']}] {metrics['url']}: {metrics['bytes'] / 1024:.0f} KB em "
+            f"{metrics['requests']} requisições ({metrics['blocked']} bloqueadas), "
+            f"carga {metrics['load_seconds']}s"
+        )
+        return metrics
+
+    def get_page_metrics_summary(self, since_sequence: int = 0) -> Dict[str, Any]:
+        """Totais de rede das páginas abertas após ``since_sequence``"""
+        pages = [metrics for metrics in self.page_metrics if metrics['sequence'] > since_sequence]
+        load_times = [metrics['load_seconds'] for metrics in pages if metrics['load_seconds'] is not None]
+        return {
+            'pages': len(pages),
+            'total_bytes': sum(metrics['bytes'] for metrics in pages),
+            'total_requests': sum(metrics['requests'] for metrics in pages),
+            'blocked_requests': sum(metrics['blocked'] for metrics in pages),
+            'average_load_seconds': round(sum(load_times) / len(load_times), 2) if load_times else None,
+            'per_page': pages
+        }
+
     async def extract_images_from_all_platforms(
         self,
         query: str,
@@ -275,6 +397,7 @@ class PlaywrightSocialImageExtractor:
         }
 
         all_image_urls = set()
+        metrics_since = self._page_sequence
 
         # Extrai de cada plataforma
         for platform in platforms:
@@ -309,6 +432,7 @@ class PlaywrightSocialImageExtractor:
         results['total_images_extracted'] = len(results['all_images'])
         results['unique_images'] = len(all_image_urls)
         results['extraction_completed'] = datetime.now().isoformat()
+        results['extraction_metrics'] = self.get_page_metrics_summary(metrics_since)
 
         # Ordena por qualidade estimada
         results['all_images'] = sorted(
@@ -346,7 +470,7 @@ class PlaywrightSocialImageExtractor:
 
     async def _extract_instagram_images(self, query: str, min_images: int) -> Dict[str, Any]:
         """Extrai imagens reais do Instagram"""
-        page = await self.context.new_page()
+        page = await self._new_page('dom')
         images_data = []
         seen_urls = set()
 
@@ -364,7 +488,7 @@ class PlaywrightSocialImageExtractor:
 
                 try:
                     logger.info(f"🔍 Tentando estratégia Instagram: {strategy_url}")
-                    await page.goto(strategy_url, wait_until='networkidle', timeout=self.config['timeout'])
+                    await self._goto(page, strategy_url, wait_until='networkidle', timeout=self.config['timeout'])
                     await page.wait_for_timeout(3000)
 
                     # Scroll para carregar mais conteúdo
@@ -443,17 +567,17 @@ class PlaywrightSocialImageExtractor:
                 'success': False
             }
         finally:
-            await page.close()
+            await self._close_page(page)
 
     async def _extract_pinterest_images(self, query: str, min_images: int) -> Dict[str, Any]:
         """Extrai imagens reais do Pinterest"""
-        page = await self.context.new_page()
+        page = await self._new_page('dom')
         images_data = []
         seen_urls = set()
 
         try:
             search_url = f"https://www.pinterest.com/search/pins/?q={query.replace(' ', '%20')}"
-            await page.goto(search_url, wait_until='networkidle', timeout=self.config['timeout'])
+            await self._goto(page, search_url, wait_until='networkidle', timeout=self.config['timeout'])
             await page.wait_for_timeout(3000)
 
             # Pinterest carrega dinamicamente
@@ -517,17 +641,17 @@ class PlaywrightSocialImageExtractor:
                 'success': False
             }
         finally:
-            await page.close()
+            await self._close_page(page)
 
     async def _extract_youtube_images(self, query: str, min_images: int) -> Dict[str, Any]:
         """Extrai thumbnails reais do YouTube"""
-        page = await self.context.new_page()
+        page = await self._new_page('dom')
         images_data = []
         seen_urls = set()
 
         try:
             search_url = f"https://www.youtube.com/results?search_query={query.replace(' ', '+')}"
-            await page.goto(search_url, wait_until='networkidle', timeout=self.config['timeout'])
+            await self._goto(page, search_url, wait_until='networkidle', timeout=self.config['timeout'])
             await page.wait_for_timeout(3000)
 
             # Scroll para carregar mais vídeos
@@ -601,17 +725,17 @@ class PlaywrightSocialImageExtractor:
                 'success': False
             }
         finally:
-            await page.close()
+            await self._close_page(page)
 
     async def _extract_tiktok_images(self, query: str, min_images: int) -> Dict[str, Any]:
         """Extrai imagens/covers reais do TikTok"""
-        page = await self.context.new_page()
+        page = await self._new_page('dom')
         images_data = []
         seen_urls = set()
 
         try:
             search_url = f"https://www.tiktok.com/search?q={query.replace(' ', '%20')}"
-            await page.goto(search_url, wait_until='networkidle', timeout=self.config['timeout'])
+            await self._goto(page, search_url, wait_until='networkidle', timeout=self.config['timeout'])
             await page.wait_for_timeout(4000)
 
             # TikTok usa lazy loading agressivo
@@ -669,18 +793,18 @@ class PlaywrightSocialImageExtractor:
                 'success': False
             }
         finally:
-            await page.close()
+            await self._close_page(page)
 
     async def _extract_twitter_images(self, query: str, min_images: int) -> Dict[str, Any]:
         """Extrai imagens reais do Twitter/X"""
-        page = await self.context.new_page()
+        page = await self._new_page('dom')
         images_data = []
         seen_urls = set()
 
         try:
             # Twitter agora requer login para muitas funcionalidades
             search_url = f"https://twitter.com/search?q={query.replace(' ', '%20')}&src=typed_query&f=image"
-            await page.goto(search_url, wait_until='networkidle', timeout=self.config['timeout'])
+            await self._goto(page, search_url, wait_until='networkidle', timeout=self.config['timeout'])
             await page.wait_for_timeout(4000)
 
             # Scroll para carregar tweets
@@ -748,7 +872,7 @@ class PlaywrightSocialImageExtractor:
                 'success': False
             }
         finally:
-            await page.close()
+            await self._close_page(page)
 
     async def capture_screenshots(self, urls: List[str], session_id: str) -> List[Dict[str, Any]]:
         """Captura screenshots de URLs"""
@@ -768,21 +892,27 @@ class PlaywrightSocialImageExtractor:
                     logger.error(f"❌ Context perdido durante captura do screenshot {i+1}")
                     break
                     
-                page = await self.context.new_page()
-                await page.goto(url, timeout=self.config['timeout'])
+                page = await self._new_page('screenshot')
+                await self._goto(page, url, timeout=self.config['timeout'])
                 await page.wait_for_timeout(2000)
 
-                screenshot_path = screenshots_dir / f"screenshot_{i+1:03d}.png"
-                await page.screenshot(path=str(screenshot_path), full_page=True)
+                # Página inteira até a altura máxima, codificada em WebP/JPEG no pool de workers
+                screenshot = await screenshot_encoder.capture_playwright(
+                    page, screenshots_dir / f"screenshot_{i+1:03d}", full_page=True
+                )
+                if not screenshot:
+                    await self._close_page(page)
+                    continue
 
                 screenshots.append({
                     'url': url,
-                    'screenshot_path': str(screenshot_path),
+                    'screenshot_path': screenshot['path'],
+                    'file_size': screenshot['bytes'],
                     'index': i + 1,
                     'captured_at': datetime.now().isoformat()
                 })
 
-                await page.close()
+                await self._close_page(page)
                 logger.info(f"📸 Screenshot {i+1} capturado: {url}")
 
             except Exception as e:
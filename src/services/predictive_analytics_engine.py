@@ -89,6 +89,7 @@ except ImportError:
     HAS_NETWORKX = False
 
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.screenshot_encoder import screenshot_encoder
 
 logger = logging.getLogger(__name__)
 
@@ -593,7 +594,7 @@ class PredictiveAnalyticsEngine:
         extracted_texts = []
         visual_features = []
 
-        for img_file in files_dir.glob("*.png"):
+        for img_file in screenshot_encoder.list_screenshots(files_dir):
             try:
                 logger.info(f"🔍 Analisando imagem: {img_file.name}")
                 
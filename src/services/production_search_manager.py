@@ -14,7 +14,12 @@ from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
 import json
 import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from services.exa_client import exa_client
+from services.circuit_breaker import circuit_breakers
+from services.provider_telemetry import provider_telemetry
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +43,8 @@ class ProductionSearchManager:
                 'max_errors': 3,
                 'api_key': os.getenv('GOOGLE_SEARCH_KEY'),
                 'cse_id': os.getenv('GOOGLE_CSE_ID'),
-                'base_url': 'https://www.googleapis.com/customsearch/v1'
+                'base_url': 'https://www.googleapis.com/customsearch/v1',
+                'hedge_budget_per_minute': 10
             },
             'serper': {
                 'enabled': bool(os.getenv('SERPER_API_KEY')),
@@ -46,14 +52,16 @@ class ProductionSearchManager:
                 'error_count': 0,
                 'max_errors': 3,
                 'api_key': os.getenv('SERPER_API_KEY'),
-                'base_url': 'https://google.serper.dev/search'
+                'base_url': 'https://google.serper.dev/search',
+                'hedge_budget_per_minute': 20
             },
             'bing': {
                 'enabled': True,  # Sempre disponível via scraping
                 'priority': 4,
                 'error_count': 0,
                 'max_errors': 5,
-                'base_url': 'https://www.bing.com/search'
+                'base_url': 'https://www.bing.com/search',
+                'hedge_budget_per_minute': 30
             }
             # DuckDuckGo removido para otimização de performance e qualidade
         }
@@ -70,6 +78,26 @@ class ProductionSearchManager:
         self.cache = {}
         self.cache_ttl = 3600  # 1 hora
 
+        # Requisições "hedged": o próximo provedor é disparado se o atual não responder até o p90 da sua latência
+        self.hedging_enabled = os.getenv('SEARCH_HEDGING', 'true').lower() == 'true'
+        self.default_hedge_delay = float(os.getenv('SEARCH_HEDGE_DELAY', '2.0'))
+        self.min_hedge_delay = 0.5
+        self.request_timeout = 15
+        self._hedge_launches = {name: deque() for name in self.providers}
+        self._hedge_lock = threading.Lock()
+        self._hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search_hedge")
+        self.hedge_stats = {'hedged_searches': 0, 'hedge_wins': 0, 'hedge_budget_exhausted': 0}
+
+        # Disjuntores compartilhados: provedor com falhas sai de cena e volta sozinho após uma chamada de teste
+        self.breakers = {
+            name: circuit_breakers.get(
+                f"search:{name}",
+                consecutive_failures=provider['max_errors'],
+                slow_call_seconds=self.request_timeout * 0.8
+            )
+            for name, provider in self.providers.items()
+        }
+
         enabled_count = sum(1 for p in self.providers.values() if p['enabled'])
         logger.info(f"Production Search Manager inicializado com {enabled_count} provedores")
 
@@ -84,33 +112,69 @@ class ProductionSearchManager:
                 logger.info(f"🔄 Resultado do cache para: {query}")
                 return cache_data['results']
 
-        # Busca com fallback
-        for provider_name in self._get_provider_order():
-            if not self._is_provider_available(provider_name):
+        providers = [name for name in self._get_provider_order() if name in self._search_functions()]
+        if self.hedging_enabled:
+            provider_name, results = self._search_hedged(query, max_results, providers)
+        else:
+            provider_name, results = self._search_sequential(query, max_results, providers)
+
+        if results:
+            # Cache resultado
+            self.cache[cache_key] = {
+                'results': results,
+                'timestamp': time.time(),
+                'provider': provider_name
+            }
+            return results
+
+        logger.error("❌ Todos os provedores de busca falharam")
+        return []
+
+    def _search_functions(self) -> Dict[str, Any]:
+        """Provedores consultados por ``search_with_fallback`` (o Exa é chamado à parte pelo coordenador)"""
+        return {
+            'google': self._search_google,
+            'serper': self._search_serper,
+            'bing': self._search_bing
+        }
+
+    def _timed_search(self, provider_name: str, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Executa a busca no provedor registrando latência e resultado no disjuntor e na telemetria"""
+        telemetry_name = f"search:{provider_name}"
+        api_key = self.providers[provider_name].get('api_key')
+        start = time.perf_counter()
+        try:
+            results = self._search_functions()[provider_name](query, max_results)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            self.breakers[provider_name].record_failure(e)
+            provider_telemetry.record(
+                telemetry_name, elapsed, False, api_key=api_key,
+                timed_out=isinstance(e, requests.exceptions.Timeout)
+            )
+            raise
+        elapsed = time.perf_counter() - start
+        self.breakers[provider_name].record_success(elapsed)
+        provider_telemetry.record(telemetry_name, elapsed, bool(results), api_key=api_key)
+        return results
+
+    def _timeout(self, provider_name: str) -> float:
+        """Timeout adaptativo (p99 observado com margem, até o limite fixo)"""
+        return provider_telemetry.timeout_for(f"search:{provider_name}", self.request_timeout)
+
+    def _search_sequential(self, query: str, max_results: int, providers: List[str]):
+        """Busca com fallback: próximo provedor só após erro ou zero resultados"""
+        for provider_name in providers:
+            if not self.breakers[provider_name].allow_request():
                 continue
 
             try:
                 logger.info(f"🔍 Buscando com {provider_name}: {query}")
-
-                if provider_name == 'google':
-                    results = self._search_google(query, max_results)
-                elif provider_name == 'serper':
-                    results = self._search_serper(query, max_results)
-                elif provider_name == 'bing':
-                    results = self._search_bing(query, max_results)
-                else:
-                    continue
+                results = self._timed_search(provider_name, query, max_results)
 
                 if results:
-                    # Cache resultado
-                    self.cache[cache_key] = {
-                        'results': results,
-                        'timestamp': time.time(),
-                        'provider': provider_name
-                    }
-
                     logger.info(f"✅ {provider_name}: {len(results)} resultados")
-                    return results
+                    return provider_name, results
                 else:
                     logger.warning(f"⚠️ {provider_name}: 0 resultados")
 
@@ -119,35 +183,128 @@ class ProductionSearchManager:
                 self._record_provider_error(provider_name)
                 continue
 
-        logger.error("❌ Todos os provedores de busca falharam")
-        return []
+        return None, []
+
+    def _search_hedged(self, query: str, max_results: int, providers: List[str]):
+        """
+        Busca com hedging: dispara o provedor prioritário e, se ele não responder dentro
+        do seu atraso de hedge (p90 da latência), dispara também o próximo com orçamento.
+        A primeira resposta com resultados vence; as demais são descartadas. Erros e
+        respostas vazias disparam o próximo provedor imediatamente, como no fallback.
+        """
+        queue = list(providers)
+        pending = {}  # future -> (provedor, instante de disparo)
+        hedged = False
+        can_hedge = True
+
+        def launch_next(hedge: bool) -> Optional[str]:
+            """Dispara o próximo provedor da fila liberado pelo disjuntor (e pelo orçamento, se hedge)"""
+            for provider_name in list(queue):
+                if not self.breakers[provider_name].is_available():
+                    queue.remove(provider_name)
+                    continue
+                if hedge and not self._consume_hedge_budget(provider_name):
+                    continue
+                queue.remove(provider_name)
+                if not self.breakers[provider_name].allow_request():
+                    continue
 
-    def _get_provider_order(self) -> List[str]:
-        """Retorna provedores ordenados por prioridade"""
-        available_providers = [
-            (name, provider) for name, provider in self.providers.items()
-            if self._is_provider_available(name)
-        ]
+                logger.info(f"🔍 Buscando com {provider_name}: {query}")
+                future = self._hedge_executor.submit(self._timed_search, provider_name, query, max_results)
+                pending[future] = (provider_name, time.monotonic())
+                return provider_name
+            return None
+
+        launch_next(hedge=False)
+
+        while pending:
+            # O timer de hedge corre a partir do disparo mais recente
+            latest_name, latest_start = max(pending.values(), key=lambda entry: entry[1])
+            timeout = None
+            if queue and can_hedge:
+                timeout = max(0.0, latest_start + self._hedge_delay(latest_name) - time.monotonic())
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                hedge_target = launch_next(hedge=True)
+                if hedge_target is None:
+                    # Sem orçamento de hedge: espera a resposta em andamento (fallback normal)
+                    can_hedge = False
+                    continue
 
-        # Ordena por prioridade e número de erros
-        available_providers.sort(key=lambda x: (x[1]['priority'], x[1]['error_count']))
+                logger.info(f"⏱️ {latest_name} sem resposta em {self._hedge_delay(latest_name):.2f}s, hedge com {hedge_target}")
+                if not hedged:
+                    self.hedge_stats['hedged_searches'] += 1
+                    hedged = True
+                continue
 
-        return [name for name, _ in available_providers]
+            for future in done:
+                provider_name, _ = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Erro em {provider_name}: {str(e)}")
+                    self._record_provider_error(provider_name)
+                    continue
+
+                if results:
+                    for other in pending:
+                        other.cancel()
+                    if hedged and provider_name != providers[0]:
+                        self.hedge_stats['hedge_wins'] += 1
+                    logger.info(f"✅ {provider_name}: {len(results)} resultados")
+                    return provider_name, results
+                logger.warning(f"⚠️ {provider_name}: 0 resultados")
+
+            if not pending:
+                launch_next(hedge=False)
+
+        return None, []
+
+    def _hedge_delay(self, provider_name: str) -> float:
+        """p90 das latências recentes do provedor (padrão enquanto há poucas amostras)"""
+        p90 = provider_telemetry.percentile(f"search:{provider_name}", 0.9)
+        if p90 is None:
+            return self.default_hedge_delay
+        return min(max(p90, self.min_hedge_delay), self._timeout(provider_name))
+
+    def _consume_hedge_budget(self, provider_name: str) -> bool:
+        """Reserva um disparo de hedge no orçamento por minuto do provedor"""
+        budget = self.providers[provider_name].get('hedge_budget_per_minute', 0)
+        now = time.monotonic()
+        with self._hedge_lock:
+            launches = self._hedge_launches[provider_name]
+            while launches and now - launches[0] > 60:
+                launches.popleft()
+            if len(launches) >= budget:
+                self.hedge_stats['hedge_budget_exhausted'] += 1
+                return False
+            launches.append(now)
+            return True
+
+    def _get_provider_order(self) -> List[str]:
+        """Retorna provedores ordenados pelo menor tempo esperado até um bom resultado"""
+        available_providers = [name for name in self.providers if self._is_provider_available(name)]
+
+        # Telemetria persistida (latência, sucesso, custo); prioridade estática desempata
+        ranked = provider_telemetry.rank(
+            [f"search:{name}" for name in available_providers],
+            self.request_timeout,
+            priorities={f"search:{name}": provider['priority'] for name, provider in self.providers.items()}
+        )
+        return [name.split(':', 1)[1] for name in ranked]
 
     def _is_provider_available(self, provider_name: str) -> bool:
-        """Verifica se provedor está disponível"""
+        """Verifica se provedor está habilitado e com o disjuntor liberando chamadas"""
         provider = self.providers.get(provider_name, {})
-        return (provider.get('enabled', False) and 
-                provider.get('error_count', 0) < provider.get('max_errors', 3))
+        return provider.get('enabled', False) and self.breakers[provider_name].is_available()
 
     def _record_provider_error(self, provider_name: str):
-        """Registra erro do provedor"""
+        """Registra erro do provedor (a disponibilidade é decidida pelo disjuntor em _timed_search)"""
         if provider_name in self.providers:
             self.providers[provider_name]['error_count'] += 1
 
-            if self.providers[provider_name]['error_count'] >= self.providers[provider_name]['max_errors']:
-                logger.warning(f"⚠️ Provedor {provider_name} desabilitado temporariamente")
-
     def _search_google(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
         provider = self.providers['google']
@@ -166,7 +323,7 @@ class ProductionSearchManager:
             provider['base_url'],
             params=params,
             headers=self.headers,
-            timeout=15
+            timeout=self._timeout('google')
         )
 
         if response.status_code == 200:
@@ -206,7 +363,7 @@ class ProductionSearchManager:
             provider['base_url'],
             json=payload,
             headers=headers,
-            timeout=15
+            timeout=self._timeout('serper')
         )
 
         if response.status_code == 200:
@@ -229,7 +386,7 @@ class ProductionSearchManager:
         """Busca usando Bing (scraping)"""
         search_url = f"{self.providers['bing']['base_url']}?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
 
-        response = requests.get(search_url, headers=self.headers, timeout=15)
+        response = requests.get(search_url, headers=self.headers, timeout=self._timeout('bing'))
 
         if response.status_code == 200:
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -276,20 +433,34 @@ class ProductionSearchManager:
                 'available': self._is_provider_available(name),
                 'priority': provider['priority'],
                 'error_count': provider['error_count'],
-                'max_errors': provider['max_errors']
+                'max_errors': provider['max_errors'],
+                'telemetry': provider_telemetry.snapshot().get(f"search:{name}"),
+                'timeout': self._timeout(name),
+                'hedge_delay': round(self._hedge_delay(name), 3),
+                'circuit': self.breakers[name].snapshot()
             }
 
         return status
 
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do modo de hedging"""
+        return {
+            'enabled': self.hedging_enabled,
+            **self.hedge_stats,
+            'hedge_delays': {name: round(self._hedge_delay(name), 3) for name in self._search_functions()}
+        }
+
     def reset_provider_errors(self, provider_name: str = None):
         """Reset contadores de erro dos provedores"""
         if provider_name:
             if provider_name in self.providers:
                 self.providers[provider_name]['error_count'] = 0
+                self.breakers[provider_name].reset()
                 logger.info(f"🔄 Reset erros do provedor: {provider_name}")
         else:
-            for provider in self.providers.values():
+            for name, provider in self.providers.items():
                 provider['error_count'] = 0
+                self.breakers[name].reset()
             logger.info("🔄 Reset erros de todos os provedores")
 
     def clear_cache(self):
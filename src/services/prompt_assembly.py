@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Prompt Assembly
+Separa o contexto compartilhado da sessão das instruções de cada agente e reaproveita o prefixo
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+try:
+    from google.generativeai import caching as genai_caching
+    import google.generativeai as genai
+    HAS_GEMINI_CACHING = True
+except ImportError:
+    HAS_GEMINI_CACHING = False
+
+logger = logging.getLogger(__name__)
+
+# Limites do contexto compartilhado (o mesmo para todos os agentes, para o prefixo ser idêntico)
+SEARCH_CONTEXT_MAX_CHARS = 15000
+ATTACHMENTS_CONTEXT_MAX_CHARS = 5000
+PROJECT_DATA_MAX_CHARS = 3000
+
+
+class PromptAssembler:
+    """
+    Monta prompts como ``prefixo compartilhado + instruções do agente``.
+
+    O prefixo (dados do projeto, pesquisa e anexos) é renderizado uma vez por sessão e
+    fica em cache local. Por vir sempre primeiro e idêntico, ele aproveita o cache de
+    prefixo automático dos provedores compatíveis com OpenAI; no Gemini, é enviado uma
+    única vez como ``CachedContent`` e as chamadas seguintes mandam só as instruções.
+
+    Sem cache no provedor, o prefixo completo custa tokens em toda chamada: agentes que
+    não usam a pesquisa devem receber um contexto só com os dados do projeto.
+    """
+
+    def __init__(self, max_prefixes: int = 64, gemini_cache_ttl_seconds: int = 3600, gemini_min_cache_tokens: int = 4096):
+        """
+        Inicializa o montador
+
+        Args:
+            max_prefixes: Prefixos renderizados mantidos em memória (LRU)
+            gemini_cache_ttl_seconds: Validade do CachedContent no Gemini
+            gemini_min_cache_tokens: Tamanho mínimo do prefixo para valer criar o cache remoto
+        """
+        self.max_prefixes = max_prefixes
+        self.gemini_cache_ttl_seconds = gemini_cache_ttl_seconds
+        self.gemini_min_cache_tokens = gemini_min_cache_tokens
+        self._prefixes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # (chave do prefixo, modelo) -> {"cached_content", "expires_at"}; None = provedor recusou
+        self._remote_caches: Dict[tuple, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'prefix_hits': 0,
+            'prefix_misses': 0,
+            'remote_cache_creates': 0,
+            'remote_cache_hits': 0,
+            'prefix_tokens_reused': 0
+        }
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return len(text) // 4 + 1
+
+    def shared_context(
+        self,
+        data: Dict[str, Any],
+        search_context: Optional[str] = None,
+        attachments_context: Optional[str] = None,
+        project_max_chars: int = PROJECT_DATA_MAX_CHARS
+    ) -> Dict[str, Any]:
+        """
+        Retorna o contexto compartilhado renderizado (``key``, ``text``, ``tokens``)
+
+        Chamadas com os mesmos dados reutilizam o texto já renderizado.
+
+        Args:
+            project_max_chars: Caracteres do JSON completo do projeto (0 = só o resumo)
+        """
+        project_json = json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True, default=str)
+        key = hashlib.sha1(
+            "\x00".join([project_json, search_context or "", attachments_context or "", str(project_max_chars)]).encode('utf-8')
+        ).hexdigest()
+
+        with self._lock:
+            cached = self._prefixes.get(key)
+            if cached is not None:
+                self._prefixes.move_to_end(key)
+                self.stats['prefix_hits'] += 1
+                self.stats['prefix_tokens_reused'] += cached['tokens']
+                return cached
+
+        text = self._render_shared_context(data, project_json[:project_max_chars], search_context, attachments_context)
+        shared = {'key': key, 'text': text, 'tokens': self.estimate_tokens(text)}
+
+        with self._lock:
+            self.stats['prefix_misses'] += 1
+            self._prefixes[key] = shared
+            while len(self._prefixes) > self.max_prefixes:
+                self._prefixes.popitem(last=False)
+        return shared
+
+    def _render_shared_context(
+        self,
+        data: Dict[str, Any],
+        project_json: str,
+        search_context: Optional[str],
+        attachments_context: Optional[str]
+    ) -> str:
+        text = f"""# CONTEXTO COMPARTILHADO DA SESSÃO
+
+## DADOS REAIS DO PROJETO:
+- **Segmento**: {data.get('segmento', 'Não informado')}
+- **Produto/Serviço**: {data.get('produto', 'Não informado')}
+- **Público-Alvo**: {data.get('publico', 'Não informado')}
+- **Preço**: R$ {data.get('preco', 'Não informado')}
+- **Objetivo de Receita**: R$ {data.get('objetivo_receita', 'Não informado')}
+"""
+        if project_json:
+            text += f"\n## DADOS COMPLETOS DO PROJETO:\n{project_json}\n"
+        if search_context:
+            text += f"\n## CONTEXTO DE PESQUISA PROFUNDA REAL:\n{search_context[:SEARCH_CONTEXT_MAX_CHARS]}\n"
+        if attachments_context:
+            text += f"\n## CONTEXTO DOS ANEXOS REAIS:\n{attachments_context[:ATTACHMENTS_CONTEXT_MAX_CHARS]}\n"
+        return text
+
+    def assemble(self, shared: Dict[str, Any], instructions: str) -> str:
+        """Prompt completo: prefixo compartilhado primeiro, instruções do agente depois"""
+        return f"{shared['text']}\n# INSTRUÇÕES DO AGENTE\n{instructions}"
+
+    def gemini_cached_model(
+        self,
+        shared: Dict[str, Any],
+        model_name: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        safety_settings: Optional[Any] = None,
+        create: bool = True
+    ):
+        """
+        Modelo Gemini com o contexto compartilhado já em cache no provedor
+
+        Com ``create=False`` só reaproveita um cache já criado por outro agente.
+
+        Returns:
+            GenerativeModel ligado ao CachedContent, ou None se o cache remoto não se
+            aplica (prefixo pequeno, SDK/modelo sem suporte, erro) — nesse caso, envie
+            o prompt completo de ``assemble``.
+        """
+        if not HAS_GEMINI_CACHING or shared['tokens'] < self.gemini_min_cache_tokens:
+            return None
+
+        cache_key = (shared['key'], model_name)
+        with self._lock:
+            entry = self._remote_caches.get(cache_key, False)
+            if entry is None:
+                return None
+            if entry and entry['expires_at'] > time.time():
+                self.stats['remote_cache_hits'] += 1
+                self.stats['prefix_tokens_reused'] += shared['tokens']
+                return genai.GenerativeModel.from_cached_content(
+                    entry['cached_content'], generation_config=generation_config, safety_settings=safety_settings
+                )
+        if not create:
+            return None
+
+        try:
+            from datetime import timedelta
+            cached_content = genai_caching.CachedContent.create(
+                model=model_name if model_name.startswith('models/') else f"models/{model_name}",
+                display_name=f"arqv30_{shared['key'][:12]}",
+                contents=[shared['text']],
+                ttl=timedelta(seconds=self.gemini_cache_ttl_seconds)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Cache de contexto do Gemini indisponível para {model_name}: {e}")
+            with self._lock:
+                self._remote_caches[cache_key] = None
+            return None
+
+        with self._lock:
+            self._remote_caches[cache_key] = {
+                'cached_content': cached_content,
+                # Margem para não usar um cache prestes a expirar
+                'expires_at': time.time() + self.gemini_cache_ttl_seconds - 60
+            }
+            self.stats['remote_cache_creates'] += 1
+        logger.info(f"🗄️ Contexto compartilhado ({shared['tokens']} tokens) enviado uma vez ao cache do Gemini")
+        return genai.GenerativeModel.from_cached_content(
+            cached_content, generation_config=generation_config, safety_settings=safety_settings
+        )
+
+
+# Instância global
+prompt_assembler = PromptAssembler()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Provider Telemetry
+Telemetria de latência, sucesso e custo por provedor/chave: timeouts adaptativos e ordem dinâmica
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Limites dos buckets do histograma (segundos, progressão geométrica de 50 ms a ~10 min)
+BUCKET_BOUNDS = [0.05 * 1.25 ** i for i in range(43)]
+
+# Custo estimado por chamada (US$) — usado como critério de desempate na ordenação
+DEFAULT_CALL_COSTS = {
+    'search:google': 0.005,
+    'search:serper': 0.001,
+    'search:exa': 0.005,
+    'search:bing': 0.0,
+    'extract:jina': 0.002,
+    'social:firecrawl': 0.01,
+    'youtube:stats': 0.0
+}
+
+
+class ProviderTelemetry:
+    """
+    Estatísticas por provedor (e por chave de API, identificada só por hash)
+
+    A latência das chamadas bem-sucedidas vai para um histograma com decaimento
+    exponencial (as amostras recentes pesam mais), o que mantém percentis "móveis"
+    num estado pequeno e persistível. A taxa de sucesso é uma média móvel exponencial.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        decay: float = 0.99,
+        success_alpha: float = 0.05,
+        min_samples: int = 20,
+        timeout_margin: float = 1.5,
+        min_timeout: float = 2.0,
+        save_interval: float = 30.0
+    ):
+        """
+        Inicializa a telemetria
+
+        Args:
+            path: Arquivo JSON onde as estatísticas persistem entre reinícios
+            decay: Fator aplicado ao histograma a cada nova amostra
+            success_alpha: Peso da última chamada na taxa de sucesso
+            min_samples: Amostras antes de confiar nos percentis (até lá, usa os padrões)
+            timeout_margin: Multiplicador sobre o p99 para o timeout adaptativo
+            min_timeout: Timeout mínimo derivado
+            save_interval: Intervalo mínimo entre gravações
+        """
+        self.path = path or os.getenv('PROVIDER_TELEMETRY_PATH', 'telemetry/provider_telemetry.json')
+        self.decay = decay
+        self.success_alpha = success_alpha
+        self.min_samples = min_samples
+        self.timeout_margin = timeout_margin
+        self.min_timeout = min_timeout
+        self.save_interval = save_interval
+        self.call_costs = dict(DEFAULT_CALL_COSTS)
+
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._dirty = False
+
+        self._load()
+        atexit.register(self.save)
+
+    # ------------------------------------------------------------------ registro
+
+    @staticmethod
+    def key_label(api_key: Optional[str]) -> Optional[str]:
+        """Identificador não reversível da chave de API"""
+        if not api_key:
+            return None
+        return hashlib.sha1(api_key.encode('utf-8')).hexdigest()[:8]
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = self._stats[name] = {
+                'histogram': [0.0] * (len(BUCKET_BOUNDS) + 1),
+                'weight': 0.0,
+                'success_rate': None,
+                'calls': 0,
+                'failures': 0,
+                'cost': 0.0,
+                'last_call': None
+            }
+        return entry
+
+    def _update(self, entry: Dict[str, Any], latency: float, success: bool, cost: float, timed_out: bool = False):
+        entry['calls'] += 1
+        entry['cost'] += cost
+        entry['last_call'] = time.time()
+        if not success:
+            entry['failures'] += 1
+
+        previous = entry['success_rate']
+        value = 1.0 if success else 0.0
+        entry['success_rate'] = value if previous is None else previous + self.success_alpha * (value - previous)
+
+        # Estouros de timeout entram no histograma com a duração observada: sem isso, o
+        # timeout derivado cortaria a cauda e o p99 encolheria a cada ajuste
+        if success or timed_out:
+            histogram = entry['histogram']
+            for i in range(len(histogram)):
+                histogram[i] *= self.decay
+            bucket = next((i for i, bound in enumerate(BUCKET_BOUNDS) if latency <= bound), len(BUCKET_BOUNDS))
+            histogram[bucket] += 1.0
+            entry['weight'] = entry['weight'] * self.decay + 1.0
+
+    def record(
+        self,
+        provider: str,
+        latency: float,
+        success: bool,
+        api_key: Optional[str] = None,
+        cost: Optional[float] = None,
+        timed_out: bool = False
+    ):
+        """
+        Registra uma chamada
+
+        Args:
+            provider: Nome do provedor (ex: 'search:google')
+            latency: Duração da chamada em segundos
+            success: Se a chamada produziu uma resposta utilizável
+            api_key: Chave usada (guardada só como hash, em ``provider#hash``)
+            cost: Custo da chamada (padrão: tabela ``call_costs``)
+            timed_out: A falha foi estouro de timeout
+        """
+        cost = self.call_costs.get(provider, 0.0) if cost is None else cost
+        with self._lock:
+            self._update(self._entry(provider), latency, success, cost, timed_out)
+            label = self.key_label(api_key)
+            if label:
+                self._update(self._entry(f"{provider}#{label}"), latency, success, cost, timed_out)
+            self._dirty = True
+            should_save = time.time() - self._last_save >= self.save_interval
+
+        if should_save:
+            self.save()
+
+    # ------------------------------------------------------------------ consultas
+
+    def _percentile(self, entry: Dict[str, Any], q: float) -> Optional[float]:
+        histogram = entry['histogram']
+        total = sum(histogram)
+        if total <= 0:
+            return None
+        target = q * total
+        cumulative = 0.0
+        for i, count in enumerate(histogram):
+            cumulative += count
+            if cumulative >= target:
+                return BUCKET_BOUNDS[min(i, len(BUCKET_BOUNDS) - 1)]
+        return BUCKET_BOUNDS[-1]
+
+    def percentile(self, provider: str, q: float) -> Optional[float]:
+        """Percentil de latência (limite superior do bucket) ou None com poucas amostras"""
+        with self._lock:
+            entry = self._stats.get(provider)
+            if entry is None or entry['weight'] <= 0 or entry['calls'] < self.min_samples:
+                return None
+            return self._percentile(entry, q)
+
+    def timeout_for(self, provider: str, default: float) -> float:
+        """
+        Timeout derivado do p99 observado com margem, limitado ao padrão fixo do chamador
+
+        Sem amostras suficientes, retorna ``default``.
+        """
+        p99 = self.percentile(provider, 0.99)
+        if p99 is None:
+            return default
+        return round(min(default, max(self.min_timeout, p99 * self.timeout_margin)), 2)
+
+    def expected_time(self, provider: str, default_timeout: float) -> float:
+        """
+        Tempo esperado até um resultado bom ao começar por este provedor
+
+        Cada tentativa custa ~p50 quando dá certo e ~timeout quando falha; tentativas
+        repetidas seguem uma geométrica com a taxa de sucesso, daí a divisão por ela.
+        """
+        with self._lock:
+            entry = self._stats.get(provider)
+            enough = entry is not None and entry['calls'] >= self.min_samples
+            success_rate = entry['success_rate'] if enough else None
+            p50 = self._percentile(entry, 0.5) if enough else None
+
+        # Priors neutros para provedores sem histórico
+        success_rate = max(success_rate if success_rate is not None else 0.8, 0.05)
+        p50 = p50 if p50 is not None else default_timeout / 3
+        timeout = self.timeout_for(provider, default_timeout)
+        attempt = success_rate * p50 + (1 - success_rate) * timeout
+        return attempt / success_rate
+
+    def rank(self, providers: List[str], default_timeout: float, priorities: Optional[Dict[str, int]] = None) -> List[str]:
+        """
+        Ordena provedores pelo menor tempo esperado até um bom resultado
+
+        Custo e prioridade estática desempatam (tempos arredondados a 0,1 s).
+        """
+        priorities = priorities or {}
+        return sorted(
+            providers,
+            key=lambda name: (
+                round(self.expected_time(name, default_timeout), 1),
+                self.call_costs.get(name, 0.0),
+                priorities.get(name, 99)
+            )
+        )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Resumo por provedor/chave para monitoramento"""
+        with self._lock:
+            names = list(self._stats)
+        summary = {}
+        for name in names:
+            with self._lock:
+                entry = self._stats[name]
+                p50, p95, p99 = (self._percentile(entry, q) for q in (0.5, 0.95, 0.99))
+                p50, p95, p99 = (round(value, 3) if value is not None else None for value in (p50, p95, p99))
+                summary[name] = {
+                    'calls': entry['calls'],
+                    'failures': entry['failures'],
+                    'success_rate': round(entry['success_rate'], 3) if entry['success_rate'] is not None else None,
+                    'p50': p50,
+                    'p95': p95,
+                    'p99': p99,
+                    'cost': round(entry['cost'], 4)
+                }
+        return summary
+
+    # ------------------------------------------------------------------ persistência
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ Telemetria de provedores ignorada ({self.path}): {e}")
+            return
+
+        for name, entry in data.get('providers', {}).items():
+            if len(entry.get('histogram', [])) == len(BUCKET_BOUNDS) + 1:
+                self._stats[name] = entry
+        logger.info(f"📈 Telemetria de {len(self._stats)} provedores/chaves carregada")
+
+    def save(self):
+        """Grava as estatísticas (escrita atômica)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({'saved_at': time.time(), 'providers': self._stats})
+            self._dirty = False
+            self._last_save = time.time()
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao gravar telemetria de provedores: {e}")
+
+
+# Instância global
+provider_telemetry = ProviderTelemetry()
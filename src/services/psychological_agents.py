@@ -12,6 +12,7 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.prompt_assembly import prompt_assembler
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +75,10 @@ class PsychologicalAgentsSystem:
         # Limpa dados de entrada para evitar referências circulares
         clean_data = self._clean_data_for_processing(data)
 
+        # Contexto da sessão renderizado uma vez e usado como prefixo idêntico pelos agentes; o
+        # ai_manager não tem cache de contexto, então o prefixo não passa do que cada agente já usava
+        shared = prompt_assembler.shared_context(clean_data, project_max_chars=2000)
+
         results = {
             'session_id': session_id,
             'timestamp': datetime.now().isoformat(),
@@ -88,7 +93,7 @@ class PsychologicalAgentsSystem:
                 logger.info(f"🎭 Executando agente: {agent_name}")
 
                 # Usa dados limpos para cada agente
-                agent_result = agent.execute_analysis(clean_data, session_id)
+                agent_result = agent.execute_analysis(clean_data, session_id, shared=shared)
                 results['agents_results'][agent_name] = agent_result
 
                 # Salva resultado de cada agente
@@ -243,26 +248,17 @@ class PsychologicalAgentsSystem:
 class ArchaeologistAgent:
     """ARQUEÓLOGO MESTRE DA PERSUASÃO"""
 
-    def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+    def execute_analysis(self, data: Dict[str, Any], session_id: str = None, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Executa análise arqueológica em 12 camadas"""
 
         # Extrai informações básicas de forma segura
         segmento = data.get('segmento', 'negócios') if isinstance(data, dict) else 'negócios'
-        produto = data.get('produto', 'Não informado') if isinstance(data, dict) else 'Não informado'
-        publico = data.get('publico', 'Não informado') if isinstance(data, dict) else 'Não informado'
-        preco = data.get('preco', 'Não informado') if isinstance(data, dict) else 'Não informado'
 
-        prompt = f"""
+        instructions = f"""
 # VOCÊ É O ARQUEÓLOGO MESTRE DA PERSUASÃO
 
 Sua missão é escavar cada detalhe do mercado de {segmento} para encontrar o DNA COMPLETO da conversão. Seja cirúrgico, obsessivo e implacável.
 
-## DADOS REAIS DO PROJETO:
-- **Segmento**: {segmento}
-- **Produto/Serviço**: {produto}
-- **Público-Alvo**: {publico}
-- **Preço**: R$ {preco}
-
 ## DISSECAÇÃO EM 12 CAMADAS PROFUNDAS:
 
 Execute uma análise ULTRA-PROFUNDA seguindo estas camadas:
@@ -283,6 +279,8 @@ Execute uma análise ULTRA-PROFUNDA seguindo estas camadas:
 RETORNE JSON ESTRUTURADO ULTRA-COMPLETO com análise arqueológica detalhada.
 """
 
+        # Este agente só usa o resumo do projeto: o JSON completo do prefixo não compensa sem cache
+        prompt = prompt_assembler.assemble(prompt_assembler.shared_context(data, project_max_chars=0), instructions)
         response = ai_manager.generate_analysis(prompt)
 
         if response:
@@ -358,26 +356,15 @@ RETORNE JSON ESTRUTURADO ULTRA-COMPLETO com análise arqueológica detalhada.
 class VisceralMasterAgent:
     """MESTRE DA PERSUASÃO VISCERAL"""
 
-    def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+    def execute_analysis(self, data: Dict[str, Any], session_id: str = None, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Executa engenharia reversa psicológica profunda"""
 
-        # Extrai informações de forma segura para evitar referências circulares
-        safe_data = {
-            'segmento': data.get('segmento', 'negócios') if isinstance(data, dict) else 'negócios',
-            'produto': data.get('produto', 'Não informado') if isinstance(data, dict) else 'Não informado',
-            'publico': data.get('publico', 'Não informado') if isinstance(data, dict) else 'Não informado',
-            'preco': data.get('preco', 'Não informado') if isinstance(data, dict) else 'Não informado'
-        }
-
-        prompt = f"""
+        instructions = f"""
 # VOCÊ É O MESTRE DA PERSUASÃO VISCERAL
 
 Linguagem: Direta, brutalmente honesta, carregada de tensão psicológica.
 Missão: Realizar Engenharia Reversa Psicológica PROFUNDA.
 
-## DADOS PARA ENGENHARIA REVERSA:
-{json.dumps(safe_data, indent=2, ensure_ascii=False)}
-
 ## EXECUTE ENGENHARIA REVERSA PSICOLÓGICA PROFUNDA:
 
 Vá além dos dados superficiais. Mergulhe em:
@@ -447,6 +434,8 @@ RETORNE JSON com análise visceral completa:
 ```
 """
 
+        # Este agente só usa o resumo do projeto: o JSON completo do prefixo não compensa sem cache
+        prompt = prompt_assembler.assemble(prompt_assembler.shared_context(data, project_max_chars=0), instructions)
         response = ai_manager.generate_analysis(prompt)
 
         if response:
@@ -523,10 +512,10 @@ RETORNE JSON com análise visceral completa:
 class DriversArchitectAgent:
     """ARQUITETO DE DRIVERS MENTAIS"""
 
-    def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+    def execute_analysis(self, data: Dict[str, Any], session_id: str = None, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Cria arsenal completo de drivers mentais"""
 
-        prompt = f"""
+        instructions = f"""
 # VOCÊ É O ARQUITETO DE DRIVERS MENTAIS
 
 Missão: Criar gatilhos psicológicos que funcionam como âncoras emocionais e racionais.
@@ -552,9 +541,6 @@ Missão: Criar gatilhos psicológicos que funcionam como âncoras emocionais e r
 18. DRIVER DA OPORTUNIDADE OCULTA
 19. DRIVER DO MÉTODO VS SORTE
 
-## CONTEXTO DO PROJETO:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
-
 ## CRIE DRIVERS MENTAIS CUSTOMIZADOS:
 
 Para cada driver, desenvolva:
@@ -609,6 +595,7 @@ RETORNE JSON com drivers customizados completos:
 ```
 """
 
+        prompt = prompt_assembler.assemble(shared or prompt_assembler.shared_context(data, project_max_chars=2000), instructions)
         response = ai_manager.generate_analysis(prompt)
 
         if response:
@@ -674,10 +661,10 @@ RETORNE JSON com drivers customizados completos:
 class VisualDirectorAgent:
     """DIRETOR SUPREMO DE EXPERIÊNCIAS TRANSFORMADORAS"""
 
-    def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+    def execute_analysis(self, data: Dict[str, Any], session_id: str = None, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Cria arsenal completo de PROVIs"""
 
-        prompt = f"""
+        instructions = f"""
 # VOCÊ É O DIRETOR SUPREMO DE EXPERIÊNCIAS TRANSFORMADORAS
 
 Missão: Transformar TODOS os conceitos abstratos em experiências físicas inesquecíveis.
@@ -690,9 +677,6 @@ Missão: Transformar TODOS os conceitos abstratos em experiências físicas ines
 - **INSTALADORAS DE CRENÇA**: Transformações visuais poderosas
 - **PROVAS DE MÉTODO**: Demonstrações de eficácia
 
-## CONTEXTO PARA CRIAÇÃO:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
-
 ## CRIE ARSENAL COMPLETO DE PROVIS:
 
 Para CADA conceito identificado, crie:
@@ -768,6 +752,7 @@ RETORNE JSON com arsenal completo de PROVIs:
 ```
 """
 
+        prompt = prompt_assembler.assemble(shared or prompt_assembler.shared_context(data, project_max_chars=2000), instructions)
         response = ai_manager.generate_analysis(prompt)
 
         if response:
@@ -809,10 +794,10 @@ RETORNE JSON com arsenal completo de PROVIs:
 class AntiObjectionAgent:
     """ESPECIALISTA EM PSICOLOGIA DE VENDAS"""
 
-    def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+    def execute_analysis(self, data: Dict[str, Any], session_id: str = None, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Cria sistema anti-objeção completo"""
 
-        prompt = f"""
+        instructions = f"""
 # VOCÊ É O ESPECIALISTA EM PSICOLOGIA DE VENDAS
 
 Missão: Criar ARSENAL PSICOLÓGICO para identificar, antecipar e neutralizar TODAS as objeções.
@@ -829,9 +814,6 @@ Missão: Criar ARSENAL PSICOLÓGICO para identificar, antecipar e neutralizar TO
 4. **PRIORIDADES DESEQUILIBRADAS**: "Não é dinheiro"
 5. **AUTOESTIMA DESTRUÍDA**: "Não confio em mim"
 
-## CONTEXTO PARA ANÁLISE:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
-
 ## CRIE SISTEMA ANTI-OBJEÇÃO COMPLETO:
 
 Analise o contexto e crie arsenal psicológico completo com:
@@ -900,6 +882,7 @@ RETORNE JSON com sistema anti-objeção completo:
 ```
 """
 
+        prompt = prompt_assembler.assemble(shared or prompt_assembler.shared_context(data, project_max_chars=2000), instructions)
         response = ai_manager.generate_analysis(prompt)
 
         if response:
@@ -941,10 +924,10 @@ RETORNE JSON com sistema anti-objeção completo:
 class PrePitchArchitectAgent:
     """MESTRE DO PRÉ-PITCH INVISÍVEL"""
 
-    def execute_analysis(self, data: Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+    def execute_analysis(self, data: Dict[str, Any], session_id: str = None, shared: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Cria orquestração psicológica completa"""
 
-        prompt = f"""
+        instructions = f"""
 # VOCÊ É O MESTRE DO PRÉ-PITCH INVISÍVEL
 
 Missão: Orquestrar SINFONIA DE TENSÃO PSICOLÓGICA que prepara terreno mental.
@@ -965,9 +948,6 @@ Missão: Orquestrar SINFONIA DE TENSÃO PSICOLÓGICA que prepara terreno mental.
 - Demonstrações passo a passo
 - Cases com métricas específicas
 
-## CONTEXTO:
-{json.dumps(data, indent=2, ensure_ascii=False)[:2000]}
-
 ## CRIE PRÉ-PITCH COMPLETO:
 
 RETORNE JSON com orquestração completa:
@@ -1025,6 +1005,7 @@ RETORNE JSON com orquestração completa:
 ```
 """
 
+        prompt = prompt_assembler.assemble(shared or prompt_assembler.shared_context(data, project_max_chars=2000), instructions)
         response = ai_manager.generate_analysis(prompt)
 
         if response:
@@ -15,6 +15,14 @@ from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote_plus
 import json
+from collections import OrderedDict
+
+from services.url_canonicalizer import url_canonicalizer
+from services.research_knowledge_base import research_knowledge_base
+from services.provider_telemetry import provider_telemetry
+from services.screenshot_encoder import screenshot_encoder
+from services.render_cache import render_cache
+from services.viral_scoring_engine import viral_scoring_engine
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +57,16 @@ class RealSearchOrchestrator:
             'SUPADATA': os.getenv('SUPADATA_API_URL', 'https://server.smithery.ai/@supadata-ai/mcp/mcp')
         }
 
+        # Documentos frescos da base de conhecimento que dispensam a coleta web externa
+        self.kb_target_documents = int(os.getenv('KB_TARGET_DOCUMENTS', '20'))
+        self.websailor_max_pages = 30
+
+        # Metadados de vídeos do YouTube (videos.list aceita até 50 IDs por chamada)
+        self.youtube_batch_size = 50
+        self.youtube_cache_ttl = int(os.getenv('YOUTUBE_STATS_TTL', '900'))
+        self.youtube_cache_max = 5000
+        self._youtube_cache: "OrderedDict[str, tuple]" = OrderedDict()  # video_id -> (expira_em, item)
+
         self.session_stats = {
             'total_searches': 0,
             'successful_searches': 0,
@@ -135,6 +153,9 @@ class RealSearchOrchestrator:
             'statistics': {
                 'total_sources': 0,
                 'unique_urls': 0,
+                'duplicates_merged': 0,
+                'knowledge_base_hits': 0,
+                'knowledge_base_coverage': 0.0,
                 'content_extracted': 0,
                 'api_calls_made': 0,
                 'search_duration': 0
@@ -142,38 +163,63 @@ class RealSearchOrchestrator:
         }
 
         try:
-            # FASE 1: Busca com Alibaba WebSailor (prioritária)
-            logger.info("🔍 FASE 1: Busca com Alibaba WebSailor")
-            websailor_results = await self._search_alibaba_websailor(query, context)
-            
+            # FASE 0: Base de conhecimento entre sessões; a coleta externa cobre só o que faltar
+            logger.info("📚 FASE 0: Consultando base de conhecimento")
+            kb_results = await asyncio.to_thread(
+                research_knowledge_base.search, query, k=self.kb_target_documents, niche=context.get('segmento')
+            )
+            kb_coverage = research_knowledge_base.coverage(kb_results, self.kb_target_documents)
+            web_total = len(kb_results)
+
+            if kb_results:
+                # Registra as URLs na sessão: o WebSailor não reextrai páginas já conhecidas
+                search_results['web_results'].extend(
+                    url_canonicalizer.merge_results(session_id, kb_results, 'KNOWLEDGE_BASE')
+                )
+                search_results['providers_used'].append('KNOWLEDGE_BASE')
+                logger.info(f"✅ Base de conhecimento: {len(kb_results)} documentos frescos (cobertura {kb_coverage:.0%})")
+
+            if kb_coverage >= 1.0:
+                logger.info("⏭️ Cobertura completa pela base de conhecimento: coleta web externa dispensada")
+                websailor_results = {'success': False}
+            else:
+                # FASE 1: Busca com Alibaba WebSailor (prioritária), proporcional à lacuna
+                logger.info("🔍 FASE 1: Busca com Alibaba WebSailor")
+                max_pages = max(5, round(self.websailor_max_pages * (1 - kb_coverage)))
+                websailor_results = await self._search_alibaba_websailor(query, context, session_id, max_pages=max_pages)
+
             if websailor_results.get('success'):
-                search_results['web_results'].extend(websailor_results['results'])
+                web_total += len(websailor_results['results'])
+                search_results['web_results'].extend(
+                    url_canonicalizer.merge_results(session_id, websailor_results['results'], 'ALIBABA_WEBSAILOR')
+                )
                 search_results['providers_used'].append('ALIBABA_WEBSAILOR')
                 logger.info(f"✅ Alibaba WebSailor retornou {len(websailor_results['results'])} resultados")
 
             # FASE 2: Busca Web Massiva Simultânea (provedores restantes)
-            logger.info("🌐 FASE 2: Busca web massiva simultânea")
             web_tasks = []
+            if kb_coverage < 1.0:
+                logger.info("🌐 FASE 2: Busca web massiva simultânea")
 
-            # Firecrawl
-            if 'FIRECRAWL' in self.api_keys:
-                web_tasks.append(self._search_firecrawl(query))
+                # Firecrawl
+                if 'FIRECRAWL' in self.api_keys:
+                    web_tasks.append(self._search_firecrawl(query))
 
-            # Jina
-            if 'JINA' in self.api_keys:
-                web_tasks.append(self._search_jina(query))
+                # Jina
+                if 'JINA' in self.api_keys:
+                    web_tasks.append(self._search_jina(query))
 
-            # Google
-            if 'GOOGLE' in self.api_keys:
-                web_tasks.append(self._search_google(query))
+                # Google
+                if 'GOOGLE' in self.api_keys:
+                    web_tasks.append(self._search_google(query))
 
-            # Exa
-            if 'EXA' in self.api_keys:
-                web_tasks.append(self._search_exa(query))
+                # Exa
+                if 'EXA' in self.api_keys:
+                    web_tasks.append(self._search_exa(query))
 
-            # Serper
-            if 'SERPER' in self.api_keys:
-                web_tasks.append(self._search_serper(query))
+                # Serper
+                if 'SERPER' in self.api_keys:
+                    web_tasks.append(self._search_serper(query))
 
             # Executa todas as buscas web simultaneamente
             if web_tasks:
@@ -185,8 +231,19 @@ class RealSearchOrchestrator:
                         continue
 
                     if result.get('success') and result.get('results'):
-                        search_results['web_results'].extend(result['results'])
-                        search_results['providers_used'].append(result.get('provider', 'unknown'))
+                        # Deduplica contra tudo o que a sessão já viu; a proveniência vai para o registro existente
+                        provider = result.get('provider', 'unknown')
+                        search_results['web_results'].extend(
+                            url_canonicalizer.merge_results(session_id, result['results'], provider)
+                        )
+                        search_results['providers_used'].append(provider)
+                        web_total += len(result['results'])
+
+                        # Páginas com conteúdo completo alimentam a base de conhecimento
+                        await asyncio.to_thread(
+                            research_knowledge_base.add_documents,
+                            result['results'], niche=context.get('segmento', ''), query=query, provider=provider
+                        )
 
             # FASE 3: Busca em Redes Sociais
             logger.info("📱 FASE 3: Busca massiva em redes sociais")
@@ -225,18 +282,23 @@ class RealSearchOrchestrator:
             # FASE 5: Captura de Screenshots
             logger.info("📸 FASE 5: Capturando screenshots do conteúdo viral")
             if viral_content:
-                screenshots = await self._capture_viral_screenshots(viral_content, session_id)
+                screenshots = await self._capture_viral_screenshots(
+                    viral_content, session_id, force_refresh=bool(context.get('force_refresh'))
+                )
                 search_results['screenshots_captured'] = screenshots
                 self.session_stats['screenshots_captured'] = len(screenshots)
 
             # Calcula estatísticas finais
             search_duration = time.time() - start_time
             all_results = search_results['web_results'] + search_results['social_results'] + search_results['youtube_results']
-            unique_urls = list(set(r.get('url', '') for r in all_results if r.get('url')))
+            unique_urls = set(r.get('canonical_url') or url_canonicalizer.canonical_key(r['url']) for r in all_results if r.get('url'))
 
             search_results['statistics'].update({
                 'total_sources': len(all_results),
                 'unique_urls': len(unique_urls),
+                'duplicates_merged': web_total - len(search_results['web_results']),
+                'knowledge_base_hits': len(kb_results),
+                'knowledge_base_coverage': round(kb_coverage, 2),
                 'content_extracted': sum(len(r.get('content', '')) for r in all_results),
                 'api_calls_made': sum(self.session_stats['api_rotations'].values()),
                 'search_duration': search_duration
@@ -252,7 +314,7 @@ class RealSearchOrchestrator:
             logger.error(f"❌ ERRO CRÍTICO na busca massiva: {e}")
             raise
 
-    async def _search_alibaba_websailor(self, query: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    async def _search_alibaba_websailor(self, query: str, context: Dict[str, Any], session_id: str = None, max_pages: int = 30) -> Dict[str, Any]:
         """Busca REAL usando Alibaba WebSailor Agent"""
         try:
             # Importa o agente WebSailor
@@ -266,9 +328,9 @@ class RealSearchOrchestrator:
             research_result = alibaba_websailor.navigate_and_research_deep(
                 query=query,
                 context=context,
-                max_pages=30,
+                max_pages=max_pages,
                 depth_levels=2,
-                session_id=None # Ou passe session_id se o método aceitar
+                session_id=session_id  # Compartilha o conjunto de URLs vistas da sessão
             )
 
             if not research_result or not research_result.get('conteudo_consolidado'):
@@ -489,12 +551,20 @@ class RealSearchOrchestrator:
                         data = await response.json()
                         results = []
 
-                        for item in data.get('items', []):
-                            snippet = item.get('snippet', {})
-                            video_id = item.get('id', {}).get('videoId', '')
+                        search_items = [
+                            item for item in data.get('items', []) if item.get('id', {}).get('videoId')
+                        ]
 
-                            # Busca estatísticas detalhadas
-                            stats = await self._get_youtube_video_stats(video_id, api_key, session)
+                        # Estatísticas, snippet completo e duração de todos os vídeos em lotes de 50
+                        metadata = await self._get_youtube_videos_metadata(
+                            [item['id']['videoId'] for item in search_items], api_key, session
+                        )
+
+                        for item in search_items:
+                            video_id = item['id']['videoId']
+                            details = metadata.get(video_id, {})
+                            snippet = {**item.get('snippet', {}), **details.get('snippet', {})}
+                            stats = details.get('statistics', {})
 
                             results.append({
                                 'title': snippet.get('title', ''),
@@ -504,7 +574,9 @@ class RealSearchOrchestrator:
                                 'published_at': snippet.get('publishedAt', ''),
                                 'thumbnail': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
                                 'view_count': stats.get('viewCount', 0),
+                                'like_count': stats.get('likeCount', 0),
                                 'comment_count': stats.get('commentCount', 0),
+                                'duration': details.get('contentDetails', {}).get('duration', ''),
                                 'platform': 'youtube',
                                 'viral_score': self._calculate_viral_score(stats),
                                 'relevance_score': 0.85
@@ -528,31 +600,68 @@ class RealSearchOrchestrator:
             logger.error(f"❌ Erro YouTube: {e}")
             return {'success': False, 'error': str(e)}
 
-    async def _get_youtube_video_stats(self, video_id: str, api_key: str, session: aiohttp.ClientSession) -> Dict[str, Any]:
-        """Obtém estatísticas detalhadas de um vídeo do YouTube"""
+    async def _get_youtube_videos_metadata(
+        self, video_ids: List[str], api_key: str, session: aiohttp.ClientSession
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Metadados (statistics, snippet, contentDetails) de vários vídeos do YouTube
+
+        IDs em cache (TTL curto) não são consultados de novo; os demais vão em lotes de
+        até 50 IDs por chamada de videos.list, todos os lotes em paralelo.
+        """
+        now = time.time()
+        metadata, missing = {}, []
+        unique_ids = list(dict.fromkeys(video_ids))
+        for video_id in unique_ids:
+            cached = self._youtube_cache.get(video_id)
+            if cached and cached[0] > now:
+                metadata[video_id] = cached[1]
+                self._youtube_cache.move_to_end(video_id)
+            else:
+                missing.append(video_id)
+
+        chunks = [missing[i:i + self.youtube_batch_size] for i in range(0, len(missing), self.youtube_batch_size)]
+        for items in await asyncio.gather(*(self._fetch_youtube_videos(chunk, api_key, session) for chunk in chunks)):
+            for item in items:
+                metadata[item['id']] = item
+                self._youtube_cache[item['id']] = (now + self.youtube_cache_ttl, item)
+
+        while len(self._youtube_cache) > self.youtube_cache_max:
+            self._youtube_cache.popitem(last=False)
+
+        logger.info(f"📊 YouTube: metadados de {len(metadata)} vídeos ({len(unique_ids) - len(missing)} do cache, {len(chunks)} chamada(s))")
+        return metadata
+
+    async def _fetch_youtube_videos(self, video_ids: List[str], api_key: str, session: aiohttp.ClientSession) -> List[Dict[str, Any]]:
+        """Uma chamada de videos.list para até 50 IDs"""
+        start = time.time()
         try:
             params = {
-                'part': 'statistics',
-                'id': video_id,
+                'part': 'statistics,snippet,contentDetails',
+                'id': ','.join(video_ids),
                 'key': api_key
             }
 
             async with session.get(
                 'https://www.googleapis.com/youtube/v3/videos',
                 params=params,
-                timeout=10
+                timeout=provider_telemetry.timeout_for('youtube:stats', 10)
             ) as response:
+                provider_telemetry.record('youtube:stats', time.time() - start, response.status == 200, api_key=api_key)
                 if response.status == 200:
                     data = await response.json()
-                    items = data.get('items', [])
-                    if items:
-                        return items[0].get('statistics', {})
+                    return data.get('items', [])
 
-                return {}
+                logger.warning(f"⚠️ YouTube videos.list retornou {response.status} para {len(video_ids)} vídeos")
+                return []
 
+        except asyncio.TimeoutError:
+            provider_telemetry.record('youtube:stats', time.time() - start, False, api_key=api_key, timed_out=True)
+            logger.warning(f"⚠️ Timeout ao obter metadados de {len(video_ids)} vídeos do YouTube")
+            return []
         except Exception as e:
-            logger.warning(f"⚠️ Erro ao obter stats do vídeo {video_id}: {e}")
-            return {}
+            logger.warning(f"⚠️ Erro ao obter metadados de {len(video_ids)} vídeos do YouTube: {e}")
+            return []
 
     async def _search_supadata(self, query: str) -> Dict[str, Any]:
         """Busca REAL usando Supadata MCP"""
@@ -861,30 +970,76 @@ class RealSearchOrchestrator:
         if not all_social_results:
             return []
 
-        # Ordena por score viral
-        sorted_content = sorted(
-            all_social_results, 
-            key=lambda x: x.get('viral_score', 0), 
-            reverse=True
+        scores = viral_scoring_engine.column(
+            [content.get('viral_score', 0) for content in all_social_results], integer=False
         )
 
-        # Seleciona top 10 conteúdos virais
-        viral_content = []
-        seen_urls = set()
-
-        for content in sorted_content:
-            url = content.get('url', '')
-            if url and url not in seen_urls and len(viral_content) < 10:
-                viral_content.append(content)
-                seen_urls.add(url)
+        # Seleciona top 10 conteúdos virais (URLs únicas); amplia o top-k se houver repetidas
+        k = 10
+        while True:
+            viral_content = []
+            seen_urls = set()
+            for index in viral_scoring_engine.top_k(scores, k):
+                content = all_social_results[index]
+                url = content.get('url', '')
+                if url and url not in seen_urls:
+                    viral_content.append(content)
+                    seen_urls.add(url)
+                    if len(viral_content) == 10:
+                        break
+            if len(viral_content) == 10 or k >= len(all_social_results):
+                break
+            k *= 4
 
         logger.info(f"🔥 {len(viral_content)} conteúdos virais identificados")
         return viral_content
 
-    async def _capture_viral_screenshots(self, viral_content: List[Dict[str, Any]], session_id: str) -> List[Dict[str, Any]]:
-        """Captura screenshots do conteúdo viral usando Selenium"""
+    async def _capture_viral_screenshots(
+        self,
+        viral_content: List[Dict[str, Any]],
+        session_id: str,
+        force_refresh: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Captura screenshots do conteúdo viral usando Selenium
+
+        Renderizações da mesma URL feitas em outra sessão (dentro do TTL) vêm do cache,
+        sem abrir o navegador; ``force_refresh`` ignora o cache.
+        """
+
+        screenshots_dir = f"analyses_data/files/{session_id}"
+        os.makedirs(screenshots_dir, exist_ok=True)
+        viewport = (1920, 1080)
+
+        captured = {}
+        pending = []
+        for i, content in enumerate(viral_content, 1):
+            url = content.get('url', '')
+            if not url:
+                continue
+            cached = None if force_refresh else render_cache.lookup(url, viewport, screenshot_encoder.image_format)
+            if not cached:
+                pending.append((i, content))
+                continue
 
-        screenshots = []
+            filename = f"viral_content_{i:02d}{screenshot_encoder.extension}"
+            screenshot_path = render_cache.materialize(cached, f"{screenshots_dir}/{filename}")
+            captured[i] = {
+                'content_data': content,
+                'screenshot_path': screenshot_path,
+                'filename': filename,
+                'file_size': cached['size'],
+                'url': url,
+                'title': content.get('title', ''),
+                'platform': content.get('platform', ''),
+                'viral_score': content.get('viral_score', 0),
+                'captured_at': datetime.now().isoformat(),
+                'from_cache': True
+            }
+            logger.info(f"♻️ Screenshot {i} reaproveitado do cache: {screenshot_path}")
+
+        if not pending:
+            return [captured[i] for i in sorted(captured)]
 
         try:
             from selenium import webdriver
@@ -900,22 +1055,16 @@ class RealSearchOrchestrator:
             chrome_options.add_argument("--headless")
             chrome_options.add_argument("--no-sandbox")
             chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--window-size=1920,1080")
+            chrome_options.add_argument(f"--window-size={viewport[0]},{viewport[1]}")
             chrome_options.add_argument("--disable-gpu")
 
             service = Service(ChromeDriverManager().install())
             driver = webdriver.Chrome(service=service, options=chrome_options)
 
-            # Cria diretório para screenshots
-            screenshots_dir = f"analyses_data/files/{session_id}"
-            os.makedirs(screenshots_dir, exist_ok=True)
-
             try:
-                for i, content in enumerate(viral_content, 1):
+                for i, content in pending:
                     try:
                         url = content.get('url', '')
-                        if not url:
-                            continue
 
                         logger.info(f"📸 Capturando screenshot {i}/10: {content.get('title', 'Sem título')}")
 
@@ -930,22 +1079,30 @@ class RealSearchOrchestrator:
                         # Aguarda renderização completa
                         time.sleep(3)
 
-                        # Captura screenshot
-                        screenshot_path = f"{screenshots_dir}/viral_content_{i:02d}.png"
-                        driver.save_screenshot(screenshot_path)
-
-                        # Verifica se foi criado
-                        if os.path.exists(screenshot_path) and os.path.getsize(screenshot_path) > 0:
-                            screenshots.append({
+                        # Captura em memória; codificação WebP/JPEG e validação no pool de workers
+                        filename = f"viral_content_{i:02d}{screenshot_encoder.extension}"
+                        screenshot_path = f"{screenshots_dir}/{filename}"
+                        encoded = await screenshot_encoder.encode_async(driver.get_screenshot_as_png(), screenshot_path)
+
+                        if encoded:
+                            render_cache.store(url, viewport, screenshot_encoder.image_format, screenshot_path, {
+                                'title': driver.title,
+                                'final_url': driver.current_url,
+                                'width': encoded['width'],
+                                'height': encoded['height']
+                            })
+                            captured[i] = {
                                 'content_data': content,
                                 'screenshot_path': screenshot_path,
-                                'filename': f"viral_content_{i:02d}.png",
+                                'filename': filename,
+                                'file_size': encoded['bytes'],
                                 'url': url,
                                 'title': content.get('title', ''),
                                 'platform': content.get('platform', ''),
                                 'viral_score': content.get('viral_score', 0),
-                                'captured_at': datetime.now().isoformat()
-                            })
+                                'captured_at': datetime.now().isoformat(),
+                                'from_cache': False
+                            }
 
                             logger.info(f"✅ Screenshot {i} capturado: {screenshot_path}")
                         else:
@@ -960,62 +1117,22 @@ class RealSearchOrchestrator:
 
         except ImportError:
             logger.error("❌ Selenium não instalado - screenshots não disponíveis")
-            return []
         except Exception as e:
             logger.error(f"❌ Erro na captura de screenshots: {e}")
-            return []
 
-        return screenshots
+        return [captured[i] for i in sorted(captured)]
 
     def _calculate_viral_score(self, stats: Dict[str, Any]) -> float:
         """Calcula score viral para YouTube"""
-        try:
-            views = int(stats.get('viewCount', 0))
-            likes = int(stats.get('likeCount', 0))
-            comments = int(stats.get('commentCount', 0))
-
-            # Fórmula viral: views + (likes * 10) + (comments * 20)
-            viral_score = views + (likes * 10) + (comments * 20)
-
-            # Normaliza para 0-10
-            return min(10.0, viral_score / 100000)
-
-        except:
-            return 0.0
+        return viral_scoring_engine.score_youtube_stats(stats)
 
     def _calculate_social_viral_score(self, post: Dict[str, Any]) -> float:
         """Calcula score viral para redes sociais"""
-        try:
-            likes = int(post.get('likes', 0))
-            comments = int(post.get('comments', 0))
-            shares = int(post.get('shares', 0))
-            engagement_rate = float(post.get('engagement_rate', 0))
-
-            # Fórmula viral para redes sociais
-            viral_score = (likes * 1) + (comments * 5) + (shares * 10) + (engagement_rate * 1000)
-
-            # Normaliza para 0-10
-            return min(10.0, viral_score / 10000)
-
-        except:
-            return 0.0
+        return viral_scoring_engine.score_social_post(post)
 
     def _calculate_twitter_viral_score(self, metrics: Dict[str, Any]) -> float:
         """Calcula score viral para Twitter"""
-        try:
-            retweets = int(metrics.get('retweet_count', 0))
-            likes = int(metrics.get('like_count', 0))
-            replies = int(metrics.get('reply_count', 0))
-            quotes = int(metrics.get('quote_count', 0))
-
-            # Fórmula viral para Twitter
-            viral_score = (retweets * 10) + (likes * 2) + (replies * 5) + (quotes * 15)
-
-            # Normaliza para 0-10
-            return min(10.0, viral_score / 5000)
-
-        except:
-            return 0.0
+        return viral_scoring_engine.score_twitter_metrics(metrics)
 
     def get_session_statistics(self) -> Dict[str, Any]:
         """Retorna estatísticas da sessão atual"""
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Render Cache
+Cache de screenshots entre sessões por URL canônica + viewport + formato, com TTL e cota LRU em disco
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from services.url_canonicalizer import url_canonicalizer
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCache:
+    """
+    Renderizações de páginas reaproveitadas entre sessões
+
+    URLs virais populares (os mesmos vídeos e posts) aparecem em várias sessões do
+    mesmo nicho. Cada captura é guardada uma vez em ``<base>/renders/ab/<chave>.<ext>``;
+    as sessões recebem um hardlink (cópia, se o sistema de arquivos não suportar). O
+    SQLite guarda URL, metadados da página e o último acesso, usado para despejar as
+    menos usadas quando o cache passa da cota.
+    """
+
+    def __init__(self, base_path: str = None, ttl: float = None, max_bytes: int = None):
+        """
+        Inicializa o cache
+
+        Args:
+            base_path: Diretório raiz (padrão: RENDER_CACHE_DIR ou analyses_data/render_cache)
+            ttl: Validade de uma renderização em segundos (padrão: RENDER_CACHE_TTL ou 24 h)
+            max_bytes: Cota em disco (padrão: RENDER_CACHE_MAX_BYTES ou 512 MB)
+        """
+        self.base_path = base_path or os.getenv('RENDER_CACHE_DIR', os.path.join('analyses_data', 'render_cache'))
+        self.renders_dir = os.path.join(self.base_path, 'renders')
+        self.db_path = os.path.join(self.base_path, 'render_cache.sqlite')
+        self.ttl = ttl or float(os.getenv('RENDER_CACHE_TTL', 24 * 3600))
+        self.max_bytes = max_bytes or int(os.getenv('RENDER_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stored': 0, 'evicted': 0}
+
+    # ------------------------------------------------------------------ índice
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(self.base_path, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS renders (key TEXT PRIMARY KEY, url TEXT, canonical_url TEXT, "
+            "viewport TEXT, format TEXT, path TEXT, size INTEGER, metadata TEXT, created_at REAL, last_access REAL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS renders_last_access ON renders (last_access)")
+        return connection
+
+    @staticmethod
+    def _viewport_label(viewport: Tuple[int, int]) -> str:
+        return f"{int(viewport[0])}x{int(viewport[1])}"
+
+    def render_key(self, url: str, viewport: Tuple[int, int], image_format: str) -> str:
+        """Chave da renderização: URL canônica + viewport + formato"""
+        canonical = url_canonicalizer.canonical_key(url) or url
+        raw = f"{canonical}|{self._viewport_label(viewport)}|{image_format.lower()}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _remove_row(self, connection: sqlite3.Connection, key: str, path: str):
+        connection.execute("DELETE FROM renders WHERE key = ?", (key,))
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    # ------------------------------------------------------------------ consulta e gravação
+
+    def lookup(self, url: str, viewport: Tuple[int, int], image_format: str) -> Optional[Dict[str, Any]]:
+        """
+        Renderização válida da URL (``path``, ``size``, ``metadata``, ``age``) ou None
+
+        Entradas vencidas são removidas na consulta.
+        """
+        key = self.render_key(url, viewport, image_format)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            try:
+                row = connection.execute(
+                    "SELECT path, size, metadata, created_at FROM renders WHERE key = ?", (key,)
+                ).fetchone()
+                if not row or not os.path.exists(row[0]):
+                    if row:
+                        self._remove_row(connection, key, row[0])
+                        connection.commit()
+                    self.stats['misses'] += 1
+                    return None
+                if now - row[3] > self.ttl:
+                    self._remove_row(connection, key, row[0])
+                    connection.commit()
+                    self.stats['expired'] += 1
+                    self.stats['misses'] += 1
+                    return None
+                connection.execute("UPDATE renders SET last_access = ? WHERE key = ?", (now, key))
+                connection.commit()
+            finally:
+                connection.close()
+            self.stats['hits'] += 1
+
+        return {
+            'key': key,
+            'path': row[0],
+            'size': row[1],
+            'metadata': json.loads(row[2] or '{}'),
+            'age': round(now - row[3], 1)
+        }
+
+    def store(
+        self,
+        url: str,
+        viewport: Tuple[int, int],
+        image_format: str,
+        source_path: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Guarda uma captura recém-feita (hardlink para ``source_path``) e aplica a cota
+
+        Returns:
+            Entrada gravada ou None se o arquivo não existir
+        """
+        if not source_path or not os.path.exists(source_path):
+            return None
+
+        key = self.render_key(url, viewport, image_format)
+        ext = os.path.splitext(source_path)[1] or f".{image_format}"
+        path = os.path.join(self.renders_dir, key[:2], f"{key}{ext}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(source_path, temp_path)
+        except OSError:
+            shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, path)
+
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO renders (key, url, canonical_url, viewport, format, path, size, metadata, "
+                    "created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key, url, url_canonicalizer.canonical_key(url) or url, self._viewport_label(viewport),
+                        image_format.lower(), path, size, json.dumps(metadata or {}, ensure_ascii=False), now, now
+                    )
+                )
+                self._enforce_quota(connection, now)
+                connection.commit()
+            finally:
+                connection.close()
+            self.stats['stored'] += 1
+
+        return {'key': key, 'path': path, 'size': size, 'metadata': metadata or {}, 'age': 0.0}
+
+    def _enforce_quota(self, connection: sqlite3.Connection, now: float):
+        """Remove as vencidas e, enquanto passar da cota, as de acesso mais antigo"""
+        for key, path in connection.execute(
+            "SELECT key, path FROM renders WHERE created_at < ?", (now - self.ttl,)
+        ).fetchall():
+            self._remove_row(connection, key, path)
+            self.stats['evicted'] += 1
+
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM renders").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, path, size in connection.execute(
+            "SELECT key, path, size FROM renders ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._remove_row(connection, key, path)
+            total -= size
+            self.stats['evicted'] += 1
+
+    def materialize(self, entry: Dict[str, Any], destination: str) -> str:
+        """Coloca a renderização em cache no diretório da sessão (hardlink ou cópia)"""
+        os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        if os.path.exists(destination):
+            os.remove(destination)
+        try:
+            os.link(entry['path'], destination)
+        except OSError:
+            shutil.copyfile(entry['path'], destination)
+        return destination
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            connection = self._connect()
+            try:
+                entries, total = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM renders").fetchone()
+            finally:
+                connection.close()
+            return {**self.stats, 'entries': entries, 'bytes': total, 'max_bytes': self.max_bytes}
+
+
+# Instância global
+render_cache = RenderCache()
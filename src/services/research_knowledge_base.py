@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Research Knowledge Base
+Base persistente (entre sessões) das páginas extraídas, com busca vetorial e controle de frescor
+"""
+
+import os
+import zlib
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from services.context_packer import context_packer
+from services.url_canonicalizer import url_canonicalizer
+
+logger = logging.getLogger(__name__)
+
+# Conteúdo mínimo para uma página valer como documento da base
+MIN_CONTENT_CHARS = 500
+# Caracteres do conteúdo usados no vetor e guardados na base
+MAX_CONTENT_CHARS = 20000
+
+
+def _term(token: str) -> str:
+    # Singular e plural contam como o mesmo termo ("dentista" / "dentistas")
+    return token[:-1] if len(token) > 4 and token.endswith('s') else token
+
+
+def _terms(text: str) -> set:
+    return {_term(token) for token in context_packer.tokenize(text or '')}
+
+
+def normalize_niche(niche: str) -> str:
+    """Nicho comparável entre sessões (minúsculo, sem stopwords, termos em ordem)"""
+    return ' '.join(sorted(_terms(niche)))
+
+
+class ResearchKnowledgeBase:
+    """
+    Páginas extraídas em qualquer sessão, reaproveitáveis pelas seguintes
+
+    Cada documento vira um vetor denso por hashing de termos (TF sublinear, sinal por
+    hash, normalizado); a consulta é pesada por IDF estimado da própria base. Metadados
+    e vetores ficam em SQLite; a matriz de vetores é mantida em memória e a busca é um
+    produto matricial NumPy, recarregado quando outro processo altera a base.
+
+    Similaridade sozinha não garante que o nicho foi pesquisado (marketing para
+    advogados fica perto de marketing para dentistas): a busca pode ser restrita ao
+    nicho da sessão e a cobertura só conta documentos que contêm os termos da consulta.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "knowledge_base/research_kb.sqlite",
+        dimensions: int = 1024,
+        max_documents: int = 20000,
+        max_age_days: float = None,
+        min_similarity: float = None,
+        min_term_coverage: float = None
+    ):
+        """
+        Inicializa a base
+
+        Args:
+            db_path: Arquivo SQLite da base
+            dimensions: Dimensão dos vetores por hashing
+            max_documents: Documentos mantidos (os mais antigos saem primeiro)
+            max_age_days: Idade máxima para um documento ser considerado fresco
+            min_similarity: Similaridade mínima (cosseno) para um documento ser retornado
+            min_term_coverage: Fração mínima dos termos da consulta presentes num documento
+                para ele contar na cobertura
+        """
+        self.db_path = db_path
+        self.dimensions = dimensions
+        self.max_documents = max_documents
+        self.max_age_days = max_age_days if max_age_days is not None else float(os.getenv('KB_MAX_AGE_DAYS', '30'))
+        self.min_similarity = min_similarity if min_similarity is not None else float(os.getenv('KB_MIN_SIMILARITY', '0.35'))
+        self.min_term_coverage = (
+            min_term_coverage if min_term_coverage is not None
+            else float(os.getenv('KB_MIN_TERM_COVERAGE', '0.8'))
+        )
+
+        self._lock = threading.Lock()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._fetched_at = np.zeros(0, dtype=np.float64)
+        self._niches = np.zeros(0, dtype=object)
+        self._matrix = np.zeros((0, dimensions), dtype=np.float32)
+        self._doc_freq = np.zeros(dimensions, dtype=np.float64)
+        self._loaded_version = None
+        self.stats = {'queries': 0, 'hits': 0, 'documents_added': 0, 'documents_updated': 0}
+
+    # ------------------------------------------------------------------ vetores
+
+    def embed(self, text: str) -> np.ndarray:
+        """Vetor normalizado do texto (hashing de termos com sinal, TF sublinear)"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        counts: Dict[str, int] = {}
+        for term in context_packer.tokenize(text or ''):
+            counts[term] = counts.get(term, 0) + 1
+
+        for term, count in counts.items():
+            hashed = zlib.crc32(term.encode('utf-8'))
+            sign = 1.0 if hashed & 0x80000000 else -1.0
+            vector[hashed % self.dimensions] += sign * (1.0 + np.log(count))
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _document_text(self, title: str, content: str) -> str:
+        # Título repetido para pesar mais que o corpo
+        return f"{title} {title} {title} {content[:MAX_CONTENT_CHARS]}"
+
+    # ------------------------------------------------------------------ persistência
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, canonical_url TEXT UNIQUE, url TEXT, title TEXT, "
+            "content TEXT, niche TEXT, query TEXT, provider TEXT, quality_score REAL, "
+            "fetched_at REAL, vector BLOB)"
+        )
+        return connection
+
+    def _version(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.db_path)
+        except OSError:
+            return None
+
+    def _ensure_loaded(self):
+        """Carrega (ou recarrega) a matriz de vetores da base (chamado com o lock adquirido)"""
+        version = self._version()
+        if version is not None and version == self._loaded_version:
+            return
+
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT id, fetched_at, vector, niche FROM documents ORDER BY id").fetchall()
+        finally:
+            connection.close()
+
+        self._ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self._fetched_at = np.array([row[1] for row in rows], dtype=np.float64)
+        self._niches = np.array([normalize_niche(row[3]) for row in rows], dtype=object)
+        if rows:
+            self._matrix = np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+        else:
+            self._matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._doc_freq = (self._matrix != 0).sum(axis=0).astype(np.float64)
+        self._loaded_version = self._version()
+
+    # ------------------------------------------------------------------ API
+
+    def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        niche: str = '',
+        query: str = '',
+        provider: str = ''
+    ) -> int:
+        """
+        Insere ou atualiza páginas extraídas (chave: URL canônica)
+
+        Args:
+            documents: Dicts com ``url``, ``content`` e opcionalmente ``title``/``quality_score``
+            niche: Segmento da sessão que coletou as páginas
+            query: Consulta que levou às páginas
+            provider: Provedor de origem
+
+        Returns:
+            Número de documentos gravados
+        """
+        rows = []
+        now = time.time()
+        for document in documents:
+            content = document.get('content') or ''
+            url = document.get('url') or ''
+            if document.get('from_knowledge_base') or len(content) < MIN_CONTENT_CHARS or not url.startswith('http'):
+                continue
+            title = document.get('title') or ''
+            vector = self.embed(self._document_text(title, content))
+            rows.append((
+                url_canonicalizer.canonical_key(url), url, title, content[:MAX_CONTENT_CHARS], niche, query,
+                provider or document.get('source', ''), float(document.get('quality_score') or 0), now,
+                vector.tobytes()
+            ))
+
+        if not rows:
+            return 0
+
+        with self._lock:
+            connection = self._connect()
+            try:
+                existing = {
+                    row[0] for row in connection.execute(
+                        f"SELECT canonical_url FROM documents WHERE canonical_url IN ({','.join('?' * len(rows))})",
+                        [row[0] for row in rows]
+                    )
+                }
+                connection.executemany(
+                    "INSERT INTO documents (canonical_url, url, title, content, niche, query, provider, "
+                    "quality_score, fetched_at, vector) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(canonical_url) DO UPDATE SET url=excluded.url, title=excluded.title, "
+                    "content=excluded.content, niche=excluded.niche, query=excluded.query, "
+                    "provider=excluded.provider, quality_score=excluded.quality_score, "
+                    "fetched_at=excluded.fetched_at, vector=excluded.vector",
+                    rows
+                )
+                # Mantém a base no tamanho máximo descartando os documentos mais antigos
+                connection.execute(
+                    "DELETE FROM documents WHERE id NOT IN "
+                    "(SELECT id FROM documents ORDER BY fetched_at DESC LIMIT ?)",
+                    (self.max_documents,)
+                )
+                connection.commit()
+            finally:
+                connection.close()
+            self._loaded_version = None
+
+        updated = len(existing)
+        self.stats['documents_added'] += len(rows) - updated
+        self.stats['documents_updated'] += updated
+        logger.info(f"📚 Base de conhecimento: {len(rows) - updated} novos, {updated} atualizados ({provider or 'vários'})")
+        return len(rows)
+
+    def search(
+        self,
+        query: str,
+        k: int = 20,
+        max_age_days: Optional[float] = None,
+        min_similarity: Optional[float] = None,
+        niche: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Documentos frescos mais parecidos com a consulta
+
+        Bloqueante (SQLite e NumPy): em código assíncrono, chamar via ``asyncio.to_thread``.
+
+        Args:
+            niche: Restringe a documentos coletados por sessões do mesmo nicho
+
+        Returns:
+            Lista de documentos (url, title, content, quality_score, fetched_at, age_days,
+            relevance_score, term_coverage, from_knowledge_base), do mais para o menos parecido
+        """
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        min_similarity = self.min_similarity if min_similarity is None else min_similarity
+
+        with self._lock:
+            self._ensure_loaded()
+            if not len(self._ids):
+                return []
+
+            # IDF da base aplicado só na consulta: termos raros na base pesam mais
+            n_docs = len(self._ids)
+            idf = np.log((1 + n_docs) / (1 + self._doc_freq)) + 1
+            query_vector = self.embed(query) * idf
+            norm = np.linalg.norm(query_vector)
+            if norm == 0:
+                return []
+
+            similarities = self._matrix @ (query_vector / norm).astype(np.float32)
+            fresh = self._fetched_at >= time.time() - max_age_days * 86400
+            similarities[~fresh] = -1.0
+            niche_key = normalize_niche(niche) if niche else ''
+            if niche_key:
+                similarities[self._niches != niche_key] = -1.0
+
+            top = np.argsort(-similarities)[:k]
+            selected = [(int(self._ids[i]), float(similarities[i])) for i in top if similarities[i] >= min_similarity]
+
+        self.stats['queries'] += 1
+        if not selected:
+            return []
+
+        connection = self._connect()
+        try:
+            placeholders = ','.join('?' * len(selected))
+            rows = {
+                row[0]: row for row in connection.execute(
+                    f"SELECT id, url, title, content, niche, provider, quality_score, fetched_at "
+                    f"FROM documents WHERE id IN ({placeholders})",
+                    [doc_id for doc_id, _ in selected]
+                )
+            }
+        finally:
+            connection.close()
+
+        now = time.time()
+        query_terms = _terms(query)
+        results = []
+        for doc_id, similarity in selected:
+            row = rows.get(doc_id)
+            if row is None:
+                continue
+            document_terms = _terms(f"{row[2]} {row[3]}")
+            results.append({
+                'url': row[1],
+                'title': row[2],
+                'content': row[3],
+                'snippet': row[3][:300],
+                'niche': row[4],
+                'source': 'knowledge_base',
+                'original_provider': row[5],
+                'quality_score': row[6],
+                'relevance_score': round(similarity, 4),
+                'term_coverage': round(len(query_terms & document_terms) / len(query_terms), 3) if query_terms else 0.0,
+                'fetched_at': row[7],
+                'age_days': round((now - row[7]) / 86400, 1),
+                'from_knowledge_base': True
+            })
+
+        self.stats['hits'] += len(results)
+        return results
+
+    def coverage(self, results: List[Dict[str, Any]], target_documents: int) -> float:
+        """
+        Fração da meta de documentos coberta pela base (0-1)
+
+        Só contam documentos que contêm ao menos ``min_term_coverage`` dos termos da consulta.
+        """
+        if target_documents <= 0:
+            return 0.0
+        covering = sum(1 for result in results if result.get('term_coverage', 0.0) >= self.min_term_coverage)
+        return min(1.0, covering / target_documents)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas da base e das consultas deste processo"""
+        with self._lock:
+            self._ensure_loaded()
+            documents = len(self._ids)
+            fresh = int((self._fetched_at >= time.time() - self.max_age_days * 86400).sum())
+        return {**self.stats, 'documents': documents, 'fresh_documents': fresh}
+
+
+# Instância global
+research_knowledge_base = ResearchKnowledgeBase()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Screenshot Encoder
+Codificação compacta de screenshots (WebP/JPEG) em um pool de workers, com recorte e limite de altura
+"""
+
+import io
+import os
+import time
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+# Extensões aceitas ao listar screenshots de uma sessão (capturas antigas são PNG)
+SCREENSHOT_EXTENSIONS = ('.png', '.webp', '.jpg', '.jpeg')
+
+_FORMATS = {
+    'webp': ('WEBP', '.webp'),
+    'jpeg': ('JPEG', '.jpg'),
+    'jpg': ('JPEG', '.jpg'),
+    'png': ('PNG', '.png')
+}
+
+
+class ScreenshotEncoder:
+    """
+    Pipeline de screenshots
+
+    O navegador entrega o PNG em memória; recorte (viewport ou elemento), limite de
+    altura, redução de largura e codificação WebP/JPEG rodam num pool de threads
+    (o Pillow libera o GIL ao codificar), fora do loop de eventos e da thread da requisição.
+    """
+
+    def __init__(
+        self,
+        image_format: str = None,
+        quality: int = None,
+        max_width: int = None,
+        max_height: int = None,
+        max_workers: int = None,
+        min_bytes: int = 1024
+    ):
+        """
+        Inicializa o encoder
+
+        Args:
+            image_format: 'webp', 'jpeg' ou 'png' (padrão: SCREENSHOT_FORMAT ou webp)
+            quality: Qualidade WebP/JPEG (padrão: SCREENSHOT_QUALITY ou 75)
+            max_width: Largura máxima; imagens maiores são reduzidas
+            max_height: Altura máxima de capturas de página inteira (costura)
+            max_workers: Threads do pool de codificação
+            min_bytes: Tamanho mínimo de um screenshot válido
+        """
+        image_format = (image_format or os.getenv('SCREENSHOT_FORMAT', 'webp')).lower()
+        if image_format not in _FORMATS or (image_format != 'png' and not HAS_PIL):
+            image_format = 'png'
+        self.image_format = image_format
+        self.quality = quality or int(os.getenv('SCREENSHOT_QUALITY', 75))
+        self.max_width = max_width or int(os.getenv('SCREENSHOT_MAX_WIDTH', 1280))
+        self.max_height = max_height or int(os.getenv('SCREENSHOT_MAX_HEIGHT', 4000))
+        self.min_bytes = min_bytes
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(4, os.cpu_count() or 1),
+            thread_name_prefix='screenshot-encoder'
+        )
+        self._lock = threading.Lock()
+        self.stats = {'encoded': 0, 'failed': 0, 'raw_bytes': 0, 'encoded_bytes': 0, 'encode_seconds': 0.0}
+
+    @property
+    def extension(self) -> str:
+        return _FORMATS[self.image_format][1]
+
+    @staticmethod
+    def list_screenshots(directory) -> List[Path]:
+        """Screenshots de um diretório (sem descer em ``thumbs/``), em ordem de nome"""
+        directory = Path(directory)
+        if not directory.exists():
+            return []
+        return sorted(
+            path for path in directory.iterdir()
+            if path.is_file() and path.suffix.lower() in SCREENSHOT_EXTENSIONS
+        )
+
+    def output_path(self, path) -> str:
+        """``path`` com a extensão do formato configurado"""
+        return str(Path(path).with_suffix(self.extension))
+
+    # ------------------------------------------------------------------ codificação
+
+    def encode(self, png_bytes: bytes, path, clip: Optional[Tuple[int, int, int, int]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Recorta, limita e codifica um screenshot PNG em memória (bloqueante)
+
+        Args:
+            png_bytes: PNG entregue pelo navegador
+            path: Destino; a extensão é trocada pela do formato configurado
+            clip: Recorte (x, y, largura, altura) em pixels da imagem
+
+        Returns:
+            Dict com ``path``, ``width``, ``height``, ``bytes``, ``raw_bytes`` e ``format``;
+            None se a imagem for inválida
+        """
+        started = time.perf_counter()
+        path = self.output_path(path)
+        try:
+            if not HAS_PIL:
+                with open(path, 'wb') as f:
+                    f.write(png_bytes)
+                return self._validate(path, len(png_bytes), None, None, started)
+
+            with Image.open(io.BytesIO(png_bytes)) as image:
+                image.load()
+                if clip:
+                    x, y, width, height = (int(value) for value in clip)
+                    image = image.crop((max(x, 0), max(y, 0), min(x + width, image.width), min(y + height, image.height)))
+                if image.height > self.max_height:
+                    image = image.crop((0, 0, image.width, self.max_height))
+                if image.width > self.max_width:
+                    ratio = self.max_width / image.width
+                    image = image.resize((self.max_width, max(1, int(image.height * ratio))), Image.LANCZOS)
+
+                pil_format = _FORMATS[self.image_format][0]
+                if pil_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGB')
+                options = {'optimize': True} if pil_format == 'PNG' else {'quality': self.quality}
+                if pil_format == 'WEBP':
+                    options['method'] = 4
+
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                image.save(temp_path, pil_format, **options)
+                os.replace(temp_path, path)
+                return self._validate(path, len(png_bytes), image.width, image.height, started)
+
+        except Exception as e:
+            with self._lock:
+                self.stats['failed'] += 1
+            logger.warning(f"⚠️ Falha ao codificar screenshot {path}: {e}")
+            return None
+
+    def _validate(self, path: str, raw_bytes: int, width: Optional[int], height: Optional[int], started: float) -> Optional[Dict[str, Any]]:
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        with self._lock:
+            if size < self.min_bytes:
+                self.stats['failed'] += 1
+            else:
+                self.stats['encoded'] += 1
+                self.stats['raw_bytes'] += raw_bytes
+                self.stats['encoded_bytes'] += size
+                self.stats['encode_seconds'] += time.perf_counter() - started
+        if size < self.min_bytes:
+            logger.warning(f"⚠️ Screenshot inválido ({size} bytes): {path}")
+            return None
+        return {
+            'path': path,
+            'format': self.image_format,
+            'width': width,
+            'height': height,
+            'bytes': size,
+            'raw_bytes': raw_bytes
+        }
+
+    def submit(self, png_bytes: bytes, path, clip: Optional[Tuple[int, int, int, int]] = None) -> Future:
+        """Agenda a codificação no pool (para chamadores síncronos)"""
+        return self._executor.submit(self.encode, png_bytes, path, clip)
+
+    async def encode_async(self, png_bytes: bytes, path, clip: Optional[Tuple[int, int, int, int]] = None) -> Optional[Dict[str, Any]]:
+        """Codificação no pool sem bloquear o loop de eventos"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.encode, png_bytes, path, clip)
+
+    # ------------------------------------------------------------------ captura
+
+    def capture_selenium(self, driver, path, element=None, full_page: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Captura via Selenium: viewport, elemento ou página inteira costurada até ``max_height``
+
+        A captura é síncrona (o driver não é thread-safe); a codificação vai para o pool
+        e o resultado é aguardado no fim.
+        """
+        if element is not None:
+            return self.submit(element.screenshot_as_png, path).result()
+        if not full_page or not HAS_PIL:
+            return self.submit(driver.get_screenshot_as_png(), path).result()
+        return self.submit(self._stitch_selenium(driver), path).result()
+
+    def _stitch_selenium(self, driver) -> bytes:
+        """Rola a página de viewport em viewport e monta um PNG de até ``max_height`` pixels"""
+        viewport_height = driver.execute_script("return window.innerHeight") or 1080
+        total_height = min(driver.execute_script("return document.body.scrollHeight") or viewport_height, self.max_height)
+
+        tiles = []
+        offset = 0
+        while offset < total_height:
+            driver.execute_script(f"window.scrollTo(0, {offset});")
+            time.sleep(0.2)
+            scrolled = driver.execute_script("return window.pageYOffset") or 0
+            tiles.append((scrolled, Image.open(io.BytesIO(driver.get_screenshot_as_png()))))
+            if scrolled + viewport_height >= total_height or scrolled < offset:
+                break
+            offset += viewport_height
+        driver.execute_script("window.scrollTo(0, 0);")
+
+        # Screenshots em telas HiDPI vêm em pixels do dispositivo
+        scale = tiles[0][1].height / viewport_height
+        canvas = Image.new('RGB', (tiles[0][1].width, int(total_height * scale)), 'white')
+        for scrolled, tile in tiles:
+            canvas.paste(tile.convert('RGB'), (0, int(scrolled * scale)))
+        buffer = io.BytesIO()
+        canvas.save(buffer, 'PNG', compress_level=1)
+        return buffer.getvalue()
+
+    async def capture_playwright(self, page, path, element=None, full_page: bool = False) -> Optional[Dict[str, Any]]:
+        """Captura via Playwright (elemento, viewport ou página inteira até ``max_height``) e codifica no pool"""
+        if element is not None:
+            png_bytes = await element.screenshot(type='png')
+        elif full_page:
+            height = await page.evaluate("document.documentElement.scrollHeight")
+            width = await page.evaluate("document.documentElement.clientWidth")
+            png_bytes = await page.screenshot(
+                type='png', full_page=True,
+                clip={'x': 0, 'y': 0, 'width': width, 'height': min(height, self.max_height)}
+            )
+        else:
+            png_bytes = await page.screenshot(type='png', full_page=False)
+        return await self.encode_async(png_bytes, path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['format'] = self.image_format
+        stats['compression_ratio'] = round(stats['raw_bytes'] / stats['encoded_bytes'], 1) if stats['encoded_bytes'] else None
+        return stats
+
+
+# Instância global
+screenshot_encoder = ScreenshotEncoder()
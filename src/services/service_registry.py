@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Service Registry
+Registro preguiçoso de serviços: módulos pesados e singletons só são criados no primeiro uso
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import importlib
+import threading
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """
+    Proxy para um serviço registrado.
+
+    Pode ser usado no lugar do singleton original (``ai_manager.generate_analysis(...)``,
+    ``salvar_etapa(...)``): o módulo só é importado quando um atributo é acessado ou
+    quando o proxy é chamado.
+    """
+
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: "ServiceRegistry", name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._registry.get(self._name), attribute)
+
+    def __setattr__(self, attribute: str, value: Any):
+        setattr(self._registry.get(self._name), attribute, value)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._registry.get(self._name)(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        state = "carregado" if self._registry.is_loaded(self._name) else "não carregado"
+        return f"<LazyService {self._name} ({state})>"
+
+
+class ServiceRegistry:
+    """Registro central de serviços com criação sob demanda e aquecimento opcional"""
+
+    def __init__(self):
+        """Inicializa o registro"""
+        self._specs: Dict[str, Dict[str, str]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._load_times: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._warmup_thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, module: str, attribute: Optional[str] = None):
+        """
+        Registra um serviço
+
+        Args:
+            name: Nome do serviço no registro
+            module: Módulo que define o serviço (ex: 'services.ai_manager')
+            attribute: Atributo do módulo (singleton, função ou classe); padrão é ``name``
+        """
+        self._specs[name] = {"module": module, "attribute": attribute or name}
+
+    def get(self, name: str) -> Any:
+        """Retorna o serviço, importando o módulo na primeira chamada"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._specs:
+            raise KeyError(f"Serviço não registrado: {name}")
+
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+
+            spec = self._specs[name]
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(spec["module"])
+                instance = getattr(module, spec["attribute"])
+            except Exception as e:
+                self._errors[name] = str(e)
+                logger.error(f"❌ Falha ao carregar serviço {name}: {e}")
+                raise
+
+            self._instances[name] = instance
+            self._errors.pop(name, None)
+            self._load_times[name] = time.perf_counter() - start
+            logger.info(f"✅ Serviço {name} carregado sob demanda em {self._load_times[name]:.2f}s")
+            return instance
+
+    def lazy(self, name: str) -> LazyService:
+        """Retorna um proxy que só carrega o serviço no primeiro uso"""
+        if name not in self._specs:
+            raise KeyError(f"Serviço não registrado: {name}")
+        return LazyService(self, name)
+
+    def is_loaded(self, name: str) -> bool:
+        """Verifica se o serviço já foi carregado"""
+        return name in self._instances
+
+    def is_available(self, name: str) -> bool:
+        """Carrega o serviço se necessário e informa se ele pôde ser criado"""
+        try:
+            self.get(name)
+            return True
+        except Exception:
+            return False
+
+    def warm_up(self, names: Optional[List[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Pré-carrega serviços (todos os registrados se ``names`` for None)
+
+        Args:
+            names: Serviços a aquecer
+            background: Se True, carrega numa thread daemon e retorna imediatamente
+        """
+        targets = [name for name in (names or list(self._specs)) if name in self._specs]
+
+        def _run():
+            for name in targets:
+                try:
+                    self.get(name)
+                except Exception:
+                    continue
+            logger.info(f"🔥 Aquecimento de serviços concluído: {len(targets)} serviço(s)")
+
+        if not background:
+            _run()
+            return None
+
+        self._warmup_thread = threading.Thread(target=_run, name="service-warmup", daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def get_status(self) -> Dict[str, Any]:
+        """Retorna o estado de cada serviço para monitoramento"""
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "services": {
+                name: {
+                    "module": spec["module"],
+                    "loaded": name in self._instances,
+                    "load_time_seconds": round(self._load_times[name], 3) if name in self._load_times else None,
+                    "error": self._errors.get(name)
+                }
+                for name, spec in self._specs.items()
+            },
+            "warmup_running": bool(self._warmup_thread and self._warmup_thread.is_alive())
+        }
+
+
+def get_memory_report() -> Dict[str, Any]:
+    """
+    Relatório de memória do processo atual e, sob gunicorn, de todos os workers irmãos.
+
+    RSS inclui páginas compartilhadas com o master; USS (quando disponível) é a memória
+    exclusiva do processo e a métrica certa para comparar workers.
+    """
+    try:
+        import psutil
+    except ImportError:
+        return {"error": "psutil não disponível"}
+
+    def _process_memory(process) -> Dict[str, Any]:
+        info = {"pid": process.pid}
+        try:
+            full = process.memory_full_info()
+            info["rss_mb"] = round(full.rss / (1024 ** 2), 1)
+            info["uss_mb"] = round(getattr(full, "uss", 0) / (1024 ** 2), 1)
+        except (psutil.AccessDenied, psutil.NoSuchProcess):
+            try:
+                info["rss_mb"] = round(process.memory_info().rss / (1024 ** 2), 1)
+            except (psutil.AccessDenied, psutil.NoSuchProcess):
+                pass
+        return info
+
+    current = psutil.Process()
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "current_process": _process_memory(current),
+        "loaded_modules": len(sys.modules),
+        "workers": []
+    }
+
+    try:
+        parent = current.parent()
+        if parent and "gunicorn" in " ".join(parent.cmdline()):
+            report["master"] = _process_memory(parent)
+            report["workers"] = [_process_memory(worker) for worker in parent.children()]
+    except (psutil.AccessDenied, psutil.NoSuchProcess):
+        pass
+
+    return report
+
+
+def measure_import_time(statement: str = "import run; run.create_app()") -> Dict[str, Any]:
+    """
+    Mede o tempo de importação com ``python -X importtime`` em um processo limpo
+
+    Returns:
+        Dict com o tempo total (ms) e os módulos de nível superior mais caros
+    """
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=src_dir, capture_output=True, text=True
+    )
+
+    # Formato: "import time: self [us] | cumulative | imported package"
+    top_level = []
+    for line in completed.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)", line)
+        if match and len(match.group(3)) == 1:
+            top_level.append((match.group(4), int(match.group(2))))
+
+    total_us = sum(cumulative for _, cumulative in top_level)
+    return {
+        "statement": statement,
+        "returncode": completed.returncode,
+        "total_ms": round(total_us / 1000, 1),
+        "slowest": [
+            {"module": module, "cumulative_ms": round(cumulative / 1000, 1)}
+            for module, cumulative in sorted(top_level, key=lambda item: item[1], reverse=True)[:15]
+        ]
+    }
+
+
+# Instância global
+service_registry = ServiceRegistry()
+
+service_registry.register("ai_manager", "services.ai_manager")
+service_registry.register("db_manager", "database")
+service_registry.register("auto_save_manager", "services.auto_save_manager")
+service_registry.register("salvar_etapa", "services.auto_save_manager")
+service_registry.register("salvar_erro", "services.auto_save_manager")
+service_registry.register("health_checker", "services.health_checker")
+service_registry.register("local_file_manager", "services.local_file_manager")
+service_registry.register("massive_data_collector", "services.massive_data_collector")
+service_registry.register("master_analysis_orchestrator", "services.master_analysis_orchestrator")
+service_registry.register("progress_tracker", "services.progress_tracker_enhanced")
+service_registry.register("production_search_manager", "services.production_search_manager")
+service_registry.register("real_search_orchestrator", "services.real_search_orchestrator")
+service_registry.register("viral_content_analyzer", "services.viral_content_analyzer")
+service_registry.register("enhanced_synthesis_engine", "services.enhanced_synthesis_engine")
+service_registry.register("enhanced_module_processor", "services.enhanced_module_processor")
+service_registry.register("comprehensive_report_generator_v3", "services.comprehensive_report_generator_v3")
+service_registry.register("viral_integration_service", "services.viral_integration_service")
+service_registry.register("session_manager", "services.session_persistence_manager")
+service_registry.register("predictive_analytics_service", "services.predictive_analytics_service")
+service_registry.register("near_duplicate_detector", "services.near_duplicate_detector")
+service_registry.register("session_corpus_index", "services.session_corpus_index")
+service_registry.register("research_knowledge_base", "services.research_knowledge_base")
+service_registry.register("provider_telemetry", "services.provider_telemetry")
+service_registry.register("image_store", "services.image_store")
+service_registry.register("perceptual_image_index", "services.perceptual_image_index")
+service_registry.register("screenshot_encoder", "services.screenshot_encoder")
+service_registry.register("render_cache", "services.render_cache")
+service_registry.register("viral_scoring_engine", "services.viral_scoring_engine")
+
+
+if __name__ == "__main__":
+    # Verificação de orçamento de importação: python -m services.service_registry --budget-ms 1500
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de importação e relatório de memória")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Falha se a importação passar deste tempo")
+    parser.add_argument("--statement", default="import run; run.create_app()")
+    args = parser.parse_args()
+
+    result = measure_import_time(args.statement)
+    print(f"⏱️ Importação: {result['total_ms']} ms (returncode {result['returncode']})")
+    for entry in result["slowest"]:
+        print(f"   {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+    print(f"💾 Memória: {get_memory_report().get('current_process')}")
+
+    if result["returncode"] != 0:
+        sys.exit(result["returncode"])
+    if args.budget_ms is not None and result["total_ms"] > args.budget_ms:
+        print(f"❌ Orçamento de importação excedido: {result['total_ms']} ms > {args.budget_ms} ms")
+        sys.exit(1)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Session Corpus Index
+Índice invertido por sessão (SQLite FTS5) sobre o corpus da etapa 1, para recuperar passagens por tópico
+"""
+
+import os
+import glob
+import json
+import sqlite3
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Any, Optional
+
+from services.context_packer import context_packer, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Seções de ``consolidated_text_content`` que entram no índice
+INDEXED_SECTIONS = ('search_content', 'viral_content', 'additional_content')
+
+# Prefixo usado como "radical" barato: objeção/objeções/objecao casam em "objec*"
+STEM_LENGTH = 6
+
+
+def _has_fts5() -> bool:
+    try:
+        connection = sqlite3.connect(':memory:')
+        connection.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        connection.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+HAS_FTS5 = _has_fts5()
+
+
+def _stem(term: str) -> str:
+    """Termo sem acentos e truncado em ``STEM_LENGTH`` caracteres"""
+    term = unicodedata.normalize('NFKD', term)
+    term = ''.join(char for char in term if not unicodedata.combining(char))
+    return term[:STEM_LENGTH]
+
+
+class SessionCorpusIndex:
+    """
+    Índice de passagens do corpus da etapa 1, gravado em ``analyses_data/<sessão>/corpus_index.sqlite``
+
+    É construído uma vez ao fim da etapa 1 e consultado por cada módulo com os termos
+    do seu tópico. Sem FTS5 no SQLite local, as passagens ficam numa tabela simples e
+    o ranqueamento BM25 é feito em Python.
+    """
+
+    def __init__(self, base_path: str = "analyses_data", index_name: str = "corpus_index.sqlite"):
+        """
+        Inicializa o índice
+
+        Args:
+            base_path: Diretório raiz das sessões
+            index_name: Nome do arquivo do índice dentro do diretório da sessão
+        """
+        self.base_path = base_path
+        self.index_name = index_name
+        self._lock = threading.Lock()
+
+    def index_path(self, session_id: str) -> str:
+        return os.path.join(self.base_path, session_id, self.index_name)
+
+    def has_index(self, session_id: str) -> bool:
+        return os.path.exists(self.index_path(session_id))
+
+    def build(self, session_id: str, text_content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        (Re)constrói o índice da sessão
+
+        Args:
+            session_id: ID da sessão
+            text_content: ``consolidated_text_content`` do JSON massivo da etapa 1
+
+        Returns:
+            Estatísticas da construção
+        """
+        rows = []
+        for section in INDEXED_SECTIONS:
+            for i, text in enumerate(text_content.get(section) or []):
+                if isinstance(text, str) and text.strip():
+                    for passage in context_packer.split_passages(text, f"{section}_{i + 1}"):
+                        rows.append((section, passage['source'], passage['text']))
+
+        path = self.index_path(session_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+
+        with self._lock:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            connection = sqlite3.connect(temp_path)
+            try:
+                if HAS_FTS5:
+                    connection.execute(
+                        "CREATE VIRTUAL TABLE passages USING fts5("
+                        "text, section UNINDEXED, source UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+                    )
+                else:
+                    connection.execute("CREATE TABLE passages (text TEXT, section TEXT, source TEXT)")
+                connection.executemany(
+                    "INSERT INTO passages (section, source, text) VALUES (?, ?, ?)", rows
+                )
+                connection.commit()
+            finally:
+                connection.close()
+            # Troca atômica: leitores nunca veem um índice pela metade
+            os.replace(temp_path, path)
+
+        stats = {
+            'passages': len(rows),
+            'tokens': sum(estimate_tokens(text) for _, _, text in rows),
+            'engine': 'fts5' if HAS_FTS5 else 'bm25_python'
+        }
+        logger.info(f"🗂️ Índice do corpus da sessão {session_id}: {stats['passages']} passagens ({stats['engine']})")
+        return stats
+
+    def ensure_index(self, session_id: str) -> bool:
+        """Constrói o índice a partir do JSON massivo salvo, se ainda não existir"""
+        if self.has_index(session_id):
+            return True
+
+        candidates = glob.glob(f"{self.base_path}/{session_id}/**/etapa1_massive_data*.json", recursive=True)
+        candidates += glob.glob(f"relatorios_intermediarios/*/{session_id}/etapa1_massive_data*.json")
+        if not candidates:
+            return False
+
+        try:
+            with open(max(candidates, key=os.path.getctime), 'r', encoding='utf-8') as f:
+                massive_data = json.load(f)
+            self.build(session_id, massive_data.get('consolidated_text_content') or {})
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível indexar o corpus da sessão {session_id}: {e}")
+            return False
+
+    def search(self, session_id: str, query: str, k: int = 8, max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Passagens mais relevantes para a consulta
+
+        Args:
+            session_id: ID da sessão
+            query: Termos do tópico
+            k: Número máximo de passagens
+            max_tokens: Limite opcional de tokens estimados somados
+
+        Returns:
+            Lista de {"section", "source", "text", "score"}, da mais para a menos relevante
+        """
+        stems = sorted({_stem(term) for term in context_packer.tokenize(query) if len(term) > 2})
+        if not stems or not self.has_index(session_id):
+            return []
+
+        connection = sqlite3.connect(self.index_path(session_id))
+        try:
+            if HAS_FTS5:
+                match = ' OR '.join(f'"{stem}"*' for stem in stems)
+                rows = connection.execute(
+                    "SELECT section, source, text, -bm25(passages) FROM passages "
+                    "WHERE passages MATCH ? ORDER BY bm25(passages) LIMIT ?",
+                    (match, k * 3)
+                ).fetchall()
+            else:
+                rows = self._python_bm25(connection, stems, k * 3)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Falha na consulta ao índice da sessão {session_id}: {e}")
+            return []
+        finally:
+            connection.close()
+
+        results, tokens_used = [], 0
+        for section, source, text, score in rows:
+            cost = estimate_tokens(text)
+            if max_tokens is not None and tokens_used + cost > max_tokens:
+                continue
+            results.append({'section': section, 'source': source, 'text': text, 'score': round(float(score), 4)})
+            tokens_used += cost
+            if len(results) >= k:
+                break
+        return results
+
+    def _python_bm25(self, connection: sqlite3.Connection, stems: List[str], limit: int) -> List[tuple]:
+        """Ranqueamento BM25 em Python sobre a tabela simples (SQLite sem FTS5)"""
+        rows = connection.execute("SELECT section, source, text FROM passages").fetchall()
+        passages_tokens = [[_stem(term) for term in context_packer.tokenize(text)] for _, _, text in rows]
+        scores = context_packer.bm25_scores(passages_tokens, stems)
+        ranked = [i for i in scores.argsort()[::-1][:limit] if scores[i] > 0]
+        return [(*rows[i], scores[i]) for i in ranked]
+
+
+# Instância global
+session_corpus_index = SessionCorpusIndex()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - URL Canonicalizer
+Canonicalização de URLs e deduplicação entre provedores antes da extração
+"""
+
+import re
+import base64
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote, unquote_plus
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros de rastreamento removidos da URL (comparação em minúsculas)
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref_src',
+    'ref_url', 'spm', 's_cid', 'ocid', 'cmpid', 'si', 'feature', '__twitter_impression',
+    'amp', 'amp_js_v', 'usqp', 'outputtype'
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_', 'vero_')
+
+# Subdomínios de versões móveis/AMP que apontam para a mesma página
+_VARIANT_SUBDOMAINS = ('www.', 'm.', 'mobile.', 'amp.')
+_AMP_PATH_SUFFIX = re.compile(r'/amp/?$', re.IGNORECASE)
+_AMP_HTML_SUFFIX = re.compile(r'\.amp\.html?$', re.IGNORECASE)
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class URLCanonicalizer:
+    """Normaliza URLs e mantém, por sessão, o conjunto de páginas já vistas"""
+
+    def __init__(self, max_sessions: int = 64):
+        """
+        Inicializa o canonicalizador
+
+        Args:
+            max_sessions: Número máximo de sessões mantidas em memória (LRU)
+        """
+        self.max_sessions = max_sessions
+        # session_id -> {chave canônica -> registro mesclado (None enquanto só reservado)}
+        self._sessions: "OrderedDict[str, Dict[str, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'urls_processed': 0, 'duplicates_merged': 0, 'redirects_resolved': 0}
+
+    def resolve_redirect(self, url: str) -> str:
+        """Resolve redirecionamentos conhecidos (Bing /ck/a, cache AMP do Google/ampproject)"""
+        if not url:
+            return url
+
+        if "bing.com/ck/a" in url and "u=a1" in url:
+            resolved = self._resolve_bing_url(url)
+            if resolved != url:
+                self.stats['redirects_resolved'] += 1
+                return resolved
+
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        # A query string do cache AMP pertence à página de destino
+        query = f"?{parts.query}" if parts.query else ''
+
+        # https://www.google.com/amp/s/exemplo.com/noticia -> https://exemplo.com/noticia
+        if host.endswith('google.com') and parts.path.startswith('/amp/'):
+            target = parts.path[len('/amp/'):]
+            target = target[2:] if target.startswith('s/') else target
+            self.stats['redirects_resolved'] += 1
+            return f"https://{target}{query}"
+
+        # https://exemplo-com.cdn.ampproject.org/c/s/exemplo.com/noticia?a=1 -> https://exemplo.com/noticia?a=1
+        if host.endswith('.cdn.ampproject.org'):
+            match = re.match(r'^/[cv]/(s/)?(.+)$', parts.path)
+            if match:
+                self.stats['redirects_resolved'] += 1
+                return f"https://{match.group(2)}{query}"
+
+        return url
+
+    def _resolve_bing_url(self, url: str) -> str:
+        """Decodifica o parâmetro u=a1<base64> dos links de redirecionamento do Bing"""
+        try:
+            u_param_start = url.find("u=a1") + 4
+            u_param_end = url.find("&", u_param_start)
+            if u_param_end == -1:
+                u_param_end = len(url)
+
+            encoded_part = url[u_param_start:u_param_end]
+            encoded_part = encoded_part.replace('%3d', '=').replace('%3D', '=')
+            missing_padding = len(encoded_part) % 4
+            if missing_padding:
+                encoded_part += '=' * (4 - missing_padding)
+
+            first_decode_str = base64.b64decode(encoded_part).decode('utf-8', errors='ignore')
+
+            if first_decode_str.startswith('aHR0'):
+                # Segunda decodificação necessária
+                missing_padding = len(first_decode_str) % 4
+                if missing_padding:
+                    first_decode_str += '=' * (4 - missing_padding)
+                final_url = base64.b64decode(first_decode_str).decode('utf-8', errors='ignore')
+                if final_url.startswith('http'):
+                    return final_url
+
+            elif first_decode_str.startswith('http'):
+                return first_decode_str
+
+        except Exception:
+            pass
+
+        return url
+
+    def clean(self, url: str) -> str:
+        """
+        URL para extração: redirecionamentos resolvidos, sem parâmetros de rastreamento e
+        sem fragmento. Host, caminho e os demais parâmetros ficam como estão (inclusive
+        ``?flag`` sem valor); variantes AMP só são unificadas em ``canonical_key``.
+        """
+        if not url or not url.startswith('http'):
+            return url
+
+        url = self.resolve_redirect(url.strip())
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return url
+
+        query = '&'.join(
+            pair for pair in parts.query.split('&')
+            if pair and not self._is_tracking_param(unquote_plus(pair.split('=', 1)[0]))
+        )
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+
+    @staticmethod
+    def _is_tracking_param(key: str) -> bool:
+        key = key.lower()
+        return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+    def canonical_key(self, url: str) -> str:
+        """
+        Chave de deduplicação: independe de esquema, porta padrão, ``www``/``m.``/``amp.``,
+        sufixos AMP do caminho, barra final, ordem dos parâmetros e capitalização do
+        percent-encoding.
+        """
+        cleaned = self.clean(url)
+        if not cleaned or not cleaned.startswith('http'):
+            return cleaned or ''
+
+        try:
+            parts = urlsplit(cleaned)
+            port = parts.port
+        except ValueError:
+            return cleaned
+
+        host = (parts.hostname or '').lower()
+        for prefix in _VARIANT_SUBDOMAINS:
+            if host.startswith(prefix) and host.count('.') > 1:
+                host = host[len(prefix):]
+                break
+        if port and port != _DEFAULT_PORTS.get(parts.scheme.lower()):
+            host = f"{host}:{port}"
+
+        path = _AMP_HTML_SUFFIX.sub('.html', parts.path)
+        path = _AMP_PATH_SUFFIX.sub('', path)
+        path = unquote(path).rstrip('/') or '/'
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return f"{host}{path}" + (f"?{query}" if query else '')
+
+    def _session(self, session_id: Optional[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Conjunto de páginas da sessão (chamado com o lock adquirido)
+
+        Sem ``session_id`` retorna um conjunto descartável: a deduplicação vale só para
+        a chamada atual e chamadas anônimas não compartilham estado entre si.
+        """
+        if not session_id:
+            return {}
+        seen = self._sessions.get(session_id)
+        if seen is None:
+            seen = self._sessions[session_id] = {}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return seen
+
+    def claim(self, session_id: str, url: str) -> bool:
+        """
+        Reserva a página para extração na sessão
+
+        Returns:
+            True se a página ainda não foi vista (deve ser extraída), False se é duplicata
+        """
+        key = self.canonical_key(url)
+        if not key:
+            return False
+
+        with self._lock:
+            seen = self._session(session_id)
+            self.stats['urls_processed'] += 1
+            if key in seen:
+                self.stats['duplicates_merged'] += 1
+                return False
+            seen[key] = None
+            return True
+
+    def merge_results(self, session_id: str, results: List[Dict[str, Any]], provider: str) -> List[Dict[str, Any]]:
+        """
+        Deduplica resultados de um provedor contra tudo o que a sessão já viu
+
+        Resultados novos recebem ``url`` limpa, ``canonical_url``, ``providers`` e
+        ``original_urls`` e são retornados. Duplicatas não são retornadas: a proveniência
+        é mesclada no registro já existente (o mesmo dict presente nos resultados anteriores).
+        """
+        new_results = []
+
+        with self._lock:
+            seen = self._session(session_id)
+
+            for result in results:
+                original_url = result.get('url', '')
+                key = self.canonical_key(original_url)
+                self.stats['urls_processed'] += 1
+
+                if not key:
+                    new_results.append(result)
+                    continue
+
+                record = seen.get(key)
+                if record is not None:
+                    self.stats['duplicates_merged'] += 1
+                    self._merge_provenance(record, result, provider, original_url)
+                    continue
+
+                result['url'] = self.clean(original_url)
+                result['canonical_url'] = key
+                result['providers'] = [provider]
+                result['original_urls'] = [original_url]
+                seen[key] = result
+                new_results.append(result)
+
+        return new_results
+
+    def _merge_provenance(self, record: Dict[str, Any], duplicate: Dict[str, Any], provider: str, original_url: str):
+        """Acumula proveniência e completa campos vazios do registro com a duplicata"""
+        if provider not in record['providers']:
+            record['providers'].append(provider)
+        if original_url not in record['original_urls']:
+            record['original_urls'].append(original_url)
+
+        for field in ('title', 'snippet', 'published_date'):
+            if not record.get(field) and duplicate.get(field):
+                record[field] = duplicate[field]
+
+        if duplicate.get('relevance_score') is not None:
+            record['relevance_score'] = max(record.get('relevance_score') or 0, duplicate['relevance_score'])
+
+    def session_size(self, session_id: str) -> int:
+        """Número de páginas únicas registradas na sessão"""
+        with self._lock:
+            return len(self._sessions.get(session_id, {}))
+
+    def reset_session(self, session_id: str):
+        """Descarta o conjunto de páginas vistas da sessão"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+# Instância global
+url_canonicalizer = URLCanonicalizer()
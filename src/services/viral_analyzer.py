@@ -22,6 +22,9 @@ from PIL import Image
 import io
 import time
 
+from services.screenshot_encoder import screenshot_encoder
+from services.viral_scoring_engine import viral_scoring_engine
+
 
 @dataclass
 class ViralContent:
@@ -117,18 +120,13 @@ class ViralContentAnalyzer:
                 });
             """)
             
-            screenshot_path = os.path.join(self.screenshot_dir, filename)
-            
-            if full_page:
-                # Screenshot da página inteira
-                total_height = driver.execute_script("return document.body.scrollHeight")
-                driver.set_window_size(1920, total_height)
-                time.sleep(2)
-            
-            driver.save_screenshot(screenshot_path)
+            # Página inteira costurada até a altura máxima; codificação WebP/JPEG no pool
+            screenshot = screenshot_encoder.capture_selenium(
+                driver, os.path.join(self.screenshot_dir, filename), full_page=full_page
+            )
             driver.quit()
             
-            return screenshot_path
+            return screenshot['path'] if screenshot else ""
             
         except Exception as e:
             print(f"Erro ao capturar screenshot de {url}: {e}")
@@ -319,59 +317,7 @@ class ViralContentAnalyzer:
         """
         Calcula score de viralidade baseado na plataforma
         """
-        score = 0.0
-        
-        if platform == 'youtube':
-            stats = content_data.get('stats', {})
-            views = int(stats.get('viewCount', 0))
-            likes = int(stats.get('likeCount', 0))
-            comments = int(stats.get('commentCount', 0))
-            
-            # Score baseado em views (normalizado)
-            if views > 1000000:  # 1M+ views
-                score += 10.0
-            elif views > 100000:  # 100K+ views
-                score += 7.0
-            elif views > 10000:  # 10K+ views
-                score += 5.0
-            elif views > 1000:  # 1K+ views
-                score += 3.0
-            
-            # Score baseado em engagement rate
-            if views > 0:
-                engagement_rate = (likes + comments) / views
-                score += min(engagement_rate * 100, 5.0)
-                
-        elif platform == 'instagram':
-            likes = content_data.get('likes', 0)
-            comments = content_data.get('comments', 0)
-            
-            total_engagement = likes + comments
-            if total_engagement > 10000:
-                score += 10.0
-            elif total_engagement > 1000:
-                score += 7.0
-            elif total_engagement > 100:
-                score += 5.0
-            elif total_engagement > 10:
-                score += 3.0
-                
-        elif platform == 'facebook':
-            reactions = content_data.get('reactions', 0)
-            comments = content_data.get('comments', 0)
-            shares = content_data.get('shares', 0)
-            
-            total_engagement = reactions + comments + (shares * 2)  # Shares valem mais
-            if total_engagement > 5000:
-                score += 10.0
-            elif total_engagement > 500:
-                score += 7.0
-            elif total_engagement > 50:
-                score += 5.0
-            elif total_engagement > 5:
-                score += 3.0
-        
-        return min(score, 10.0)  # Cap at 10.0
+        return viral_scoring_engine.score_tiers(content_data, platform)
     
     async def _simulate_instagram_search(self, hashtag: str, limit: int) -> List[Dict]:
         """Simula busca no Instagram (para demonstração)"""
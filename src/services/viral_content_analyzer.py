@@ -14,6 +14,8 @@ from datetime import datetime
 from pathlib import Path
 import json
 
+import numpy as np
+
 # Selenium imports
 try:
     from selenium import webdriver
@@ -29,6 +31,11 @@ except ImportError:
     logging.warning("⚠️ Selenium não instalado - screenshots não disponíveis")
     HAS_SELENIUM = False
 
+from services.perceptual_image_index import perceptual_image_index
+from services.screenshot_encoder import screenshot_encoder
+from services.render_cache import render_cache
+from services.viral_scoring_engine import viral_scoring_engine
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO) # Ensure logger is active
 if not logger.handlers:
@@ -96,9 +103,14 @@ class ViralContentAnalyzer:
         self,
         search_results: Dict[str, Any],
         session_id: str,
-        max_captures: int = 15
+        max_captures: int = 15,
+        force_refresh: bool = False
     ) -> Dict[str, Any]:
-        """Analisa e captura conteúdo viral dos resultados de busca"""
+        """
+        Analisa e captura conteúdo viral dos resultados de busca
+
+        ``force_refresh`` recaptura os screenshots mesmo com renderização válida em cache.
+        """
 
         logger.info(f"🔥 Analisando conteúdo viral para sessão: {session_id}")
 
@@ -139,7 +151,8 @@ class ViralContentAnalyzer:
             # FASE 3: Captura de Screenshots
             logger.info("📸 FASE 3: Capturando screenshots do conteúdo viral")
 
-            if HAS_SELENIUM and viral_content:
+            # Sem Selenium, ainda há as renderizações em cache de outras sessões
+            if viral_content:
                 try:
                     # Seleciona top performers para screenshot
                     top_content = sorted(
@@ -148,14 +161,14 @@ class ViralContentAnalyzer:
                         reverse=True
                     )[:max_captures]
 
-                    screenshots = await self._capture_viral_screenshots(top_content, session_id)
+                    screenshots = await self._capture_viral_screenshots(top_content, session_id, force_refresh)
                     analysis_results['screenshots_captured'] = screenshots
                 except Exception as e:
                     logger.warning(f"⚠️ Screenshots não disponíveis: {e}")
                     # Continua sem screenshots - não é crítico
                     analysis_results['screenshots_captured'] = [] # Garante que seja uma lista vazia em caso de erro
             else:
-                logger.warning("⚠️ Selenium não disponível ou nenhum conteúdo viral encontrado - screenshots desabilitados")
+                logger.warning("⚠️ Nenhum conteúdo viral encontrado - screenshots desabilitados")
                 analysis_results['screenshots_captured'] = [] # Garante que seja uma lista vazia
 
             # FASE 4: Métricas e Insights
@@ -186,73 +199,29 @@ class ViralContentAnalyzer:
     def _identify_viral_content(self, all_content: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Identifica conteúdo viral baseado em métricas"""
 
-        viral_content = []
-
+        contents = []
         for content in all_content:
             if not isinstance(content, dict):
                  logger.warning("Item de conteúdo não é um dicionário, pulando.")
                  continue
-            platform = content.get('platform', 'web')
-            viral_score = self._calculate_viral_score(content, platform)
+            contents.append(content)
+
+        # Scores e categorias de todo o lote numa passada vetorizada
+        viral_scores = viral_scoring_engine.content_scores(contents)
+        categories = viral_scoring_engine.categorize(viral_scores)
 
-            if viral_score >= 5.0:  # Threshold viral
-                content['viral_score'] = viral_score
-                content['viral_category'] = self._categorize_viral_content(content, viral_score)
-                viral_content.append(content)
+        viral_content = []
+        for index in np.flatnonzero(viral_scores >= 5.0):  # Threshold viral
+            content = contents[index]
+            content['viral_score'] = float(viral_scores[index])
+            content['viral_category'] = str(categories[index])
+            viral_content.append(content)
 
         return viral_content
 
     def _calculate_viral_score(self, content: Dict[str, Any], platform: str) -> float:
         """Calcula score viral baseado na plataforma"""
-
-        try:
-            if platform == 'youtube':
-                views = int(content.get('view_count', 0) or 0)
-                likes = int(content.get('like_count', 0) or 0)
-                comments = int(content.get('comment_count', 0) or 0)
-
-                # Fórmula YouTube: views/1000 + likes/100 + comments/10
-                score = (views / 1000) + (likes / 100) + (comments / 10)
-                return min(10.0, score / 100) if score > 0 else 0.0
-
-            elif platform in ['instagram', 'facebook']:
-                likes = int(content.get('likes', 0) or 0)
-                comments = int(content.get('comments', 0) or 0)
-                shares = int(content.get('shares', 0) or 0)
-
-                # Fórmula Instagram/Facebook
-                score = (likes / 100) + (comments / 10) + (shares / 5)
-                return min(10.0, score / 50) if score > 0 else 0.0
-
-            elif platform == 'twitter':
-                retweets = int(content.get('retweets', 0) or 0)
-                likes = int(content.get('likes', 0) or 0)
-                replies = int(content.get('replies', 0) or 0)
-
-                # Fórmula Twitter
-                score = (retweets / 10) + (likes / 50) + (replies / 5)
-                return min(10.0, score / 20) if score > 0 else 0.0
-
-            elif platform == 'tiktok':
-                views = int(content.get('view_count', 0) or 0)
-                likes = int(content.get('likes', 0) or 0)
-                shares = int(content.get('shares', 0) or 0)
-
-                # Fórmula TikTok
-                score = (views / 10000) + (likes / 500) + (shares / 100)
-                return min(10.0, score / 50) if score > 0 else 0.0
-
-            else:
-                # Score baseado em relevância para conteúdo web
-                relevance = content.get('relevance_score', 0) or 0
-                return float(relevance) * 10
-
-        except (ValueError, TypeError) as e: # More specific exception handling
-            logger.warning(f"⚠️ Erro ao calcular score viral para conteúdo {content.get('title', 'Sem título')}: {e}")
-            return 0.0
-        except Exception as e:
-            logger.warning(f"⚠️ Erro inesperado ao calcular score viral: {e}")
-            return 0.0
+        return viral_scoring_engine.score_content(content, platform)
 
     def _categorize_viral_content(self, content: Dict[str, Any], viral_score: float) -> str:
         """Categoriza conteúdo viral"""
@@ -317,15 +286,127 @@ class ViralContentAnalyzer:
     async def _capture_viral_screenshots(
         self,
         viral_content: List[Dict[str, Any]],
-        session_id: str
+        session_id: str,
+        force_refresh: bool = False
     ) -> List[Dict[str, Any]]:
-        """Captura screenshots do conteúdo viral"""
+        """
+        Captura screenshots do conteúdo viral
+
+        URLs já renderizadas em outra sessão (mesma URL canônica, viewport e formato,
+        dentro do TTL) vêm do cache de renderizações, sem abrir o navegador;
+        ``force_refresh`` ignora o cache e captura tudo de novo.
+        """
+
+        screenshots_dir = Path(f"analyses_data/files/{session_id}")
+        screenshots_dir.mkdir(parents=True, exist_ok=True)
+        viewport = (self.screenshot_config['width'], self.screenshot_config['height'])
+
+        captured = {}  # posição no conteúdo viral -> dados do screenshot
+        pending = []
+        cache_hits = 0
+        for i, content in enumerate(viral_content, 1):
+            url = content.get('url', '')
+            if not url or not url.startswith(('http://', 'https://')):
+                logger.warning(f"Skipping invalid URL: {url}")
+                continue
+
+            cached = None if force_refresh else render_cache.lookup(url, viewport, screenshot_encoder.image_format)
+            if not cached:
+                pending.append((i, content))
+                continue
+
+            metadata = cached['metadata']
+            page_title = metadata.get('title') or content.get('title', 'Sem título')
+            screenshot_path = screenshots_dir / self._screenshot_filename(content, i, page_title)
+            render_cache.materialize(cached, str(screenshot_path))
+            cache_hits += 1
+            captured[i] = await self._screenshot_record(
+                content, session_id, screenshots_dir, screenshot_path, page_title,
+                metadata.get('final_url', url), cached['size'], metadata.get('width'), metadata.get('height'),
+                cache_age=cached['age']
+            )
+            logger.info(f"♻️ Screenshot {i} reaproveitado do cache ({cached['age'] / 60:.0f} min): {url}")
+
+        if pending:
+            if HAS_SELENIUM:
+                captured.update(await self._render_screenshots(pending, len(viral_content), session_id, screenshots_dir, viewport))
+            else:
+                logger.warning(f"⚠️ Selenium não disponível para screenshots ({len(pending)} URLs sem cache)")
+
+        screenshots = [captured[i] for i in sorted(captured)]
+        logger.info(f"📸 {len(screenshots)} screenshots capturados com sucesso ({cache_hits} do cache)")
+        return screenshots
+
+    @staticmethod
+    def _screenshot_filename(content: Dict[str, Any], index: int, page_title: str) -> str:
+        platform = content.get('platform', 'web')
+        viral_score = content.get('viral_score', 0)
+        # Evita caracteres inválidos no nome do arquivo
+        safe_title = "".join(c if c.isalnum() else "_" for c in page_title[:50])
+        return f"viral_{platform}_{index:02d}_score{viral_score:.1f}_{safe_title}{screenshot_encoder.extension}"
+
+    async def _screenshot_record(
+        self,
+        content: Dict[str, Any],
+        session_id: str,
+        screenshots_dir: Path,
+        screenshot_path: Path,
+        page_title: str,
+        final_url: str,
+        file_size: int,
+        width: Optional[int],
+        height: Optional[int],
+        cache_age: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Dados do screenshot para o relatório, com miniatura e grupo perceptual"""
+        filename = screenshot_path.name
+        screenshot_data = {
+            'filename': filename,
+            'filepath': str(screenshot_path),
+            'relative_path': f"files/{session_id}/{filename}",
+            'url': content.get('url', ''),
+            'final_url': final_url,
+            'title': page_title,
+            'platform': content.get('platform', 'web'),
+            'viral_score': content.get('viral_score', 0),
+            'viral_category': content.get('viral_category', 'POPULAR'),
+            'content_metrics': {
+                'views': content.get('view_count', content.get('views', 0)),
+                'likes': content.get('like_count', content.get('likes', 0)),
+                'comments': content.get('comment_count', content.get('comments', 0)),
+                'shares': content.get('shares', 0),
+                'engagement_rate': content.get('engagement_rate', 0)
+            },
+            'file_size': file_size,
+            'width': width,
+            'height': height,
+            'captured_at': datetime.now().isoformat(),
+            'capture_success': True,
+            'from_cache': cache_age is not None,
+            'cache_age_seconds': cache_age
+        }
+
+        # Miniatura WebP e agrupamento perceptual (ex.: várias URLs caindo na mesma tela de login)
+        visual = await asyncio.get_running_loop().run_in_executor(
+            None, perceptual_image_index.ingest, str(screenshot_path), session_id, 'screenshot'
+        )
+        if visual:
+            screenshot_data['thumbnail_relative_path'] = f"files/{session_id}/{os.path.relpath(visual['thumbnail'], screenshots_dir)}".replace(os.sep, '/')
+            if visual['duplicate']:
+                screenshot_data['duplicate_of'] = os.path.basename(visual['representative'])
+        return screenshot_data
 
-        if not HAS_SELENIUM:
-            logger.warning("⚠️ Selenium não disponível para screenshots")
-            return []
+    async def _render_screenshots(
+        self,
+        pending: List[tuple],
+        total: int,
+        session_id: str,
+        screenshots_dir: Path,
+        viewport: tuple
+    ) -> Dict[int, Dict[str, Any]]:
+        """Renderiza no Chrome as URLs sem cache e guarda as capturas no cache de renderizações"""
 
-        screenshots = []
+        captured = {}
 
         try:
             # Configura Chrome headless
@@ -339,7 +420,7 @@ class ViralContentAnalyzer:
             chrome_options.add_argument("--remote-debugging-port=9222")
             chrome_options.add_argument("--disable-extensions")
             chrome_options.add_argument("--disable-plugins")
-            chrome_options.add_argument(f"--window-size={self.screenshot_config['width']},{self.screenshot_config['height']}")
+            chrome_options.add_argument(f"--window-size={viewport[0]},{viewport[1]}")
             chrome_options.add_argument("--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36")
 
             # Usa ChromeDriverManager
@@ -355,21 +436,13 @@ class ViralContentAnalyzer:
                     logger.info("✅ Chromedriver do sistema funcionou")
                 except WebDriverException as sys_driver_e:
                     logger.error(f"❌ Falha ao iniciar Chrome com chromedriver do sistema: {sys_driver_e}. Certifique-se de que o chromedriver esteja no PATH ou especificado.")
-                    return []
-
-            # Cria diretório para screenshots
-            screenshots_dir = Path(f"analyses_data/files/{session_id}")
-            screenshots_dir.mkdir(parents=True, exist_ok=True)
+                    return captured
 
             try:
-                for i, content in enumerate(viral_content, 1):
+                for i, content in pending:
+                    url = content.get('url', '')
                     try:
-                        url = content.get('url', '')
-                        if not url or not url.startswith(('http://', 'https://')):
-                            logger.warning(f"Skipping invalid URL: {url}")
-                            continue
-
-                        logger.info(f"📸 Capturando screenshot {i}/{len(viral_content)}: {content.get('title', 'Sem título')}")
+                        logger.info(f"📸 Capturando screenshot {i}/{total}: {content.get('title', 'Sem título')}")
 
                         # Acessa a URL
                         driver.get(url)
@@ -391,44 +464,23 @@ class ViralContentAnalyzer:
                         # Captura informações da página
                         page_title = driver.title or content.get('title', 'Sem título')
                         current_url = driver.current_url
+                        screenshot_path = screenshots_dir / self._screenshot_filename(content, i, page_title)
 
-                        # Define nome do arquivo
-                        platform = content.get('platform', 'web')
-                        viral_score = content.get('viral_score', 0)
-                        # Evita caracteres inválidos no nome do arquivo
-                        safe_title = "".join(c if c.isalnum() else "_" for c in page_title[:50])
-                        filename = f"viral_{platform}_{i:02d}_score{viral_score:.1f}_{safe_title}.png"
-                        screenshot_path = screenshots_dir / filename
-
-                        # Captura screenshot
-                        driver.save_screenshot(str(screenshot_path))
-
-                        # Verifica se foi criado com sucesso
-                        if screenshot_path.exists() and screenshot_path.stat().st_size > 0:
-                            screenshot_data = {
-                                'filename': filename,
-                                'filepath': str(screenshot_path),
-                                'relative_path': f"files/{session_id}/{filename}",
-                                'url': url,
-                                'final_url': current_url,
+                        # Captura em memória; codificação WebP/JPEG e validação no pool de workers
+                        encoded = await screenshot_encoder.encode_async(driver.get_screenshot_as_png(), screenshot_path)
+
+                        if encoded:
+                            render_cache.store(url, viewport, screenshot_encoder.image_format, str(screenshot_path), {
                                 'title': page_title,
-                                'platform': platform,
-                                'viral_score': viral_score,
-                                'viral_category': content.get('viral_category', 'POPULAR'),
-                                'content_metrics': {
-                                    'views': content.get('view_count', content.get('views', 0)),
-                                    'likes': content.get('like_count', content.get('likes', 0)),
-                                    'comments': content.get('comment_count', content.get('comments', 0)),
-                                    'shares': content.get('shares', 0),
-                                    'engagement_rate': content.get('engagement_rate', 0)
-                                },
-                                'file_size': screenshot_path.stat().st_size,
-                                'captured_at': datetime.now().isoformat(),
-                                'capture_success': True
-                            }
-
-                            screenshots.append(screenshot_data)
-                            logger.info(f"✅ Screenshot {i} capturado: {filename}")
+                                'final_url': current_url,
+                                'width': encoded['width'],
+                                'height': encoded['height']
+                            })
+                            captured[i] = await self._screenshot_record(
+                                content, session_id, screenshots_dir, screenshot_path, page_title,
+                                current_url, encoded['bytes'], encoded['width'], encoded['height']
+                            )
+                            logger.info(f"✅ Screenshot {i} capturado: {screenshot_path.name}")
                         else:
                             logger.warning(f"⚠️ Falha ao criar arquivo de screenshot {i}: {screenshot_path}")
 
@@ -446,10 +498,8 @@ class ViralContentAnalyzer:
 
         except Exception as e:
             logger.warning(f"⚠️ Falha geral na captura de screenshots: {e}", exc_info=True)
-            return [] # Retorna lista vazia em caso de erro grave
 
-        logger.info(f"📸 {len(screenshots)} screenshots capturados com sucesso")
-        return screenshots
+        return captured
 
     def _calculate_viral_metrics(self, viral_content: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Calcula métricas gerais de viralidade"""
@@ -621,8 +671,13 @@ class ViralContentAnalyzer:
         if screenshots:
             report += "---\n\n## EVIDÊNCIAS VISUAIS CAPTURADAS\n\n"
 
-            for i, screenshot in enumerate(screenshots, 1):
-                report += f"### Screenshot {i}: {screenshot.get('title', 'Sem título')}\n\n**Plataforma:** {screenshot.get('platform', 'N/A').title()}  \n**Score Viral:** {screenshot.get('viral_score', 0):.2f}/10  \n**URL Original:** {screenshot.get('url', 'N/A')}  \n![Screenshot {i}]({screenshot.get('relative_path', '')})  \n\n"
+            # Screenshots visualmente idênticos a outro já listado não se repetem no relatório
+            unique_screenshots = [screenshot for screenshot in screenshots if not screenshot.get('duplicate_of')]
+            for i, screenshot in enumerate(unique_screenshots, 1):
+                image = screenshot.get('relative_path', '')
+                thumbnail = screenshot.get('thumbnail_relative_path')
+                image_markdown = f"[![Screenshot {i}]({thumbnail})]({image})" if thumbnail else f"![Screenshot {i}]({image})"
+                report += f"### Screenshot {i}: {screenshot.get('title', 'Sem título')}\n\n**Plataforma:** {screenshot.get('platform', 'N/A').title()}  \n**Score Viral:** {screenshot.get('viral_score', 0):.2f}/10  \n**URL Original:** {screenshot.get('url', 'N/A')}  \n{image_markdown}  \n\n"
 
                 # Métricas do conteúdo
                 metrics = screenshot.get('content_metrics', {})
@@ -25,6 +25,10 @@ import io
 import time
 import logging
 from pathlib import Path
+
+from services.perceptual_image_index import perceptual_image_index
+from services.viral_scoring_engine import viral_scoring_engine
+
 try:
     from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
@@ -124,6 +128,11 @@ class ViralImageExtractor:
             additional_images = await self.extract_additional_viral_content(query, session_id)
             all_images.extend(additional_images)
 
+        # Cópias visualmente idênticas (outra resolução/compressão) ficam só na de maior resolução
+        local_paths = [img.local_path for img in all_images if img.local_path]
+        unique_paths = set(perceptual_image_index.dedupe(local_paths, session_id))
+        all_images = [img for img in all_images if not img.local_path or img.local_path in unique_paths]
+
         # Ordena por score de viralidade
         all_images.sort(key=lambda x: x.virality_score, reverse=True)
 
@@ -239,7 +248,7 @@ class ViralImageExtractor:
 
                     local_path = await self._download_image(thumbnail_url, "youtube", session_id, video_id)
                     if local_path:
-                        image_info = self._get_image_info(local_path)
+                        image_info = await asyncio.get_running_loop().run_in_executor(None, self._get_image_info, local_path)
                         viral_image = ViralImage(
                             platform="YouTube",
                             source_url=f"https://www.youtube.com/watch?v={video_id}",
@@ -355,7 +364,7 @@ class ViralImageExtractor:
                 local_path = await self._download_image(img_url, 'instagram', session_id, index)
                 if local_path:
                     # Obtém informações da imagem
-                    image_info = self._get_image_info(local_path)
+                    image_info = await asyncio.get_running_loop().run_in_executor(None, self._get_image_info, local_path)
                     viral_image = ViralImage(
                         platform="Instagram",
                         source_url=post_url,
@@ -433,7 +442,7 @@ class ViralImageExtractor:
                     # Download da imagem
                     local_path = await self._download_image(img_url, 'facebook', session_id, i)
                     if local_path:
-                        image_info = self._get_image_info(local_path)
+                        image_info = await asyncio.get_running_loop().run_in_executor(None, self._get_image_info, local_path)
                         viral_image = ViralImage(
                             platform="Facebook",
                             source_url=page_url,
@@ -522,7 +531,7 @@ class ViralImageExtractor:
                     # Download da imagem
                     local_path = await self._download_image(img_url, category, session_id, i)
                     if local_path:
-                        image_info = self._get_image_info(local_path)
+                        image_info = await asyncio.get_running_loop().run_in_executor(None, self._get_image_info, local_path)
                         # Simula métricas baseadas no tipo de conteúdo
                         engagement_metrics = self._generate_realistic_metrics(category, i)
                         viral_image = ViralImage(
@@ -572,31 +581,39 @@ class ViralImageExtractor:
                 timestamp = int(time.time())
                 filename = f"{platform}_viral_{index}_{timestamp}.{ext}"
                 local_path = os.path.join(self.images_dir, platform, filename)
-                # Salva imagem
-                with open(local_path, 'wb') as f:
-                    f.write(response.content)
-                # Valida se é uma imagem válida
-                try:
-                    with Image.open(local_path) as img:
-                        # Verifica se tem tamanho mínimo
-                        if img.size[0] >= 200 and img.size[1] >= 200:
-                            logger.info(f"✅ Imagem salva: {filename} ({img.size[0]}x{img.size[1]})")
-                            return local_path
-                        else:
-                            os.remove(local_path)  # Remove imagem muito pequena
-                            logger.warning(f"⚠️ Imagem muito pequena removida: {img.size}")
-                            return None
-                except Exception as img_error:
-                    if os.path.exists(local_path):
-                        os.remove(local_path)  # Remove arquivo inválido
-                    logger.warning(f"⚠️ Arquivo de imagem inválido: {img_error}")
-                    return None
+                # Gravação e validação fora do loop de eventos
+                return await asyncio.get_running_loop().run_in_executor(
+                    None, self._save_validated_image, response.content, local_path
+                )
             else:
                 logger.warning(f"⚠️ Resposta inválida: status={response.status_code}, size={len(response.content) if response.content else 0}")
         except Exception as e:
             logger.warning(f"⚠️ Erro ao baixar imagem de {img_url}: {e}")
         return None
 
+    def _save_validated_image(self, content: bytes, local_path: str) -> Optional[str]:
+        """
+        Salva a imagem e a mantém apenas se for válida e tiver pelo menos 200x200
+        """
+        filename = os.path.basename(local_path)
+        with open(local_path, 'wb') as f:
+            f.write(content)
+        try:
+            with Image.open(local_path) as img:
+                # Verifica se tem tamanho mínimo
+                if img.size[0] >= 200 and img.size[1] >= 200:
+                    logger.info(f"✅ Imagem salva: {filename} ({img.size[0]}x{img.size[1]})")
+                    return local_path
+                else:
+                    os.remove(local_path)  # Remove imagem muito pequena
+                    logger.warning(f"⚠️ Imagem muito pequena removida: {img.size}")
+                    return None
+        except Exception as img_error:
+            if os.path.exists(local_path):
+                os.remove(local_path)  # Remove arquivo inválido
+            logger.warning(f"⚠️ Arquivo de imagem inválido: {img_error}")
+            return None
+
     def _get_image_info(self, image_path: str) -> Dict:
         """
         Obtém informações de uma imagem
@@ -736,26 +753,7 @@ class ViralImageExtractor:
         Calcula score de viralidade para uma imagem
         """
         try:
-            # Pesos diferentes por plataforma
-            weights = {
-                'instagram': {'likes': 0.3, 'comments': 0.4, 'shares': 0.3},
-                'facebook': {'likes': 0.25, 'comments': 0.35, 'shares': 0.4},
-                'youtube': {'views': 0.4, 'likes': 0.3, 'comments': 0.3},
-                'news': {'views': 0.6, 'shares': 0.4},
-                'commercial': {'views': 0.5, 'likes': 0.3, 'shares': 0.2}
-            }
-            platform_weights = weights.get(platform, weights['instagram'])
-            score = 0.0
-            total_weight = 0.0
-            for metric, weight in platform_weights.items():
-                if metric in metrics:
-                    # Normaliza métricas (log scale para evitar números muito grandes)
-                    normalized_value = min(100, (metrics[metric] / 100) ** 0.5) if metrics[metric] > 0 else 0
-                    score += normalized_value * weight
-                    total_weight += weight
-            if total_weight > 0:
-                score = score / total_weight
-            return min(100.0, max(0.0, score))
+            return viral_scoring_engine.score_image(metrics, platform)
         except Exception as e:
             logger.warning(f"⚠️ Erro ao calcular score de viralidade: {e}")
             return 50.0  # Score padrão
@@ -800,7 +798,7 @@ class ViralImageExtractor:
                         img_url = item['urls']['regular']
                         local_path = await self._download_image(img_url, 'instagram', session_id, i)
                         if local_path:
-                            image_info = self._get_image_info(local_path)
+                            image_info = await asyncio.get_running_loop().run_in_executor(None, self._get_image_info, local_path)
                             viral_image = ViralImage(
                                 platform="Instagram",
                                 source_url=f"https://unsplash.com/photos/{item['id']}",
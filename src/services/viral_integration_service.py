@@ -11,10 +11,12 @@ import time
 import asyncio
 import logging
 import ssl
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 from urllib.parse import urlparse, parse_qs, unquote, urljoin
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 import hashlib
 
 # Import condicional do Google Generative AI
@@ -59,6 +61,11 @@ except ImportError:
 from dotenv import load_dotenv
 load_dotenv()
 
+from services.image_store import image_store
+from services.perceptual_image_index import perceptual_image_index
+from services.screenshot_encoder import screenshot_encoder
+from services.viral_scoring_engine import viral_scoring_engine
+
 # Configuração de logging
 logger = logging.getLogger(__name__)
 
@@ -82,6 +89,40 @@ class ViralImage:
     image_path: Optional[str] = None
     screenshot_path: Optional[str] = None
     extracted_at: str = datetime.now().isoformat()
+    thumbnail_path: Optional[str] = None
+    duplicate_posts: List[str] = field(default_factory=list)  # posts com a mesma imagem (visualmente)
+
+class ProviderRateLimiter:
+    """
+    Limita chamadas simultâneas a um provedor e espaça o início de cada uma
+
+    O estado fica sob um threading.Lock, então o limite vale para todas as threads do
+    fluxo (cada uma roda seu próprio loop de eventos) e para qualquer loop que o use.
+    """
+    def __init__(self, max_concurrent: int, min_interval: float, poll_interval: float = 0.05):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._active = 0
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._active < self.max_concurrent and now >= self._next_start:
+                    self._active += 1
+                    self._next_start = now + self.min_interval
+                    return self
+                wait = self._next_start - now if self._active < self.max_concurrent else self.poll_interval
+            # Cancelado aqui, nenhuma vaga foi reservada
+            await asyncio.sleep(min(max(wait, 0.0), self.poll_interval))
+
+    async def __aexit__(self, exc_type, exc, tb):
+        with self._lock:
+            self._active -= 1
+        return False
 
 class ViralImageFinder:
     """Classe principal para encontrar imagens virais"""
@@ -99,6 +140,19 @@ class ViralImageFinder:
         self.failed_apis = set()  # APIs que falharam recentemente
         self.instagram_session_cookie = self.config.get('instagram_session_cookie')
         self.playwright_enabled = self.config.get('playwright_enabled', True) and PLAYWRIGHT_AVAILABLE
+        # Limites por provedor: (chamadas simultâneas, intervalo mínimo entre inícios em segundos)
+        self.provider_rate_limits = {
+            'serper': (int(os.getenv('SERPER_MAX_CONCURRENT', 4)), float(os.getenv('SERPER_MIN_INTERVAL', 0.2))),
+            'google_cse': (2, 0.5),
+            'rapidapi': (1, 1.0)
+        }
+        self._rate_limiters = {}
+        self._rate_limiters_lock = threading.Lock()
+        # Engajamento em camadas: cache por URL do post e estatísticas de cada camada por plataforma
+        self.engagement_cache_ttl = float(os.getenv('ENGAGEMENT_CACHE_TTL', 6 * 3600))
+        self.engagement_cache_max = 2000
+        self._engagement_cache = OrderedDict()  # URL do post -> (expira em, dados)
+        self.engagement_tier_stats = {}  # plataforma -> camada -> contadores
         # Configurar diretórios necessários
         self._ensure_directories()
         # Configurar sessão HTTP síncrona para fallbacks
@@ -234,9 +288,38 @@ class ViralImageFinder:
                 'Upgrade-Insecure-Requests': '1',
             })
 
+    def _rate_limiter(self, provider: str) -> ProviderRateLimiter:
+        """Limitador do provedor, compartilhado por todas as sessões (as cotas são das chaves de API)"""
+        with self._rate_limiters_lock:
+            limiter = self._rate_limiters.get(provider)
+            if limiter is None:
+                max_concurrent, min_interval = self.provider_rate_limits.get(provider, (2, 0.5))
+                limiter = self._rate_limiters[provider] = ProviderRateLimiter(max_concurrent, min_interval)
+            return limiter
+
     async def search_images(self, query: str) -> List[Dict]:
-        """Busca imagens usando múltiplos provedores com estratégia aprimorada"""
+        """
+        Busca imagens usando múltiplos provedores com estratégia aprimorada
+
+        Todas as variações de consulta e provedores rodam em paralelo, sob os limites de
+        cada provedor; os resultados são deduplicados à medida que chegam e a busca para
+        assim que houver ``max_images`` posts válidos.
+        """
         all_results = []
+        unique_results = []
+        seen_urls = set()
+        max_images = self.config['max_images']
+        has_serper = bool(self.config.get('serper_api_key'))
+        has_google_cse = bool(self.config.get('google_search_key') and self.config.get('google_cse_id'))
+
+        def add_results(results: List[Dict]):
+            all_results.extend(results)
+            for result in results:
+                post_url = result.get('page_url', '').strip()
+                if post_url and post_url not in seen_urls and self._is_valid_social_url(post_url):
+                    seen_urls.add(post_url)
+                    unique_results.append(result)
+
         # Queries mais específicas e eficazes para conteúdo educacional
         queries = [
             # Instagram queries - mais variadas
@@ -264,62 +347,53 @@ class ViralImageFinder:
             f'"{query}" tutorial gratis',
             f'"{query}" masterclass'
         ]
-        for q in queries[:8]:  # Aumentar para mais resultados
-            logger.info(f"🔍 Buscando: {q}")
-            results = []
-            # Tentar Serper primeiro (mais confiável)
-            if self.config.get('serper_api_key'):
-                try:
-                    serper_results = await self._search_serper_advanced(q)
-                    results.extend(serper_results)
-                    logger.info(f"📊 Serper encontrou {len(serper_results)} resultados para: {q}")
-                except Exception as e:
-                    logger.error(f"❌ Erro na busca Serper para '{q}': {e}")
-            # Google CSE como backup
-            if len(results) < 3 and self.config.get('google_search_key') and self.config.get('google_cse_id'):
-                try:
-                    google_results = await self._search_google_cse_advanced(q)
-                    results.extend(google_results)
-                    logger.info(f"📊 Google CSE encontrou {len(google_results)} resultados para: {q}")
-                except Exception as e:
-                    logger.error(f"❌ Erro na busca Google CSE para '{q}': {e}")
-            all_results.extend(results)
-            # Rate limiting
-            await asyncio.sleep(0.5)
+        pending = {}
+
+        def schedule(provider: str, coro, variant: str = None):
+            pending[asyncio.create_task(coro)] = (provider, variant)
+
+        for q in queries[:8]:
+            # Serper primeiro (mais confiável); Google CSE entra como backup por variação
+            if has_serper:
+                schedule('serper', self._search_serper_advanced(q), q)
+            elif has_google_cse:
+                schedule('google_cse', self._search_google_cse_advanced(q), q)
         # RapidAPI Instagram como fonte adicional
         if self.config.get('rapidapi_key'):
-            try:
-                rapid_results = await self._search_rapidapi_instagram(query)
-                all_results.extend(rapid_results)
-                logger.info(f"📊 RapidAPI encontrou {len(rapid_results)} posts do Instagram")
-            except Exception as e:
-                logger.error(f"❌ Erro na busca RapidAPI: {e}")
-        
-        # YouTube thumbnails como fonte adicional
-        try:
-            youtube_results = await self._search_youtube_thumbnails(query)
-            all_results.extend(youtube_results)
-            logger.info(f"📺 YouTube thumbnails: {len(youtube_results)} encontrados")
-        except Exception as e:
-            logger.error(f"❌ Erro na busca YouTube: {e}")
-        
-        # Busca adicional específica para Facebook
-        try:
-            facebook_results = await self._search_facebook_specific(query)
-            all_results.extend(facebook_results)
-            logger.info(f"📘 Facebook específico: {len(facebook_results)} encontrados")
-        except Exception as e:
-            logger.error(f"❌ Erro na busca Facebook específica: {e}")
-        
-        # Busca adicional com estratégias alternativas se poucos resultados
-        if len(all_results) < 15:
-            try:
-                alternative_results = await self._search_alternative_strategies(query)
-                all_results.extend(alternative_results)
-                logger.info(f"🔄 Estratégias alternativas: {len(alternative_results)} encontrados")
-            except Exception as e:
-                logger.error(f"❌ Erro nas estratégias alternativas: {e}")
-        
+            schedule('rapidapi', self._search_rapidapi_instagram(query))
+        # YouTube thumbnails e busca específica para Facebook como fontes adicionais
+        schedule('youtube', self._search_youtube_thumbnails(query))
+        schedule('facebook', self._search_facebook_specific(query))
+
+        alternatives_scheduled = False
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                provider, variant = pending.pop(task)
+                try:
+                    results = task.result()
+                except Exception as e:
+                    logger.error(f"❌ Erro na busca {provider}{f' para {variant!r}' if variant else ''}: {e}")
+                    results = []
+                logger.info(f"📊 {provider} encontrou {len(results)} resultados{f' para: {variant}' if variant else ''}")
+                add_results(results)
+                # Google CSE como backup quando o Serper trouxe pouco para a variação
+                if provider == 'serper' and len(results) < 3 and has_google_cse:
+                    schedule('google_cse', self._search_google_cse_advanced(variant), variant)
+
+            if len(unique_results) >= max_images:
+                logger.info(f"⏹️ {len(unique_results)} posts válidos já encontrados: cancelando {len(pending)} buscas restantes")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                pending.clear()
+                break
+
+            # Busca adicional com estratégias alternativas se poucos resultados
+            if not pending and not alternatives_scheduled and len(all_results) < 15:
+                alternatives_scheduled = True
+                schedule('alternative', self._search_alternative_strategies(query))
+
         # EXTRAÇÃO DIRETA DE POSTS ESPECÍFICOS
         # Procurar por URLs específicas nos resultados e extrair imagens diretamente
         direct_extraction_results = []
@@ -362,16 +436,8 @@ class ViralImageFinder:
                 logger.warning(f"Erro extração direta LinkedIn {li_url}: {e}")
         
         # Adicionar resultados de extração direta
-        all_results.extend(direct_extraction_results)
+        add_results(direct_extraction_results)
         logger.info(f"🎯 Extração direta: {len(direct_extraction_results)} imagens reais extraídas")
-        # Remover duplicatas e filtrar URLs válidos
-        seen_urls = set()
-        unique_results = []
-        for result in all_results:
-            post_url = result.get('page_url', '').strip()
-            if post_url and post_url not in seen_urls and self._is_valid_social_url(post_url):
-                seen_urls.add(post_url)
-                unique_results.append(result)
         logger.info(f"🎯 Encontrados {len(unique_results)} posts únicos e válidos")
         return unique_results
 
@@ -471,16 +537,17 @@ class ViralImageFinder:
             success = False
             for retry in range(len(self.api_keys['serper'])):
                 try:
-                    if HAS_ASYNC_DEPS:
-                        timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
-                        async with aiohttp.ClientSession(timeout=timeout) as session:
-                            async with session.post(url, headers=headers, json=payload) as response:
-                                response.raise_for_status()
-                                data = await response.json()
-                    else:
-                        response = self.session.post(url, headers=headers, json=payload, timeout=self.config['timeout'])
-                        response.raise_for_status()
-                        data = response.json()
+                    async with self._rate_limiter('serper'):
+                        if HAS_ASYNC_DEPS:
+                            timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
+                            async with aiohttp.ClientSession(timeout=timeout) as session:
+                                async with session.post(url, headers=headers, json=payload) as response:
+                                    response.raise_for_status()
+                                    data = await response.json()
+                        else:
+                            response = self.session.post(url, headers=headers, json=payload, timeout=self.config['timeout'])
+                            response.raise_for_status()
+                            data = response.json()
 
                     if search_type == 'images':
                         for item in data.get('images', []):
@@ -546,9 +613,6 @@ class ViralImageFinder:
             # else:
             #     logger.info(f"✅ Requisição Serper bem-sucedida para {query}") # Opcional
 
-            # Rate limiting entre tipos de busca (images/search)
-            await asyncio.sleep(0.3)
-
         return results # Retornar os resultados acumulados
 
     async def _search_google_cse_advanced(self, query: str) -> List[Dict]:
@@ -570,16 +634,17 @@ class ViralImageFinder:
             'hl': 'pt'
         }
         try:
-            if HAS_ASYNC_DEPS:
-                timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.get(url, params=params) as response:
-                        response.raise_for_status()
-                        data = await response.json()
-            else:
-                response = self.session.get(url, params=params, timeout=self.config['timeout'])
-                response.raise_for_status()
-                data = response.json()
+            async with self._rate_limiter('google_cse'):
+                if HAS_ASYNC_DEPS:
+                    timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
+                    async with aiohttp.ClientSession(timeout=timeout) as session:
+                        async with session.get(url, params=params) as response:
+                            response.raise_for_status()
+                            data = await response.json()
+                else:
+                    response = self.session.get(url, params=params, timeout=self.config['timeout'])
+                    response.raise_for_status()
+                    data = response.json()
             results = []
             for item in data.get('items', []):
                 results.append({
@@ -616,37 +681,38 @@ class ViralImageFinder:
                 "X-RapidAPI-Host": "instagram-scraper-api2.p.rapidapi.com"
             }
             try:
-                if HAS_ASYNC_DEPS:
-                    timeout = aiohttp.ClientTimeout(total=30)
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
-                        async with session.get(url, headers=headers, params=params) as response:
-                            if response.status == 200:
-                                data = await response.json()
-                                results = []
-                                # Ajuste na estrutura de dados do RapidAPI
-                                for item in data.get('data', {}).get('recent', {}).get('sections', []):
-                                    for media in item.get('layout_content', {}).get('medias', []):
-                                        media_info = media.get('media', {})
-                                        if media_info:
-                                            results.append({
-                                                'image_url': media_info.get('image_versions2', {}).get('candidates', [{}])[0].get('url', ''),
-                                                'page_url': f"https://www.instagram.com/p/{media_info.get('code', '')}/",
-                                                'title': f"Post do Instagram por @{media_info.get('user', {}).get('username', 'unknown')}",
-                                                'description': media_info.get('caption', {}).get('text', '')[:200],
-                                                'source': 'rapidapi_instagram'
-                                            })
-                                logger.info(f"✅ RapidAPI sucesso: {len(results)} resultados")
-                                return results
-                            else:
-                                raise Exception(f"Status {response.status}")
-                else:
-                    response = self.session.get(url, headers=headers, params=params, timeout=30)
-                    if response.status_code == 200:
-                        data = response.json()
-                        # Similar parsing logic
-                        return []
+                async with self._rate_limiter('rapidapi'):
+                    if HAS_ASYNC_DEPS:
+                        timeout = aiohttp.ClientTimeout(total=30)
+                        async with aiohttp.ClientSession(timeout=timeout) as session:
+                            async with session.get(url, headers=headers, params=params) as response:
+                                if response.status == 200:
+                                    data = await response.json()
+                                    results = []
+                                    # Ajuste na estrutura de dados do RapidAPI
+                                    for item in data.get('data', {}).get('recent', {}).get('sections', []):
+                                        for media in item.get('layout_content', {}).get('medias', []):
+                                            media_info = media.get('media', {})
+                                            if media_info:
+                                                results.append({
+                                                    'image_url': media_info.get('image_versions2', {}).get('candidates', [{}])[0].get('url', ''),
+                                                    'page_url': f"https://www.instagram.com/p/{media_info.get('code', '')}/",
+                                                    'title': f"Post do Instagram por @{media_info.get('user', {}).get('username', 'unknown')}",
+                                                    'description': media_info.get('caption', {}).get('text', '')[:200],
+                                                    'source': 'rapidapi_instagram'
+                                                })
+                                    logger.info(f"✅ RapidAPI sucesso: {len(results)} resultados")
+                                    return results
+                                else:
+                                    raise Exception(f"Status {response.status}")
                     else:
-                        raise Exception(f"Status {response.status_code}")
+                        response = self.session.get(url, headers=headers, params=params, timeout=30)
+                        if response.status_code == 200:
+                            data = response.json()
+                            # Similar parsing logic
+                            return []
+                        else:
+                            raise Exception(f"Status {response.status_code}")
             except Exception as e:
                 current_index = (self.current_api_index['rapidapi'] - 1) % len(self.api_keys['rapidapi'])
                 self._mark_api_failed('rapidapi', current_index)
@@ -685,66 +751,65 @@ class ViralImageFinder:
                             'Content-Type': 'application/json'
                         }
                         
-                        if HAS_ASYNC_DEPS:
-                            timeout = aiohttp.ClientTimeout(total=30)
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
-                                async with session.post(url, json=payload, headers=headers) as response:
-                                    if response.status == 200:
-                                        data = await response.json()
-                                        # Processar resultados do YouTube
-                                        for item in data.get('organic', []):
-                                            link = item.get('link', '')
-                                            if 'youtube.com/watch' in link:
-                                                # Extrair video ID e gerar thumbnail
-                                                video_id = self._extract_youtube_id(link)
-                                                if video_id:
-                                                    # Múltiplas qualidades de thumbnail
-                                                    thumbnail_configs = [
-                                                        ('maxresdefault.jpg', 'alta'),
-                                                        ('hqdefault.jpg', 'média-alta'),
-                                                        ('mqdefault.jpg', 'média'),
-                                                        ('sddefault.jpg', 'padrão'),
-                                                        ('default.jpg', 'baixa')
-                                                    ]
-                                                    for thumb_file, quality in thumbnail_configs:
-                                                        thumb_url = f"https://img.youtube.com/vi/{video_id}/{thumb_file}"
-                                                        results.append({
-                                                            'image_url': thumb_url,
-                                                            'page_url': link,
-                                                            'title': f"{item.get('title', f'Vídeo YouTube: {query}')} ({quality})",
-                                                            'description': item.get('snippet', '')[:200],
-                                                            'source': f'youtube_thumbnail_{quality}'
-                                                        })
-                        else:
-                            response = self.session.post(url, json=payload, headers=headers, timeout=30)
-                            if response.status_code == 200:
-                                data = response.json()
-                                # Similar processing for sync version
-                                for item in data.get('organic', []):
-                                    link = item.get('link', '')
-                                    if 'youtube.com/watch' in link:
-                                        video_id = self._extract_youtube_id(link)
-                                        if video_id:
-                                            # Múltiplas qualidades de thumbnail
-                                            thumbnail_configs = [
-                                                ('maxresdefault.jpg', 'alta'),
-                                                ('hqdefault.jpg', 'média-alta'),
-                                                ('mqdefault.jpg', 'média')
-                                            ]
-                                            for thumb_file, quality in thumbnail_configs:
-                                                thumb_url = f"https://img.youtube.com/vi/{video_id}/{thumb_file}"
-                                                results.append({
-                                                    'image_url': thumb_url,
-                                                    'page_url': link,
-                                                    'title': f"{item.get('title', f'Vídeo YouTube: {query}')} ({quality})",
-                                                    'description': item.get('snippet', '')[:200],
-                                                    'source': f'youtube_thumbnail_{quality}'
-                                                })
+                        async with self._rate_limiter('serper'):
+                            if HAS_ASYNC_DEPS:
+                                timeout = aiohttp.ClientTimeout(total=30)
+                                async with aiohttp.ClientSession(timeout=timeout) as session:
+                                    async with session.post(url, json=payload, headers=headers) as response:
+                                        if response.status == 200:
+                                            data = await response.json()
+                                            # Processar resultados do YouTube
+                                            for item in data.get('organic', []):
+                                                link = item.get('link', '')
+                                                if 'youtube.com/watch' in link:
+                                                    # Extrair video ID e gerar thumbnail
+                                                    video_id = self._extract_youtube_id(link)
+                                                    if video_id:
+                                                        # Múltiplas qualidades de thumbnail
+                                                        thumbnail_configs = [
+                                                            ('maxresdefault.jpg', 'alta'),
+                                                            ('hqdefault.jpg', 'média-alta'),
+                                                            ('mqdefault.jpg', 'média'),
+                                                            ('sddefault.jpg', 'padrão'),
+                                                            ('default.jpg', 'baixa')
+                                                        ]
+                                                        for thumb_file, quality in thumbnail_configs:
+                                                            thumb_url = f"https://img.youtube.com/vi/{video_id}/{thumb_file}"
+                                                            results.append({
+                                                                'image_url': thumb_url,
+                                                                'page_url': link,
+                                                                'title': f"{item.get('title', f'Vídeo YouTube: {query}')} ({quality})",
+                                                                'description': item.get('snippet', '')[:200],
+                                                                'source': f'youtube_thumbnail_{quality}'
+                                                            })
+                            else:
+                                response = self.session.post(url, json=payload, headers=headers, timeout=30)
+                                if response.status_code == 200:
+                                    data = response.json()
+                                    # Similar processing for sync version
+                                    for item in data.get('organic', []):
+                                        link = item.get('link', '')
+                                        if 'youtube.com/watch' in link:
+                                            video_id = self._extract_youtube_id(link)
+                                            if video_id:
+                                                # Múltiplas qualidades de thumbnail
+                                                thumbnail_configs = [
+                                                    ('maxresdefault.jpg', 'alta'),
+                                                    ('hqdefault.jpg', 'média-alta'),
+                                                    ('mqdefault.jpg', 'média')
+                                                ]
+                                                for thumb_file, quality in thumbnail_configs:
+                                                    thumb_url = f"https://img.youtube.com/vi/{video_id}/{thumb_file}"
+                                                    results.append({
+                                                        'image_url': thumb_url,
+                                                        'page_url': link,
+                                                        'title': f"{item.get('title', f'Vídeo YouTube: {query}')} ({quality})",
+                                                        'description': item.get('snippet', '')[:200],
+                                                        'source': f'youtube_thumbnail_{quality}'
+                                                    })
             except Exception as e:
                 logger.warning(f"Erro na busca YouTube: {e}")
                 continue
-            
-            await asyncio.sleep(0.3)  # Rate limiting
         
         logger.info(f"📺 YouTube encontrou {len(results)} thumbnails")
         return results
@@ -797,44 +862,43 @@ class ViralImageFinder:
                             'Content-Type': 'application/json'
                         }
                         
-                        if HAS_ASYNC_DEPS:
-                            timeout = aiohttp.ClientTimeout(total=30)
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
-                                async with session.post(url, json=payload, headers=headers) as response:
-                                    if response.status == 200:
-                                        data = await response.json()
-                                        # Processar resultados de imagens do Facebook
-                                        for item in data.get('images', []):
-                                            image_url = item.get('imageUrl', '')
-                                            page_url = item.get('link', '')
-                                            if image_url and ('facebook.com' in page_url or 'fbcdn.net' in image_url):
-                                                results.append({
-                                                    'image_url': image_url,
-                                                    'page_url': page_url,
-                                                    'title': item.get('title', f'Post Facebook: {query}'),
-                                                    'description': item.get('snippet', '')[:200],
-                                                    'source': 'facebook_image'
-                                                })
-                        else:
-                            response = self.session.post(url, json=payload, headers=headers, timeout=30)
-                            if response.status_code == 200:
-                                data = response.json()
-                                for item in data.get('images', []):
-                                    image_url = item.get('imageUrl', '')
-                                    page_url = item.get('link', '')
-                                    if image_url and ('facebook.com' in page_url or 'fbcdn.net' in image_url):
-                                        results.append({
-                                            'image_url': image_url,
-                                            'page_url': page_url,
-                                            'title': item.get('title', f'Post Facebook: {query}'),
-                                            'description': item.get('snippet', '')[:200],
-                                            'source': 'facebook_image'
-                                        })
+                        async with self._rate_limiter('serper'):
+                            if HAS_ASYNC_DEPS:
+                                timeout = aiohttp.ClientTimeout(total=30)
+                                async with aiohttp.ClientSession(timeout=timeout) as session:
+                                    async with session.post(url, json=payload, headers=headers) as response:
+                                        if response.status == 200:
+                                            data = await response.json()
+                                            # Processar resultados de imagens do Facebook
+                                            for item in data.get('images', []):
+                                                image_url = item.get('imageUrl', '')
+                                                page_url = item.get('link', '')
+                                                if image_url and ('facebook.com' in page_url or 'fbcdn.net' in image_url):
+                                                    results.append({
+                                                        'image_url': image_url,
+                                                        'page_url': page_url,
+                                                        'title': item.get('title', f'Post Facebook: {query}'),
+                                                        'description': item.get('snippet', '')[:200],
+                                                        'source': 'facebook_image'
+                                                    })
+                            else:
+                                response = self.session.post(url, json=payload, headers=headers, timeout=30)
+                                if response.status_code == 200:
+                                    data = response.json()
+                                    for item in data.get('images', []):
+                                        image_url = item.get('imageUrl', '')
+                                        page_url = item.get('link', '')
+                                        if image_url and ('facebook.com' in page_url or 'fbcdn.net' in image_url):
+                                            results.append({
+                                                'image_url': image_url,
+                                                'page_url': page_url,
+                                                'title': item.get('title', f'Post Facebook: {query}'),
+                                                'description': item.get('snippet', '')[:200],
+                                                'source': 'facebook_image'
+                                            })
             except Exception as e:
                 logger.warning(f"Erro na busca Facebook específica: {e}")
                 continue
-            
-            await asyncio.sleep(0.3)  # Rate limiting
         
         logger.info(f"📘 Facebook específico encontrou {len(results)} imagens")
         return results
@@ -883,43 +947,42 @@ class ViralImageFinder:
                             'Content-Type': 'application/json'
                         }
                         
-                        if HAS_ASYNC_DEPS:
-                            timeout = aiohttp.ClientTimeout(total=30)
-                            async with aiohttp.ClientSession(timeout=timeout) as session:
-                                async with session.post(url, json=payload, headers=headers) as response:
-                                    if response.status == 200:
-                                        data = await response.json()
-                                        for item in data.get('images', []):
-                                            image_url = item.get('imageUrl', '')
-                                            page_url = item.get('link', '')
-                                            if image_url and self._is_valid_image_url(image_url):
-                                                results.append({
-                                                    'image_url': image_url,
-                                                    'page_url': page_url,
-                                                    'title': item.get('title', f'Conteúdo: {query}'),
-                                                    'description': item.get('snippet', '')[:200],
-                                                    'source': 'alternative_search'
-                                                })
-                        else:
-                            response = self.session.post(url, json=payload, headers=headers, timeout=30)
-                            if response.status_code == 200:
-                                data = response.json()
-                                for item in data.get('images', []):
-                                    image_url = item.get('imageUrl', '')
-                                    page_url = item.get('link', '')
-                                    if image_url and self._is_valid_image_url(image_url):
-                                        results.append({
-                                            'image_url': image_url,
-                                            'page_url': page_url,
-                                            'title': item.get('title', f'Conteúdo: {query}'),
-                                            'description': item.get('snippet', '')[:200],
-                                            'source': 'alternative_search'
-                                        })
+                        async with self._rate_limiter('serper'):
+                            if HAS_ASYNC_DEPS:
+                                timeout = aiohttp.ClientTimeout(total=30)
+                                async with aiohttp.ClientSession(timeout=timeout) as session:
+                                    async with session.post(url, json=payload, headers=headers) as response:
+                                        if response.status == 200:
+                                            data = await response.json()
+                                            for item in data.get('images', []):
+                                                image_url = item.get('imageUrl', '')
+                                                page_url = item.get('link', '')
+                                                if image_url and self._is_valid_image_url(image_url):
+                                                    results.append({
+                                                        'image_url': image_url,
+                                                        'page_url': page_url,
+                                                        'title': item.get('title', f'Conteúdo: {query}'),
+                                                        'description': item.get('snippet', '')[:200],
+                                                        'source': 'alternative_search'
+                                                    })
+                            else:
+                                response = self.session.post(url, json=payload, headers=headers, timeout=30)
+                                if response.status_code == 200:
+                                    data = response.json()
+                                    for item in data.get('images', []):
+                                        image_url = item.get('imageUrl', '')
+                                        page_url = item.get('link', '')
+                                        if image_url and self._is_valid_image_url(image_url):
+                                            results.append({
+                                                'image_url': image_url,
+                                                'page_url': page_url,
+                                                'title': item.get('title', f'Conteúdo: {query}'),
+                                                'description': item.get('snippet', '')[:200],
+                                                'source': 'alternative_search'
+                                            })
             except Exception as e:
                 logger.warning(f"Erro na busca alternativa: {e}")
                 continue
-            
-            await asyncio.sleep(0.2)  # Rate limiting mais rápido
         
         logger.info(f"🔄 Estratégias alternativas encontraram {len(results)} imagens")
         return results
@@ -1257,47 +1320,164 @@ class ViralImageFinder:
         logger.info(f"💼 LinkedIn direto: {len(results)} imagens extraídas")
         return results
 
+    # Camadas de extração de engajamento, da mais barata à mais cara
+    ENGAGEMENT_TIERS = ('meta', 'apify', 'browser')
+    # Camada com histórico ruim na plataforma é pulada; a cada N pulos, uma tentativa de teste
+    TIER_MIN_ATTEMPTS = 4
+    TIER_MIN_SUCCESS_RATE = 0.25
+    TIER_MAX_CONSECUTIVE_FAILURES = 3
+    TIER_PROBE_EVERY = 10
+
+    def _tier_applies(self, tier: str, post_url: str, platform: str) -> bool:
+        """A camada consegue analisar este post"""
+        is_instagram_post = platform == 'instagram' and ('/p/' in post_url or '/reel/' in post_url)
+        if tier == 'meta':
+            return is_instagram_post or platform == 'facebook'
+        if tier == 'apify':
+            return is_instagram_post and bool(self.api_keys.get('apify'))
+        if tier == 'browser':
+            return self.playwright_enabled
+        return False
+
+    def _engagement_tier_call(self, tier: str, post_url: str, platform: str):
+        """Corrotina da camada para o post, ou None se a camada não se aplica"""
+        if not self._tier_applies(tier, post_url, platform):
+            return None
+        if tier == 'meta':
+            if platform == 'instagram':
+                return self._get_instagram_embed_data(post_url)
+            return self._get_facebook_meta_data(post_url)
+        if tier == 'apify':
+            return self._analyze_with_apify_rotation(post_url)
+        return self._analyze_with_playwright_robust(post_url, platform)
+
+    def _tier_counters(self, platform: str, tier: str) -> Dict:
+        return self.engagement_tier_stats.setdefault(platform, {}).setdefault(tier, {
+            'attempts': 0, 'successes': 0, 'partial': 0, 'consecutive_failures': 0, 'skipped': 0,
+            'skipped_since_attempt': 0
+        })
+
+    def _tier_allowed(self, platform: str, tier: str) -> bool:
+        """A camada não falhou sistematicamente nesta plataforma (ou é hora de testá-la de novo)"""
+        counters = self._tier_counters(platform, tier)
+        attempts = counters['attempts']
+        failing = counters['consecutive_failures'] >= self.TIER_MAX_CONSECUTIVE_FAILURES or (
+            attempts >= self.TIER_MIN_ATTEMPTS and counters['successes'] / attempts < self.TIER_MIN_SUCCESS_RATE
+        )
+        if failing and counters['skipped_since_attempt'] + 1 < self.TIER_PROBE_EVERY:
+            counters['skipped'] += 1
+            counters['skipped_since_attempt'] += 1
+            return False
+        return True
+
+    def _record_tier_result(self, platform: str, tier: str, success: Optional[bool]):
+        """Contabiliza a chamada; ``success=None`` é resposta parcial (neutra: nem sucesso nem falha)"""
+        counters = self._tier_counters(platform, tier)
+        counters['skipped_since_attempt'] = 0
+        if success is None:
+            counters['partial'] += 1
+            return
+        counters['attempts'] += 1
+        if success:
+            counters['successes'] += 1
+            counters['consecutive_failures'] = 0
+        else:
+            counters['consecutive_failures'] += 1
+
+    @staticmethod
+    def _engagement_cache_key(post_url: str) -> str:
+        return post_url.split('#')[0].strip()
+
+    def _get_cached_engagement(self, post_url: str) -> Optional[Dict]:
+        key = self._engagement_cache_key(post_url)
+        cached = self._engagement_cache.get(key)
+        if cached is None:
+            return None
+        expires_at, data = cached
+        if time.time() >= expires_at:
+            del self._engagement_cache[key]
+            return None
+        self._engagement_cache.move_to_end(key)
+        return dict(data)
+
+    def _cache_engagement(self, post_url: str, data: Dict):
+        key = self._engagement_cache_key(post_url)
+        self._engagement_cache[key] = (time.time() + self.engagement_cache_ttl, dict(data))
+        self._engagement_cache.move_to_end(key)
+        while len(self._engagement_cache) > self.engagement_cache_max:
+            self._engagement_cache.popitem(last=False)
+
     async def analyze_post_engagement(self, post_url: str, platform: str) -> Dict:
-        """Analisa engajamento com estratégia corrigida e rotação de APIs"""
-        # Para Instagram, tentar Apify primeiro com rotação automática
-        if platform == 'instagram' and ('/p/' in post_url or '/reel/' in post_url):
-            try:
-                apify_data = await self._analyze_with_apify_rotation(post_url)
-                if apify_data:
-                    logger.info(f"✅ Dados obtidos via Apify para {post_url}")
-                    return apify_data
-            except Exception as e:
-                logger.warning(f"⚠️ Apify falhou para {post_url}: {e}")
-            # Fallback para Instagram embed
-            try:
-                embed_data = await self._get_instagram_embed_data(post_url)
-                if embed_data:
-                    logger.info(f"✅ Dados obtidos via Instagram embed para {post_url}")
-                    return embed_data
-            except Exception as e:
-                logger.error(f"❌ Erro no Instagram embed para {post_url}: {e}")
-        # Para Facebook, usar Open Graph e meta tags
-        if platform == 'facebook':
-            try:
-                fb_data = await self._get_facebook_meta_data(post_url)
-                if fb_data:
-                    logger.info(f"✅ Dados obtidos via Facebook meta para {post_url}")
-                    return fb_data
-            except Exception as e:
-                logger.error(f"❌ Erro no Facebook meta para {post_url}: {e}")
-        # Playwright como fallback robusto
-        if self.playwright_enabled:
+        """
+        Analisa engajamento em camadas, da mais barata à mais cara
+
+        Cache por URL do post → oEmbed/meta tags via HTTP → Apify → navegador (Playwright).
+        Camadas que vêm falhando na plataforma são puladas, exceto ``meta`` quando é a única
+        fonte de autor do post. Respostas sem contagens reais (``metrics_estimated``: oEmbed,
+        meta tags, placeholders) não são cacheadas e a próxima camada é tentada; se nenhuma
+        trouxer contagens, a primeira resposta parcial (com autor real) ou a estimativa por
+        plataforma é devolvida. A primeira resposta parcial é neutra para as estatísticas da
+        camada; uma parcial depois dela não acrescentou nada e conta como falha, de modo que
+        o navegador deixa de rodar onde só devolve placeholders.
+        """
+        cached = self._get_cached_engagement(post_url)
+        if cached:
+            logger.info(f"♻️ Engajamento em cache para {post_url} (via {cached.get('engagement_source', '?')})")
+            return cached
+
+        partial = None
+        for tier in self.ENGAGEMENT_TIERS:
+            call = self._engagement_tier_call(tier, post_url, platform)
+            if call is None:
+                continue
+            # Sem Apify, meta é a única fonte de autor: barata demais para ser pulada
+            only_author_source = tier == 'meta' and not self._tier_applies('apify', post_url, platform)
+            if not only_author_source and not self._tier_allowed(platform, tier):
+                call.close()
+                logger.debug(f"⏭️ Camada {tier} pulada para {platform}: falhas recorrentes")
+                continue
             try:
-                engagement_data = await self._analyze_with_playwright_robust(post_url, platform)
-                if engagement_data:
-                    logger.info(f"✅ Engajamento obtido via Playwright para {post_url}")
-                    return engagement_data
+                data = await call
             except Exception as e:
-                logger.error(f"❌ Erro no Playwright para {post_url}: {e}")
+                logger.warning(f"⚠️ Camada {tier} falhou para {post_url}: {e}")
+                data = None
+            if not data:
+                self._record_tier_result(platform, tier, False)
+                continue
+            if not data.get('metrics_estimated'):
+                self._record_tier_result(platform, tier, True)
+                logger.info(f"✅ Engajamento obtido via {tier} para {post_url}")
+                data['engagement_source'] = tier
+                self._cache_engagement(post_url, data)
+                return data
+            # Parcial: neutra se é a primeira (autor real); depois disso não acrescentou nada
+            self._record_tier_result(platform, tier, None if partial is None else False)
+            if partial is None:
+                logger.debug(f"⚠️ Camada {tier} sem contagens reais para {post_url}, tentando a próxima")
+                data['engagement_source'] = tier
+                partial = data
+
+        if partial:
+            logger.info(f"📊 Usando dados parciais ({partial['engagement_source']}) para: {post_url}")
+            return partial
+
         # Último fallback: estimativa baseada em padrões
         logger.info(f"📊 Usando estimativa para: {post_url}")
         return await self._estimate_engagement_by_platform(post_url, platform)
 
+    def get_engagement_stats(self) -> Dict:
+        """Taxa de sucesso de cada camada de engajamento por plataforma"""
+        summary = {}
+        for platform, tiers in self.engagement_tier_stats.items():
+            summary[platform] = {
+                tier: {
+                    **counters,
+                    'success_rate': round(counters['successes'] / counters['attempts'], 3) if counters['attempts'] else None
+                }
+                for tier, counters in tiers.items()
+            }
+        return summary
+
     async def _analyze_with_apify_rotation(self, post_url: str) -> Optional[Dict]:
         """Analisa post do Instagram com Apify usando rotação automática de APIs"""
         if not self.api_keys.get('apify'):
@@ -1406,7 +1586,8 @@ class ViralImageFinder:
                                 'author': data.get('author_name', '').replace('@', ''),
                                 'author_followers': 1000,  # Estimativa
                                 'post_date': '',
-                                'hashtags': []
+                                'hashtags': [],
+                                'metrics_estimated': True  # oEmbed não traz contagens
                             }
             else:
                 response = self.session.get(embed_url, timeout=15)
@@ -1421,7 +1602,8 @@ class ViralImageFinder:
                         'author': data.get('author_name', '').replace('@', ''),
                         'author_followers': 1000,
                         'post_date': '',
-                        'hashtags': []
+                        'hashtags': [],
+                        'metrics_estimated': True
                     }
         except Exception as e:
             logger.debug(f"Instagram embed falhou: {e}")
@@ -1481,7 +1663,8 @@ class ViralImageFinder:
                 'author': author,
                 'author_followers': 5000,  # Estimativa para páginas educacionais
                 'post_date': '',
-                'hashtags': re.findall(r'#(\w+)', description)
+                'hashtags': re.findall(r'#(\w+)', description),
+                'metrics_estimated': True  # Meta tags não trazem contagens
             }
         except Exception as e:
             logger.debug(f"Erro ao analisar meta tags: {e}")
@@ -1683,6 +1866,7 @@ class ViralImageFinder:
         author = ""
         post_date = ""
         hashtags = []
+        estimated = False
         try:
             if platform == 'instagram':
                 # Aguardar conteúdo carregar com múltiplas estratégias
@@ -1780,6 +1964,7 @@ class ViralImageFinder:
                     likes = 25
                     comments = 3
                     shares = 5
+                    estimated = True
             # Se ainda não temos dados, usar estimativas inteligentes
             if not author and not likes:
                 return await self._estimate_engagement_by_platform(page.url, platform)
@@ -1797,7 +1982,8 @@ class ViralImageFinder:
             'author': author,
             'author_followers': followers or 1000,
             'post_date': post_date,
-            'hashtags': hashtags
+            'hashtags': hashtags,
+            'metrics_estimated': estimated
         }
 
     def _extract_fb_reactions(self, text: str) -> int:
@@ -1866,7 +2052,8 @@ class ViralImageFinder:
             'author': 'Perfil Educacional',
             'author_followers': 5000,
             'post_date': '',
-            'hashtags': []
+            'hashtags': [],
+            'metrics_estimated': True
         }
 
     def _extract_number_from_text(self, text: str) -> int:
@@ -1894,17 +2081,7 @@ class ViralImageFinder:
 
     def _calculate_engagement_score(self, likes: int, comments: int, shares: int, views: int, followers: int) -> float:
         """Calcula score de engajamento com algoritmo aprimorado"""
-        total_interactions = likes + (comments * 5) + (shares * 10)  # Pesos diferentes
-        if views > 0:
-            rate = (total_interactions / max(views, 1)) * 100
-        elif followers > 0:
-            rate = (total_interactions / max(followers, 1)) * 100
-        else:
-            rate = float(total_interactions)
-        # Bonus para conteúdo educacional
-        if total_interactions > 100:
-            rate *= 1.2
-        return round(max(rate, float(total_interactions * 0.1)), 2)
+        return viral_scoring_engine.score_engagement(likes, comments, shares, views, followers)
 
     def _get_default_engagement(self, platform: str) -> Dict:
         """Retorna valores padrão inteligentes por plataforma"""
@@ -1938,44 +2115,18 @@ class ViralImageFinder:
         platform_data.update({
             'author': '',
             'post_date': '',
-            'hashtags': []
+            'hashtags': [],
+            'metrics_estimated': True
         })
         return platform_data
 
-    def _generate_unique_filename(self, base_name: str, content_type: str, url: str) -> str:
-        """Gera nome de arquivo único e seguro"""
-        # Extensões válidas baseadas no content-type
-        ext_map = {
-            'image/jpeg': 'jpg',
-            'image/jpg': 'jpg',
-            'image/png': 'png',
-            'image/webp': 'webp',
-            'image/gif': 'gif'
-        }
-        ext = ext_map.get(content_type, 'jpg')
-        # Se base_name for vazio ou inválido, usar hash da URL
-        if not base_name or not any(e in base_name.lower() for e in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-            hash_name = hashlib.md5(url.encode()).hexdigest()[:12]
-            timestamp = int(time.time())
-            return f"viral_{hash_name}_{timestamp}.{ext}"
-        # Limpar nome do arquivo
-        clean_name = re.sub(r'[^\w\-_\.]', '_', base_name)
-        # Garantir unicidade
-        name_without_ext = os.path.splitext(clean_name)[0]
-        full_path = os.path.join(self.config['images_dir'], f"{name_without_ext}.{ext}")
-        if os.path.exists(full_path):
-            hash_suffix = hashlib.md5(url.encode()).hexdigest()[:6]
-            return f"{name_without_ext}_{hash_suffix}.{ext}"
-        else:
-            return f"{name_without_ext}.{ext}"
-
-    async def extract_image_data(self, image_url: str, post_url: str, platform: str) -> Optional[str]:
+    async def extract_image_data(self, image_url: str, post_url: str, platform: str, session_id: Optional[str] = None) -> Optional[str]:
         """Extrai imagem com múltiplas estratégias robustas"""
         if not self.config.get('extract_images', True) or not image_url:
             return await self.take_screenshot(post_url, platform)
         # Estratégia 1: Download direto com SSL bypass
         try:
-            image_path = await self._download_image_robust(image_url, post_url)
+            image_path = await self._download_image_robust(image_url, post_url, session_id)
             if image_path:
                 logger.info(f"✅ Imagem baixada: {image_path}")
                 return image_path
@@ -1986,7 +2137,7 @@ class ViralImageFinder:
             try:
                 real_image_url = await self._extract_real_image_url(post_url, platform)
                 if real_image_url and real_image_url != image_url:
-                    image_path = await self._download_image_robust(real_image_url, post_url)
+                    image_path = await self._download_image_robust(real_image_url, post_url, session_id)
                     if image_path:
                         logger.info(f"✅ Imagem real extraída: {image_path}")
                         return image_path
@@ -1996,102 +2147,14 @@ class ViralImageFinder:
         logger.info(f"📸 Usando screenshot para {post_url}")
         return await self.take_screenshot(post_url, platform)
 
-    async def _download_image_robust(self, image_url: str, post_url: str) -> Optional[str]:
-        """Download robusto de imagem com tratamento de SSL"""
+    async def _download_image_robust(self, image_url: str, post_url: str, session_id: Optional[str] = None) -> Optional[str]:
+        """Download robusto de imagem via armazenamento compartilhado (URLs já baixadas não são baixadas de novo)"""
         # Validação prévia da URL
         if not self._is_valid_image_url(image_url):
             logger.warning(f"URL não parece ser de imagem: {image_url}")
             return None
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-            'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
-            'Referer': post_url,
-            'Accept-Encoding': 'gzip, deflate, br'
-        }
         try:
-            if HAS_ASYNC_DEPS:
-                # Configurar SSL context permissivo
-                ssl_context = ssl.create_default_context()
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
-                connector = aiohttp.TCPConnector(ssl=ssl_context)
-                timeout = aiohttp.ClientTimeout(total=self.config['timeout'])
-                async with aiohttp.ClientSession(
-                    connector=connector,
-                    timeout=timeout,
-                    headers=headers
-                ) as session:
-                    async with session.get(image_url) as response:
-                        response.raise_for_status()
-                        content_type = response.headers.get('content-type', '').lower()
-                        # Limpar charset com aspas duplas do content-type
-                        content_type_clean = content_type.split(';')[0].strip()
-                        # Verificar se é realmente uma imagem
-                        if 'image' not in content_type_clean:
-                            # URLs especiais do Instagram podem retornar HTML/JSON válido
-                            if 'lookaside.instagram.com' in image_url or 'instagram.com/seo/' in image_url:
-                                # Para URLs do Instagram lookaside, tentar processar como dados estruturados
-                                if 'text/html' in content_type_clean or 'application/json' in content_type_clean:
-                                    logger.info(f"URL Instagram especial detectada: {image_url}")
-                                    # Não é uma imagem direta, mas pode conter dados úteis
-                                    return None
-                            # Se não é imagem mas é HTML, pode ser uma página de erro ou redirecionamento
-                            elif 'text/html' in content_type_clean:
-                                logger.warning(f"Recebido HTML em vez de imagem: {content_type}")
-                                return None
-                            logger.warning(f"Content-Type inválido: {content_type}")
-                            return None
-                        # Verificar tamanho
-                        content_length = int(response.headers.get('content-length', 0))
-                        if content_length > 15 * 1024 * 1024:  # 15MB max
-                            logger.warning(f"Imagem muito grande: {content_length} bytes")
-                            return None
-                        # Gerar nome de arquivo
-                        parsed_url = urlparse(image_url)
-                        filename = os.path.basename(parsed_url.path) or 'image'
-                        filename = self._generate_unique_filename(filename, content_type, image_url)
-                        filepath = os.path.join(self.config['images_dir'], filename)
-                        # Salvar arquivo
-                        async with aiofiles.open(filepath, 'wb') as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                await f.write(chunk)
-                        # Verificar se arquivo foi salvo corretamente
-                        if os.path.exists(filepath) and os.path.getsize(filepath) > 1024:
-                            return filepath
-                        else:
-                            logger.warning(f"Arquivo salvo incorretamente: {filepath}")
-                            return None
-            else:
-                # Fallback síncrono com SSL bypass
-                import requests
-                from requests.adapters import HTTPAdapter
-                from requests.packages.urllib3.util.retry import Retry
-                session = requests.Session()
-                session.verify = False  # Bypass SSL
-                # Configurar retry
-                retry_strategy = Retry(
-                    total=3,
-                    backoff_factor=1,
-                    status_forcelist=[429, 500, 502, 503, 504],
-                )
-                adapter = HTTPAdapter(max_retries=retry_strategy)
-                session.mount("http://", adapter)
-                session.mount("https://", adapter)
-                response = session.get(image_url, headers=headers, timeout=self.config['timeout'])
-                response.raise_for_status()
-                content_type = response.headers.get('content-type', '').lower()
-                if 'image' in content_type:
-                    parsed_url = urlparse(image_url)
-                    filename = os.path.basename(parsed_url.path) or 'image'
-                    filename = self._generate_unique_filename(filename, content_type, image_url)
-                    filepath = os.path.join(self.config['images_dir'], filename)
-                    with open(filepath, 'wb') as f:
-                        f.write(response.content)
-                    if os.path.exists(filepath) and os.path.getsize(filepath) > 1024:
-                        return filepath
-                return None
+            return await image_store.fetch(image_url, referer=post_url, session_id=session_id)
         except Exception as e:
             logger.error(f"❌ Erro no download robusto: {e}")
             return None
@@ -2154,7 +2217,7 @@ class ViralImageFinder:
         safe_title = re.sub(r'[^\w\s-]', '', post_url.replace('/', '_')).strip()[:40]
         hash_suffix = hashlib.md5(post_url.encode()).hexdigest()[:8]
         timestamp = int(time.time())
-        screenshot_filename = f"screenshot_{safe_title}_{hash_suffix}_{timestamp}.png"
+        screenshot_filename = f"screenshot_{safe_title}_{hash_suffix}_{timestamp}{screenshot_encoder.extension}"
         screenshot_path = os.path.join(self.config['screenshots_dir'], screenshot_filename)
         try:
             async with async_playwright() as p:
@@ -2186,22 +2249,20 @@ class ViralImageFinder:
                 # Fechar popups
                 await self._close_common_popups(page, platform)
                 await asyncio.sleep(1)
-                # Tirar screenshot da área principal
+                # Tirar screenshot da área principal (codificada em WebP/JPEG fora do loop)
+                screenshot = None
                 if platform == 'instagram':
                     # Focar no post principal
                     try:
                         main_element = await page.query_selector('article, main')
-                        if main_element:
-                            await main_element.screenshot(path=screenshot_path)
-                        else:
-                            await page.screenshot(path=screenshot_path, full_page=False)
-                    except:
-                        await page.screenshot(path=screenshot_path, full_page=False)
-                else:
-                    await page.screenshot(path=screenshot_path, full_page=False)
+                        screenshot = await screenshot_encoder.capture_playwright(page, screenshot_path, element=main_element)
+                    except Exception:
+                        screenshot = None
+                if screenshot is None:
+                    screenshot = await screenshot_encoder.capture_playwright(page, screenshot_path)
                 await browser.close()
-                # Verificar se screenshot foi criada
-                if os.path.exists(screenshot_path) and os.path.getsize(screenshot_path) > 5000:
+                # Verificar se screenshot foi criada (o encoder já descarta arquivos abaixo de min_bytes)
+                if screenshot:
                     logger.info(f"✅ Screenshot salva: {screenshot_path}")
                     return screenshot_path
                 else:
@@ -2211,8 +2272,15 @@ class ViralImageFinder:
             logger.error(f"❌ Erro ao capturar screenshot: {e}")
             return None
 
-    async def find_viral_images(self, query: str) -> Tuple[List[ViralImage], str]:
+    async def find_viral_images(self, query: str, session_id: Optional[str] = None) -> Tuple[List[ViralImage], str]:
         """Função principal otimizada para encontrar conteúdo viral"""
+        try:
+            return await self._find_viral_images(query, session_id)
+        finally:
+            # O cliente de download é ligado ao loop desta coleta
+            await image_store.aclose()
+
+    async def _find_viral_images(self, query: str, session_id: Optional[str]) -> Tuple[List[ViralImage], str]:
         logger.info(f"🔥 BUSCA VIRAL INICIADA: {query}")
         # Buscar resultados com estratégia aprimorada
         search_results = await self.search_images(query)
@@ -2239,12 +2307,19 @@ class ViralImageFinder:
                     screenshot_path = None
                     image_url = result.get('image_url', '')
                     if self.config.get('extract_images', True):
-                        extracted_path = await self.extract_image_data(image_url, page_url, platform)
+                        extracted_path = await self.extract_image_data(image_url, page_url, platform, session_id)
                         if extracted_path:
                             if 'screenshot' in extracted_path:
                                 screenshot_path = extracted_path
                             else:
                                 image_path = extracted_path
+                    # Hashes perceptuais e miniatura WebP gerados uma vez, fora do loop de eventos
+                    thumbnail_path = None
+                    if image_path or screenshot_path:
+                        visual = await asyncio.get_running_loop().run_in_executor(
+                            None, perceptual_image_index.ingest, image_path or screenshot_path, session_id, platform
+                        )
+                        thumbnail_path = visual['thumbnail'] if visual else None
                     # Criar objeto ViralImage
                     viral_image = ViralImage(
                         image_url=image_url,
@@ -2262,7 +2337,8 @@ class ViralImageFinder:
                         post_date=engagement.get('post_date', ''),
                         hashtags=engagement.get('hashtags', []),
                         image_path=image_path,
-                        screenshot_path=screenshot_path
+                        screenshot_path=screenshot_path,
+                        thumbnail_path=thumbnail_path
                     )
                     # Verificar critério de viralidade
                     if viral_image.engagement_score >= self.config['min_engagement']:
@@ -2287,6 +2363,7 @@ class ViralImageFinder:
                 viral_images.append(result)
             elif isinstance(result, Exception):
                 logger.error(f"❌ Erro no processamento: {result}")
+        viral_images = self._collapse_visual_duplicates(viral_images, session_id)
         # Ordenar por score de engajamento
         viral_images.sort(key=lambda x: x.engagement_score, reverse=True)
         # Salvar resultados
@@ -2295,6 +2372,34 @@ class ViralImageFinder:
         logger.info(f"📊 TOP 3 SCORES: {[img.engagement_score for img in viral_images[:3]]}")
         return viral_images, output_file
 
+    def _collapse_visual_duplicates(self, viral_images: List[ViralImage], session_id: Optional[str]) -> List[ViralImage]:
+        """Mantém um item por imagem visualmente idêntica (o de maior resolução); os demais posts ficam em duplicate_posts"""
+        kept: Dict[int, ViralImage] = {}
+        resolution: Dict[int, int] = {}
+        result = []
+        for viral_image in viral_images:
+            local_path = viral_image.image_path or viral_image.screenshot_path
+            visual = perceptual_image_index.ingest(local_path, session_id) if local_path else None
+            if visual is None:
+                result.append(viral_image)
+                continue
+            cluster, pixels = visual['cluster'], visual['width'] * visual['height']
+            current = kept.get(cluster)
+            if current is None:
+                kept[cluster], resolution[cluster] = viral_image, pixels
+                result.append(viral_image)
+                continue
+            if pixels > resolution[cluster]:
+                # A cópia de maior resolução assume o lugar do representante
+                viral_image.duplicate_posts = current.duplicate_posts + [current.post_url]
+                result[result.index(current)] = viral_image
+                kept[cluster], resolution[cluster] = viral_image, pixels
+            else:
+                current.duplicate_posts.append(viral_image.post_url)
+        if len(result) < len(viral_images):
+            logger.info(f"🖼️ {len(viral_images) - len(result)} imagens virais visualmente duplicadas agrupadas")
+        return result
+
     def _determine_platform(self, url: str) -> str:
         """Determina a plataforma baseada na URL"""
         if 'instagram.com' in url:
@@ -2358,6 +2463,7 @@ class ViralImageFinder:
                     'extract_images': self.config['extract_images'],
                     'playwright_enabled': self.playwright_enabled
                 },
+                'engagement_tiers': self.get_engagement_stats(),
                 'api_status': {
                     'serper_available': bool(self.config.get('serper_api_key')),
                     'google_cse_available': bool(self.config.get('google_search_key')),
@@ -2377,9 +2483,9 @@ class ViralImageFinder:
 viral_integration_service = ViralImageFinder()
 
 # Funções wrapper para compatibilidade
-async def find_viral_images(query: str) -> Tuple[List[ViralImage], str]:
+async def find_viral_images(query: str, session_id: Optional[str] = None) -> Tuple[List[ViralImage], str]:
     """Função wrapper assíncrona"""
-    return await viral_integration_service.find_viral_images(query)
+    return await viral_integration_service.find_viral_images(query, session_id)
 
 def find_viral_images_sync(query: str) -> Tuple[List[ViralImage], str]:
     """Função wrapper síncrona com tratamento de loop robusto"""
@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v3.0 - Viral Scoring Engine
+Scores virais calculados em lote sobre colunas NumPy, com seleção top-k por argpartition
+"""
+
+import time
+import logging
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Códigos de plataforma das colunas ``platform`` (qualquer outra vira 'web')
+PLATFORMS = ('web', 'youtube', 'instagram', 'facebook', 'twitter', 'tiktok', 'news', 'commercial')
+PLATFORM_CODES = {name: code for code, name in enumerate(PLATFORMS)}
+
+# Ordem das métricas na matriz de pesos de imagens; é a ordem de soma de todas as plataformas
+IMAGE_METRICS = ('views', 'likes', 'comments', 'shares')
+IMAGE_WEIGHTS = {
+    'instagram': {'likes': 0.3, 'comments': 0.4, 'shares': 0.3},
+    'facebook': {'likes': 0.25, 'comments': 0.35, 'shares': 0.4},
+    'youtube': {'views': 0.4, 'likes': 0.3, 'comments': 0.3},
+    'news': {'views': 0.6, 'shares': 0.4},
+    'commercial': {'views': 0.5, 'likes': 0.3, 'shares': 0.2}
+}
+
+VIRAL_CATEGORIES = ('POPULAR', 'TRENDING', 'VIRAL', 'MEGA_VIRAL')
+
+
+def _image_weight_matrix() -> np.ndarray:
+    matrix = np.zeros((len(PLATFORMS), len(IMAGE_METRICS)))
+    for code, platform in enumerate(PLATFORMS):
+        weights = IMAGE_WEIGHTS.get(platform, IMAGE_WEIGHTS['instagram'])
+        matrix[code] = [weights.get(metric, 0.0) for metric in IMAGE_METRICS]
+    return matrix
+
+
+class ViralScoringEngine:
+    """
+    Fonte única das fórmulas de score viral
+
+    Cada fórmula existe em duas formas com o mesmo resultado: por item (``score_*``,
+    usada pelos serviços ao montar um resultado) e vetorizada sobre colunas NumPy
+    (uma linha por item), usada quando há listas inteiras para pontuar e ordenar.
+    Linhas com valores inválidos recebem o mesmo fallback da versão por item.
+    """
+
+    def __init__(self):
+        self.image_weights = _image_weight_matrix()
+        self.stats = {'batches': 0, 'items': 0, 'seconds': 0.0}
+
+    # ------------------------------------------------------------------ colunas
+
+    @staticmethod
+    def column(values: Sequence[Any], integer: bool = True, none_as_zero: bool = False) -> np.ndarray:
+        """
+        Converte valores brutos em coluna float64 (NaN onde a conversão falharia)
+
+        Args:
+            values: Valores como vêm das APIs (int, float, str numérica, None)
+            integer: Converte com ``int()`` (senão ``float()``), como as fórmulas por item
+            none_as_zero: Trata valores falsos como 0 (``value or 0``)
+        """
+        cast = int if integer else float
+        column = np.empty(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            if none_as_zero and not value:
+                column[i] = 0.0
+                continue
+            try:
+                column[i] = cast(value)
+            except (ValueError, TypeError, OverflowError):
+                column[i] = np.nan
+        return column
+
+    @staticmethod
+    def platform_codes(platforms: Sequence[Any]) -> np.ndarray:
+        """Códigos de plataforma (``PLATFORMS``) de uma coluna de nomes"""
+        if isinstance(platforms, np.ndarray) and platforms.dtype.kind in 'iu':
+            return platforms.astype(np.int8)
+        if not (isinstance(platforms, np.ndarray) and platforms.dtype.kind == 'U'):
+            platforms = np.asarray([str(p) for p in platforms], dtype=str)
+        names, inverse = np.unique(platforms, return_inverse=True)
+        codes = np.array([PLATFORM_CODES.get(name, 0) for name in names], dtype=np.int8)
+        return codes[inverse.reshape(-1)] if len(names) else np.zeros(0, dtype=np.int8)
+
+    # ------------------------------------------------------------------ busca (RealSearchOrchestrator)
+
+    @staticmethod
+    def score_youtube_stats(stats: Dict[str, Any]) -> float:
+        """Score viral de um vídeo do YouTube a partir de ``statistics`` (0-10)"""
+        try:
+            views = int(stats.get('viewCount', 0))
+            likes = int(stats.get('likeCount', 0))
+            comments = int(stats.get('commentCount', 0))
+
+            # Fórmula viral: views + (likes * 10) + (comments * 20)
+            viral_score = views + (likes * 10) + (comments * 20)
+
+            # Normaliza para 0-10
+            return min(10.0, viral_score / 100000)
+
+        except Exception:
+            return 0.0
+
+    @staticmethod
+    def search_youtube(views: np.ndarray, likes: np.ndarray, comments: np.ndarray) -> np.ndarray:
+        score = np.minimum(10.0, (views + likes * 10 + comments * 20) / 100000)
+        return np.where(np.isnan(score), 0.0, score)
+
+    def youtube_scores(self, stats_list: List[Dict[str, Any]]) -> np.ndarray:
+        """``score_youtube_stats`` de uma lista inteira"""
+        return self.search_youtube(*(
+            self.column([stats.get(key, 0) for stats in stats_list])
+            for key in ('viewCount', 'likeCount', 'commentCount')
+        ))
+
+    @staticmethod
+    def score_social_post(post: Dict[str, Any]) -> float:
+        """Score viral de um post de rede social (0-10)"""
+        try:
+            likes = int(post.get('likes', 0))
+            comments = int(post.get('comments', 0))
+            shares = int(post.get('shares', 0))
+            engagement_rate = float(post.get('engagement_rate', 0))
+
+            # Fórmula viral para redes sociais
+            viral_score = (likes * 1) + (comments * 5) + (shares * 10) + (engagement_rate * 1000)
+
+            # Normaliza para 0-10
+            return min(10.0, viral_score / 10000)
+
+        except Exception:
+            return 0.0
+
+    @staticmethod
+    def search_social(likes: np.ndarray, comments: np.ndarray, shares: np.ndarray, engagement_rate: np.ndarray) -> np.ndarray:
+        score = np.minimum(10.0, (likes + comments * 5 + shares * 10 + engagement_rate * 1000) / 10000)
+        return np.where(np.isnan(score), 0.0, score)
+
+    def social_scores(self, posts: List[Dict[str, Any]]) -> np.ndarray:
+        """``score_social_post`` de uma lista inteira"""
+        likes, comments, shares = (
+            self.column([post.get(key, 0) for post in posts]) for key in ('likes', 'comments', 'shares')
+        )
+        engagement_rate = self.column([post.get('engagement_rate', 0) for post in posts], integer=False)
+        return self.search_social(likes, comments, shares, engagement_rate)
+
+    @staticmethod
+    def score_twitter_metrics(metrics: Dict[str, Any]) -> float:
+        """Score viral de um tweet a partir de ``public_metrics`` (0-10)"""
+        try:
+            retweets = int(metrics.get('retweet_count', 0))
+            likes = int(metrics.get('like_count', 0))
+            replies = int(metrics.get('reply_count', 0))
+            quotes = int(metrics.get('quote_count', 0))
+
+            # Fórmula viral para Twitter
+            viral_score = (retweets * 10) + (likes * 2) + (replies * 5) + (quotes * 15)
+
+            # Normaliza para 0-10
+            return min(10.0, viral_score / 5000)
+
+        except Exception:
+            return 0.0
+
+    @staticmethod
+    def search_twitter(retweets: np.ndarray, likes: np.ndarray, replies: np.ndarray, quotes: np.ndarray) -> np.ndarray:
+        score = np.minimum(10.0, (retweets * 10 + likes * 2 + replies * 5 + quotes * 15) / 5000)
+        return np.where(np.isnan(score), 0.0, score)
+
+    def twitter_scores(self, metrics_list: List[Dict[str, Any]]) -> np.ndarray:
+        """``score_twitter_metrics`` de uma lista inteira"""
+        return self.search_twitter(*(
+            self.column([metrics.get(key, 0) for metrics in metrics_list])
+            for key in ('retweet_count', 'like_count', 'reply_count', 'quote_count')
+        ))
+
+    # ------------------------------------------------------------------ conteúdo (viral_content_analyzer)
+
+    @staticmethod
+    def score_content(content: Dict[str, Any], platform: str) -> float:
+        """Score viral de um conteúdo coletado, com fórmula por plataforma (0-10; web usa a relevância)"""
+        try:
+            if platform == 'youtube':
+                views = int(content.get('view_count', 0) or 0)
+                likes = int(content.get('like_count', 0) or 0)
+                comments = int(content.get('comment_count', 0) or 0)
+
+                # Fórmula YouTube: views/1000 + likes/100 + comments/10
+                score = (views / 1000) + (likes / 100) + (comments / 10)
+                return min(10.0, score / 100) if score > 0 else 0.0
+
+            elif platform in ['instagram', 'facebook']:
+                likes = int(content.get('likes', 0) or 0)
+                comments = int(content.get('comments', 0) or 0)
+                shares = int(content.get('shares', 0) or 0)
+
+                # Fórmula Instagram/Facebook
+                score = (likes / 100) + (comments / 10) + (shares / 5)
+                return min(10.0, score / 50) if score > 0 else 0.0
+
+            elif platform == 'twitter':
+                retweets = int(content.get('retweets', 0) or 0)
+                likes = int(content.get('likes', 0) or 0)
+                replies = int(content.get('replies', 0) or 0)
+
+                # Fórmula Twitter
+                score = (retweets / 10) + (likes / 50) + (replies / 5)
+                return min(10.0, score / 20) if score > 0 else 0.0
+
+            elif platform == 'tiktok':
+                views = int(content.get('view_count', 0) or 0)
+                likes = int(content.get('likes', 0) or 0)
+                shares = int(content.get('shares', 0) or 0)
+
+                # Fórmula TikTok
+                score = (views / 10000) + (likes / 500) + (shares / 100)
+                return min(10.0, score / 50) if score > 0 else 0.0
+
+            else:
+                # Score baseado em relevância para conteúdo web
+                relevance = content.get('relevance_score', 0) or 0
+                return float(relevance) * 10
+
+        except (ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Erro ao calcular score viral para conteúdo {content.get('title', 'Sem título')}: {e}")
+            return 0.0
+        except Exception as e:
+            logger.warning(f"⚠️ Erro inesperado ao calcular score viral: {e}")
+            return 0.0
+
+    @staticmethod
+    def content(
+        platform: np.ndarray,
+        views: np.ndarray,
+        likes: np.ndarray,
+        comments: np.ndarray,
+        shares: np.ndarray,
+        retweets: np.ndarray,
+        replies: np.ndarray,
+        relevance: np.ndarray
+    ) -> np.ndarray:
+        """
+        ``score_content`` vetorizado
+
+        ``likes``/``comments`` são as colunas da própria plataforma (``like_count`` e
+        ``comment_count`` no YouTube); ``platform`` traz os códigos de ``PLATFORMS``.
+        """
+        youtube = (views / 1000) + (likes / 100) + (comments / 10)
+        social = (likes / 100) + (comments / 10) + (shares / 5)
+        twitter = (retweets / 10) + (likes / 50) + (replies / 5)
+        tiktok = (views / 10000) + (likes / 500) + (shares / 100)
+
+        score = np.select(
+            [
+                platform == PLATFORM_CODES['youtube'],
+                (platform == PLATFORM_CODES['instagram']) | (platform == PLATFORM_CODES['facebook']),
+                platform == PLATFORM_CODES['twitter'],
+                platform == PLATFORM_CODES['tiktok']
+            ],
+            [
+                np.where(youtube > 0, np.minimum(10.0, youtube / 100), 0.0),
+                np.where(social > 0, np.minimum(10.0, social / 50), 0.0),
+                np.where(twitter > 0, np.minimum(10.0, twitter / 20), 0.0),
+                np.where(tiktok > 0, np.minimum(10.0, tiktok / 50), 0.0)
+            ],
+            default=relevance * 10
+        )
+        return np.where(np.isnan(score), 0.0, score)
+
+    def content_scores(self, contents: List[Dict[str, Any]]) -> np.ndarray:
+        """``score_content`` de uma lista de conteúdos (plataforma em ``content['platform']``)"""
+        platforms = [content.get('platform', 'web') for content in contents]
+        youtube = [platform == 'youtube' for platform in platforms]
+        return self.content(
+            self.platform_codes(platforms),
+            self.column([c.get('view_count', 0) for c in contents], none_as_zero=True),
+            self.column([c.get('like_count' if yt else 'likes', 0) for c, yt in zip(contents, youtube)], none_as_zero=True),
+            self.column([c.get('comment_count' if yt else 'comments', 0) for c, yt in zip(contents, youtube)], none_as_zero=True),
+            self.column([c.get('shares', 0) for c in contents], none_as_zero=True),
+            self.column([c.get('retweets', 0) for c in contents], none_as_zero=True),
+            self.column([c.get('replies', 0) for c in contents], none_as_zero=True),
+            self.column([c.get('relevance_score', 0) for c in contents], integer=False, none_as_zero=True)
+        )
+
+    @staticmethod
+    def categorize(scores: np.ndarray) -> np.ndarray:
+        """Categorias (MEGA_VIRAL ≥ 9, VIRAL ≥ 7, TRENDING ≥ 5, senão POPULAR)"""
+        return np.asarray(VIRAL_CATEGORIES, dtype=object)[np.searchsorted([5.0, 7.0, 9.0], scores, side='right')]
+
+    # ------------------------------------------------------------------ faixas (viral_analyzer)
+
+    @staticmethod
+    def score_tiers(content_data: Dict[str, Any], platform: str) -> float:
+        """Score de viralidade por faixas de alcance (0-10)"""
+        score = 0.0
+
+        if platform == 'youtube':
+            stats = content_data.get('stats', {})
+            views = int(stats.get('viewCount', 0))
+            likes = int(stats.get('likeCount', 0))
+            comments = int(stats.get('commentCount', 0))
+
+            # Score baseado em views (normalizado)
+            if views > 1000000:  # 1M+ views
+                score += 10.0
+            elif views > 100000:  # 100K+ views
+                score += 7.0
+            elif views > 10000:  # 10K+ views
+                score += 5.0
+            elif views > 1000:  # 1K+ views
+                score += 3.0
+
+            # Score baseado em engagement rate
+            if views > 0:
+                engagement_rate = (likes + comments) / views
+                score += min(engagement_rate * 100, 5.0)
+
+        elif platform == 'instagram':
+            likes = content_data.get('likes', 0)
+            comments = content_data.get('comments', 0)
+
+            total_engagement = likes + comments
+            if total_engagement > 10000:
+                score += 10.0
+            elif total_engagement > 1000:
+                score += 7.0
+            elif total_engagement > 100:
+                score += 5.0
+            elif total_engagement > 10:
+                score += 3.0
+
+        elif platform == 'facebook':
+            reactions = content_data.get('reactions', 0)
+            comments = content_data.get('comments', 0)
+            shares = content_data.get('shares', 0)
+
+            total_engagement = reactions + comments + (shares * 2)  # Shares valem mais
+            if total_engagement > 5000:
+                score += 10.0
+            elif total_engagement > 500:
+                score += 7.0
+            elif total_engagement > 50:
+                score += 5.0
+            elif total_engagement > 5:
+                score += 3.0
+
+        return min(score, 10.0)  # Cap at 10.0
+
+    @staticmethod
+    def _tier(values: np.ndarray, limits: Sequence[float]) -> np.ndarray:
+        return np.select([values > limit for limit in limits], [10.0, 7.0, 5.0, 3.0], default=0.0)
+
+    @classmethod
+    def tiers(
+        cls,
+        platform: np.ndarray,
+        views: np.ndarray,
+        likes: np.ndarray,
+        comments: np.ndarray,
+        shares: np.ndarray,
+        reactions: np.ndarray
+    ) -> np.ndarray:
+        """``score_tiers`` vetorizado (``reactions`` só conta no Facebook)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            engagement = np.where(views > 0, np.minimum((likes + comments) / views * 100, 5.0), 0.0)
+        youtube = cls._tier(views, (1000000, 100000, 10000, 1000)) + engagement
+        instagram = cls._tier(likes + comments, (10000, 1000, 100, 10))
+        facebook = cls._tier(reactions + comments + shares * 2, (5000, 500, 50, 5))
+
+        score = np.select(
+            [
+                platform == PLATFORM_CODES['youtube'],
+                platform == PLATFORM_CODES['instagram'],
+                platform == PLATFORM_CODES['facebook']
+            ],
+            [youtube, instagram, facebook],
+            default=0.0
+        )
+        return np.minimum(np.where(np.isnan(score), 0.0, score), 10.0)
+
+    # ------------------------------------------------------------------ engajamento (viral_integration_service)
+
+    @staticmethod
+    def score_engagement(likes: int, comments: int, shares: int, views: int, followers: int) -> float:
+        """Score de engajamento de um post (interações ponderadas sobre views ou seguidores)"""
+        total_interactions = likes + (comments * 5) + (shares * 10)  # Pesos diferentes
+        if views > 0:
+            rate = (total_interactions / max(views, 1)) * 100
+        elif followers > 0:
+            rate = (total_interactions / max(followers, 1)) * 100
+        else:
+            rate = float(total_interactions)
+        # Bonus para conteúdo educacional
+        if total_interactions > 100:
+            rate *= 1.2
+        return round(max(rate, float(total_interactions * 0.1)), 2)
+
+    @staticmethod
+    def engagement(likes: np.ndarray, comments: np.ndarray, shares: np.ndarray, views: np.ndarray, followers: np.ndarray) -> np.ndarray:
+        """``score_engagement`` vetorizado"""
+        total = likes + comments * 5 + shares * 10
+        rate = np.select(
+            [views > 0, followers > 0],
+            [total / np.maximum(views, 1) * 100, total / np.maximum(followers, 1) * 100],
+            default=total
+        )
+        rate = np.where(total > 100, rate * 1.2, rate)
+        return np.round(np.maximum(rate, total * 0.1), 2)
+
+    # ------------------------------------------------------------------ imagens (viral_image_extractor)
+
+    @staticmethod
+    def score_image(metrics: Dict[str, Any], platform: str) -> float:
+        """Score de viralidade de uma imagem (0-100); métricas ausentes não entram na média"""
+        platform_weights = IMAGE_WEIGHTS.get(platform, IMAGE_WEIGHTS['instagram'])
+        score = 0.0
+        total_weight = 0.0
+        for metric, weight in platform_weights.items():
+            if metric in metrics:
+                # Normaliza métricas (log scale para evitar números muito grandes)
+                normalized_value = min(100, (metrics[metric] / 100) ** 0.5) if metrics[metric] > 0 else 0
+                score += normalized_value * weight
+                total_weight += weight
+        if total_weight > 0:
+            score = score / total_weight
+        return min(100.0, max(0.0, score))
+
+    def image_virality(self, platform: np.ndarray, views: np.ndarray, likes: np.ndarray, comments: np.ndarray, shares: np.ndarray) -> np.ndarray:
+        """``score_image`` vetorizado; NaN marca a métrica ausente daquela imagem"""
+        weights = self.image_weights[platform]
+        score = np.zeros(len(platform))
+        total_weight = np.zeros(len(platform))
+        for i, values in enumerate((views, likes, comments, shares)):
+            present = ~np.isnan(values)
+            with np.errstate(invalid='ignore'):
+                normalized = np.where(values > 0, np.minimum(100, np.power(values / 100, 0.5)), 0.0)
+            weight = np.where(present, weights[:, i], 0.0)
+            score += np.where(present, normalized * weight, 0.0)
+            total_weight += weight
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = np.where(total_weight > 0, score / total_weight, score)
+        return np.clip(score, 0.0, 100.0)
+
+    # ------------------------------------------------------------------ seleção
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        Índices dos ``k`` maiores scores em ordem decrescente
+
+        ``argpartition`` separa os candidatos em O(n); só eles são ordenados. Empates
+        saem em ordem de índice, como no ``sorted(..., reverse=True)`` estável.
+        """
+        scores = np.nan_to_num(np.asarray(scores, dtype=np.float64), nan=-np.inf)
+        n = scores.size
+        k = min(int(k), n)
+        if k <= 0:
+            return np.zeros(0, dtype=np.intp)
+        if k < n:
+            threshold = scores[np.argpartition(-scores, k - 1)[:k]].min()
+            candidates = np.flatnonzero(scores >= threshold)
+        else:
+            candidates = np.arange(n)
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order[:k]]
+
+    # ------------------------------------------------------------------ lote completo
+
+    def score_batch(self, columns: Dict[str, Any], k: int = 10, rank_by: str = 'content_score') -> Dict[str, np.ndarray]:
+        """
+        Calcula todos os scores de um lote colunar numa passada
+
+        Args:
+            columns: ``platform`` (nomes ou códigos) e colunas numéricas de mesmo tamanho:
+                ``views``, ``likes``, ``comments``, ``shares``, ``followers``, ``retweets``,
+                ``replies``, ``quotes``, ``reactions``, ``engagement_rate``, ``relevance``.
+                Colunas ausentes valem 0 (em ``image_score``, métrica ausente).
+            k: Tamanho do top-k
+            rank_by: Score usado no top-k
+
+        Returns:
+            Dict com ``search_score``, ``content_score``, ``viral_category``, ``tier_score``,
+            ``engagement_score``, ``image_score`` e ``top_k`` (índices)
+        """
+        started = time.perf_counter()
+        platform = self.platform_codes(columns['platform'])
+        n = len(platform)
+        missing = np.full(n, np.nan)
+
+        def get(name: str, default: Optional[np.ndarray] = None) -> np.ndarray:
+            if name not in columns:
+                return np.zeros(n) if default is None else default
+            return np.asarray(columns[name], dtype=np.float64)
+
+        views, likes, comments, shares = get('views'), get('likes'), get('comments'), get('shares')
+        retweets, replies = get('retweets'), get('replies')
+
+        search = np.select(
+            [platform == PLATFORM_CODES['youtube'], platform == PLATFORM_CODES['twitter']],
+            [
+                self.search_youtube(views, likes, comments),
+                self.search_twitter(retweets, likes, replies, get('quotes'))
+            ],
+            default=self.search_social(likes, comments, shares, get('engagement_rate'))
+        )
+        content = self.content(platform, views, likes, comments, shares, retweets, replies, get('relevance'))
+
+        result = {
+            'search_score': search,
+            'content_score': content,
+            'viral_category': self.categorize(content),
+            'tier_score': self.tiers(platform, views, likes, comments, shares, get('reactions')),
+            'engagement_score': self.engagement(likes, comments, shares, views, get('followers')),
+            'image_score': self.image_virality(
+                platform, *(get(metric, missing) for metric in IMAGE_METRICS)
+            )
+        }
+        result['top_k'] = self.top_k(result[rank_by], k)
+
+        self.stats['batches'] += 1
+        self.stats['items'] += n
+        self.stats['seconds'] += time.perf_counter() - started
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+    # ------------------------------------------------------------------ benchmark
+
+    def benchmark(self, n: int = 100000, k: int = 10, seed: int = 42) -> Dict[str, Any]:
+        """
+        Compara o laço por item com a passada vetorizada em ``n`` itens sintéticos
+
+        Confere que os scores batem com as fórmulas por item e devolve os tempos.
+        """
+        rng = np.random.default_rng(seed)
+        platform_names = np.array(PLATFORMS)[rng.integers(0, len(PLATFORMS), n)]
+        columns = {'platform': platform_names}
+        for name, mean in (('views', 9.0), ('likes', 6.0), ('comments', 4.0), ('shares', 3.0),
+                           ('followers', 8.0), ('retweets', 3.0), ('replies', 3.0), ('quotes', 2.0), ('reactions', 5.0)):
+            values = np.floor(rng.lognormal(mean, 2.0, n))
+            values[rng.random(n) < 0.05] = 0
+            columns[name] = values
+        columns['engagement_rate'] = rng.random(n) * 0.2
+        columns['relevance'] = rng.random(n)
+        ints = {name: columns[name].astype(np.int64).tolist() for name in columns if name not in ('platform', 'engagement_rate', 'relevance')}
+        platforms = platform_names.tolist()
+        engagement_rate = columns['engagement_rate'].tolist()
+        relevance = columns['relevance'].tolist()
+
+        started = time.perf_counter()
+        scalar = {'search_score': [], 'content_score': [], 'tier_score': [], 'engagement_score': [], 'image_score': []}
+        for i in range(n):
+            platform = platforms[i]
+            views, likes, comments, shares = ints['views'][i], ints['likes'][i], ints['comments'][i], ints['shares'][i]
+            if platform == 'youtube':
+                search = self.score_youtube_stats({'viewCount': views, 'likeCount': likes, 'commentCount': comments})
+            elif platform == 'twitter':
+                search = self.score_twitter_metrics({
+                    'retweet_count': ints['retweets'][i], 'like_count': likes,
+                    'reply_count': ints['replies'][i], 'quote_count': ints['quotes'][i]
+                })
+            else:
+                search = self.score_social_post({
+                    'likes': likes, 'comments': comments, 'shares': shares, 'engagement_rate': engagement_rate[i]
+                })
+            scalar['search_score'].append(search)
+            scalar['content_score'].append(self.score_content({
+                'view_count': views, 'like_count': likes, 'comment_count': comments, 'likes': likes,
+                'comments': comments, 'shares': shares, 'retweets': ints['retweets'][i],
+                'replies': ints['replies'][i], 'relevance_score': relevance[i]
+            }, platform))
+            scalar['tier_score'].append(self.score_tiers({
+                'stats': {'viewCount': views, 'likeCount': likes, 'commentCount': comments},
+                'likes': likes, 'comments': comments, 'shares': shares, 'reactions': ints['reactions'][i]
+            }, platform))
+            scalar['engagement_score'].append(self.score_engagement(likes, comments, shares, views, ints['followers'][i]))
+            scalar['image_score'].append(self.score_image(
+                {'views': views, 'likes': likes, 'comments': comments, 'shares': shares}, platform
+            ))
+        scalar_top = sorted(range(n), key=lambda i: scalar['content_score'][i], reverse=True)[:k]
+        scalar_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        vectorized = self.score_batch(columns, k=k)
+        vectorized_seconds = time.perf_counter() - started
+
+        mismatches = {
+            name: int(np.count_nonzero(~np.isclose(vectorized[name], np.asarray(values), rtol=1e-12, atol=1e-12)))
+            for name, values in scalar.items()
+        }
+        return {
+            'items': n,
+            'scalar_seconds': round(scalar_seconds, 4),
+            'vectorized_seconds': round(vectorized_seconds, 4),
+            'speedup': round(scalar_seconds / vectorized_seconds, 1) if vectorized_seconds else None,
+            'mismatches': mismatches,
+            'top_k_match': vectorized['top_k'].tolist() == scalar_top
+        }
+
+
+# Instância global
+viral_scoring_engine = ViralScoringEngine()
+
+
+if __name__ == "__main__":
+    print(viral_scoring_engine.benchmark())
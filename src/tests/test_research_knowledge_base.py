@@ -0,0 +1,60 @@
+"""Cobertura da base de conhecimento para nichos vizinhos"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.research_knowledge_base import ResearchKnowledgeBase
+
+TARGET = 5
+
+LAWYER_TEXT = (
+    "Curso de marketing digital para advogados: como atrair clientes para o escritório de advocacia "
+    "com anúncios, redes sociais e conteúdo jurídico. Estratégias de marketing digital para advogados "
+    "respeitando o código de ética da OAB, funil de vendas para serviços jurídicos e captação de clientes. "
+) * 3
+DENTIST_TEXT = (
+    "Curso de marketing digital para dentistas: como atrair pacientes para o consultório odontológico "
+    "com anúncios, redes sociais e conteúdo sobre saúde bucal. Estratégias de marketing digital para "
+    "dentistas respeitando o código de ética do CFO, funil de vendas para clínicas odontológicas. "
+) * 3
+
+
+def _documents(text: str, prefix: str):
+    return [
+        {'url': f'https://{prefix}.example.com/artigo-{i}', 'title': f'Marketing digital {prefix} {i}',
+         'content': f'{text} Artigo {i}.'}
+        for i in range(TARGET)
+    ]
+
+
+def _kb(tmp_path) -> ResearchKnowledgeBase:
+    kb = ResearchKnowledgeBase(db_path=str(tmp_path / 'kb.sqlite'))
+    kb.add_documents(_documents(LAWYER_TEXT, 'advogados'), niche='Marketing para Advogados')
+    return kb
+
+
+def test_adjacent_niche_does_not_reach_full_coverage(tmp_path):
+    kb = _kb(tmp_path)
+    query = 'curso de marketing digital para dentistas'
+
+    # O piso de similaridade já descarta o nicho vizinho
+    assert kb.search(query, k=TARGET) == []
+
+    # Mesmo sem piso, os documentos vizinhos não contêm os termos da consulta e não contam na cobertura
+    results = kb.search(query, k=TARGET, min_similarity=0.0)
+    assert len(results) == TARGET
+    assert kb.coverage(results, TARGET) < 1.0
+
+    # Com o nicho da sessão eles nem aparecem
+    assert kb.search(query, k=TARGET, niche='Marketing para Dentistas') == []
+
+
+def test_same_niche_reaches_full_coverage(tmp_path):
+    kb = _kb(tmp_path)
+    kb.add_documents(_documents(DENTIST_TEXT, 'dentistas'), niche='Marketing para Dentistas')
+
+    results = kb.search('curso de marketing digital para dentistas', k=TARGET, niche='marketing para dentistas')
+    assert len(results) == TARGET
+    assert kb.coverage(results, TARGET) == 1.0